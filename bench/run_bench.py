@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+End-to-end throughput benchmark
+Runs the real ContentPipelineOrchestrator over seeded Pending records against the local stand-ins
+in stub_providers.py and reports records/hour, per-stage latency percentiles and peak RSS.
+
+    python bench/run_bench.py --records 50 --concurrency 4 --profile default
+    python bench/run_bench.py --profile flaky --json results.json
+
+Nothing leaves the machine: every provider URL in the generated config points at the stub
+server, which runs as a separate process so its memory is not part of the reported RSS.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Dict, List, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+PROFILE_DIR = os.path.join(BENCH_DIR, 'profiles')
+
+sys.path.insert(0, BENCH_DIR)
+from stub_providers import provider_urls  # noqa: E402
+
+PERCENTILES = (50, 95, 99)
+
+
+def profile_path(name: str) -> str:
+    """A profile name from bench/profiles or a path to one"""
+    if os.path.exists(name):
+        return name
+    path = os.path.join(PROFILE_DIR, f'{name}.json')
+    if not os.path.exists(path):
+        raise SystemExit(f"❌ No profile {name!r}; pick one of bench/profiles or pass a path")
+    return path
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile; fine for the sample sizes a benchmark run produces"""
+    ordered = sorted(values)
+    rank = max(1, round(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    summary = {'count': len(values)}
+    if values:
+        summary['mean'] = statistics.fmean(values)
+        summary.update({f'p{pct}': percentile(values, pct) for pct in PERCENTILES})
+    return summary
+
+
+def start_stubs(records: int, profile: str, seed: int = None) -> Tuple[subprocess.Popen, str]:
+    """Start stub_providers.py and return the process and its root URL"""
+    command = [sys.executable, os.path.join(BENCH_DIR, 'stub_providers.py'),
+               '--records', str(records), '--profile', profile]
+    if seed is not None:
+        command += ['--seed', str(seed)]
+    proc = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    root = proc.stdout.readline().strip()
+    if not root.startswith('http'):
+        proc.kill()
+        raise SystemExit("❌ The stub providers did not start")
+    return proc, root
+
+
+def stub_stats(root: str) -> Dict:
+    with urllib.request.urlopen(f'{root}/_stats', timeout=10) as response:
+        return json.load(response)
+
+
+def write_config(directory: str, root: str, youtube: bool) -> str:
+    """api_keys.json plus the Google credential files, all pointing at the stubs"""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    # google-auth signs a JWT with the service account key before asking the token endpoint
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                            serialization.NoEncryption()).decode()
+    files = {
+        'google_drive_credentials.json': {
+            'type': 'service_account',
+            'project_id': 'bench',
+            'private_key_id': 'bench',
+            'private_key': pem,
+            'client_email': 'bench@bench.iam.gserviceaccount.com',
+            'client_id': '1',
+            'token_uri': f'{root}/google/token',
+        },
+        'youtube_credentials.json': {
+            'installed': {'client_id': 'bench', 'client_secret': 'bench', 'token_uri': f'{root}/google/token'}
+        },
+        'youtube_token.json': {
+            'token': 'bench',
+            'refresh_token': 'bench',
+            'token_uri': f'{root}/google/token',
+            'client_id': 'bench',
+            'client_secret': 'bench',
+            'scopes': ['https://www.googleapis.com/auth/youtube.upload'],
+            'expiry': '2099-01-01T00:00:00Z',
+        },
+        'api_keys.json': {
+            'anthropic_api_key': 'bench',
+            'airtable_api_key': 'bench',
+            'airtable_base_id': 'appBench',
+            'airtable_table_name': 'Bench',
+            'json2video_api_key': 'bench',
+            'elevenlabs_api_key': 'bench',
+            'scrapingdog_api_key': 'bench',
+            'wordpress_url': f'{root}/wordpress',
+            'wordpress_user': 'bench',
+            'wordpress_password': 'bench',
+            'youtube_enabled': youtube,
+            'provider_urls': provider_urls(root),
+            'json2video_poll_interval': 0.5,
+            'output_dir': os.path.join(directory, 'output'),
+        },
+    }
+    for name, content in files.items():
+        with open(os.path.join(directory, name), 'w') as f:
+            json.dump(content, f, indent=2)
+    return os.path.join(directory, 'api_keys.json')
+
+
+async def run_records(records: int, concurrency: int) -> Dict:
+    """Push `records` Pending records through the real orchestrator and time each one"""
+    from workflow_runner import AirtableMCPServer, ContentPipelineOrchestrator
+
+    orchestrator = ContentPipelineOrchestrator()
+    try:
+        await orchestrator.pending.refresh()
+        pending = orchestrator.pending.take(records)
+
+        async def run_one(record: dict) -> dict:
+            started = time.monotonic()
+            try:
+                result = await orchestrator.process_record(AirtableMCPServer.to_pending_title(record), record)
+            except Exception as e:
+                result = {'success': False, 'record_id': record['id'], 'error': str(e)}
+            result['seconds'] = time.monotonic() - started
+            return result
+
+        await orchestrator.start_pipeline(concurrency)
+        started = time.monotonic()
+        try:
+            results = await asyncio.gather(*(run_one(r) for r in pending))
+        finally:
+            await orchestrator.stop_pipeline()
+        return {'results': results, 'wall_seconds': time.monotonic() - started}
+    finally:
+        await orchestrator.close()
+
+
+def build_report(run: Dict, stats: Dict, args) -> Dict:
+    results = run['results']
+    succeeded = [r for r in results if r['success']]
+    stage_samples: Dict[str, List[float]] = {}
+    stage_failures: Dict[str, int] = {}
+    for result in results:
+        for name, entry in result.get('stages', {}).items():
+            if entry['status'] == 'done':
+                stage_samples.setdefault(name, []).append(entry['seconds'])
+            elif entry['status'] == 'failed':
+                stage_failures[name] = stage_failures.get(name, 0) + 1
+
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss_mb = peak_rss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    wall = run['wall_seconds']
+    return {
+        'profile': args.profile,
+        'records': len(results),
+        'concurrency': args.concurrency,
+        'succeeded': len(succeeded),
+        'failed': len(results) - len(succeeded),
+        'wall_seconds': wall,
+        'records_per_hour': len(succeeded) * 3600 / wall if wall else 0.0,
+        'peak_rss_mb': peak_rss_mb,
+        'record_seconds': summarize([r['seconds'] for r in succeeded]),
+        'stages': {
+            name: dict(summarize(samples), failed=stage_failures.get(name, 0))
+            for name, samples in sorted(stage_samples.items())
+        },
+        'provider_calls': stats['calls'],
+        'provider_errors': stats['errors'],
+    }
+
+
+def print_report(report: Dict):
+    print(f"📊 Benchmark: profile={report['profile']} records={report['records']} "
+          f"concurrency={report['concurrency']}")
+    print(f"   Succeeded: {report['succeeded']}  Failed: {report['failed']}")
+    print(f"   Wall time: {report['wall_seconds']:.1f}s")
+    print(f"   Throughput: {report['records_per_hour']:.0f} records/hour")
+    print(f"   Peak RSS: {report['peak_rss_mb']:.1f} MB")
+
+    header = f"   {'stage':<18}{'n':>5}{'fail':>6}" + ''.join(f"{f'p{p}':>9}" for p in PERCENTILES)
+    print("⏱️ Latency (seconds):")
+    print(header)
+    rows = list(report['stages'].items()) + [('record', dict(report['record_seconds'], failed=report['failed']))]
+    for name, summary in rows:
+        line = f"   {name:<18}{summary['count']:>5}{summary['failed']:>6}"
+        line += ''.join(f"{summary.get(f'p{p}', 0.0):>9.2f}" for p in PERCENTILES)
+        print(line)
+
+    print("📡 Provider calls (errors injected):")
+    for name, calls in report['provider_calls'].items():
+        if calls:
+            print(f"   {name}: {calls} ({report['provider_errors'][name]})")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the workflow end to end against local stub providers")
+    parser.add_argument('--records', type=int, default=20, help='records to process (default: 20)')
+    parser.add_argument('--concurrency', type=int, default=2,
+                        help='workers per pipeline phase, as --concurrency on the runner (default: 2)')
+    parser.add_argument('--profile', default='default',
+                        help='provider profile: a name in bench/profiles or a JSON path (default: default)')
+    parser.add_argument('--no-youtube', action='store_true', help='skip the YouTube upload stage')
+    parser.add_argument('--seed', type=int, help='random seed for stub latencies and injected errors')
+    parser.add_argument('--json', metavar='PATH', help='also write the report as JSON')
+    parser.add_argument('--keep', action='store_true', help='keep the scratch directory (config, log, output)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    profile = profile_path(args.profile)
+    scratch = tempfile.mkdtemp(prefix='workflow-bench-')
+    proc, root = start_stubs(args.records, profile, args.seed)
+    try:
+        config_path = write_config(scratch, root, youtube=not args.no_youtube)
+        # Settings are read on first import, so locate everything before the runner loads
+        os.environ['WORKFLOW_CONFIG'] = config_path
+        os.environ['WORKFLOW_CONFIG_DIR'] = scratch
+        os.environ['WORKFLOW_OUTPUT_DIR'] = os.path.join(scratch, 'output')
+        sys.path[:0] = [PROJECT_ROOT, os.path.join(PROJECT_ROOT, 'src')]
+
+        log_path = os.path.join(scratch, 'bench.log')
+        print(f"🏁 Running {args.records} records against {root} (log: {log_path})")
+        logging.basicConfig(filename=log_path, level=logging.WARNING, force=True)
+        with open(log_path, 'a') as log, contextlib.redirect_stdout(log):
+            run = asyncio.run(run_records(args.records, args.concurrency))
+
+        report = build_report(run, stub_stats(root), args)
+        print_report(report)
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(report, f, indent=2)
+            print(f"💾 Report written to {args.json}")
+        return 0 if report['succeeded'] else 1
+    finally:
+        proc.terminate()
+        proc.wait()
+        if args.keep:
+            print(f"📁 Scratch directory kept: {scratch}")
+        else:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
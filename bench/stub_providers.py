@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""
+Stub Providers
+Local stand-ins for every API the workflow calls (Airtable, Anthropic, JSON2Video, Google Drive,
+YouTube, WordPress, ScrapingDog, Amazon and ElevenLabs) behind one HTTP server. Each provider
+answers after a configurable latency, fails a configurable share of calls and returns payloads
+of a configurable size, so the real orchestrator can be benchmarked without keys or network.
+
+Run it on its own (the benchmark starts it as a separate process so its memory is not counted):
+    python bench/stub_providers.py --records 50 --profile bench/profiles/default.json
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+import urllib.parse
+import uuid
+from dataclasses import dataclass, fields
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+PROVIDERS = ['airtable', 'anthropic', 'json2video', 'google', 'wordpress', 'scrapingdog', 'amazon',
+             'elevenlabs', 'files']
+
+KEYWORDS = ['wireless', 'bluetooth', 'noise cancelling', 'headphone', 'battery life']
+
+# Five products that pass the text control checks for the Electronics category
+PRODUCTS = [
+    ('Sony WH-1000XM5 Wireless Headphone',
+     'Industry leading noise cancelling with crisp bluetooth audio and thirty hours of battery life for travel.'),
+    ('Bose QuietComfort Ultra Bluetooth Headphone',
+     'Immersive spatial sound and adaptive noise cancelling make every commute calmer, with plush wireless comfort.'),
+    ('Apple AirPods Max Wireless Headphone',
+     'Computational audio and strong noise cancelling wrapped in aluminum, pairing instantly over bluetooth with iPhone.'),
+    ('Sennheiser Momentum 4 Bluetooth Headphone',
+     'Audiophile tuning meets sixty hour battery life and smart noise cancelling in a light wireless design.'),
+    ('Anker Soundcore Space Q45 Headphone',
+     'Budget friendly wireless pick with reliable noise cancelling, bluetooth multipoint and fifty hours of battery life.'),
+]
+
+
+@dataclass
+class ProviderProfile:
+    """How one stand-in behaves"""
+    # Median seconds before answering; actual delays are log-normal around it
+    latency: float = 0.05
+    # Log-normal sigma; larger values give a longer tail
+    spread: float = 0.3
+    # Share of calls answered with `error_status` instead
+    error_rate: float = 0.0
+    error_status: int = 503
+    # Size of generated bodies (search HTML, audio, rendered video)
+    payload_bytes: int = 0
+    # JSON2Video only: seconds a render stays 'running'
+    render_seconds: float = 0.0
+
+    def delay(self) -> float:
+        if self.latency <= 0:
+            return 0.0
+        return self.latency * random.lognormvariate(0, self.spread)
+
+
+def load_profile(path: Optional[str]) -> Dict[str, ProviderProfile]:
+    """Provider profiles from a JSON file: {"providers": {"anthropic": {"latency": 1.2, ...}}}"""
+    data = {}
+    if path:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    known = {f.name for f in fields(ProviderProfile)}
+    profiles = {}
+    for name in PROVIDERS:
+        options = dict(data.get('defaults', {}), **data.get('providers', {}).get(name, {}))
+        unknown = set(options) - known
+        if unknown:
+            raise ValueError(f"Unknown profile settings for {name}: {', '.join(sorted(unknown))}")
+        profiles[name] = ProviderProfile(**options)
+    return profiles
+
+
+def seed_records(count: int) -> List[Dict]:
+    """`count` Pending Airtable records the workflow can take end to end"""
+    start = time.time() - count
+    return [
+        {
+            'id': f'rec{i:011d}',
+            'createdTime': time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime(start + i)),
+            'fields': {
+                'Title': f'Top 5 Noise Cancelling Headphones {i}',
+                'Status': 'Pending',
+                'Category': 'Electronics',
+                'KeyWords': ', '.join(KEYWORDS),
+            },
+        }
+        for i in range(count)
+    ]
+
+
+FORMULA_TERM = re.compile(r"\{([^}]+)\}\s*(!?=)\s*'([^']*)'")
+
+
+def matches_formula(formula: str, record: Dict) -> bool:
+    """Enough of Airtable's formula language for the workflow: AND-ed {Field}='value' / != terms"""
+    for field_name, op, value in FORMULA_TERM.findall(formula or ''):
+        equal = str(record['fields'].get(field_name, '')) == value
+        if equal != (op == '='):
+            return False
+    return True
+
+
+class StubState:
+    """Everything the stand-ins remember between calls"""
+
+    def __init__(self, profiles: Dict[str, ProviderProfile], records: List[Dict]):
+        self.profiles = profiles
+        self.records = {r['id']: r for r in records}
+        self.renders: Dict[str, float] = {}
+        self.uploads: Dict[str, Dict] = {}
+        self.drive_files: Dict[str, Dict] = {}
+        self.categories: Dict[str, int] = {}
+        self.posts = 0
+        self.calls: Dict[str, int] = {name: 0 for name in PROVIDERS}
+        self.errors: Dict[str, int] = {name: 0 for name in PROVIDERS}
+        self.lock = threading.Lock()
+
+    def count(self, provider: str, failed: bool):
+        with self.lock:
+            self.calls[provider] += 1
+            if failed:
+                self.errors[provider] += 1
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'StubProviders/1.0'
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def state(self) -> StubState:
+        return self.server.state
+
+    @property
+    def root(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    # ---- plumbing ----
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _json_body(self, body: bytes) -> Dict:
+        try:
+            return json.loads(body or b'{}')
+        except ValueError:
+            return {}
+
+    def _send(self, status: int, body: bytes = b'', content_type: str = 'application/json',
+              headers: Dict[str, str] = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _json(self, status: int, data, headers: Dict[str, str] = None):
+        self._send(status, json.dumps(data).encode(), headers=headers)
+
+    def _handle(self):
+        parsed = urllib.parse.urlsplit(self.path)
+        segments = [s for s in parsed.path.split('/') if s]
+        query = dict(urllib.parse.parse_qsl(parsed.query))
+        body = self._body()
+
+        if segments == ['_stats']:
+            return self._json(200, {'calls': self.state.calls, 'errors': self.state.errors})
+
+        provider = segments[0] if segments else ''
+        if provider not in self.state.profiles:
+            return self._json(404, {'error': f'no stub for {parsed.path}'})
+
+        profile = self.state.profiles[provider]
+        time.sleep(profile.delay())
+        if profile.error_rate and random.random() < profile.error_rate:
+            self.state.count(provider, failed=True)
+            headers = {'Retry-After': '1'} if profile.error_status == 429 else None
+            return self._json(profile.error_status, {'error': {'message': 'stub provider error'}}, headers)
+
+        self.state.count(provider, failed=False)
+        handler = getattr(self, f'_{provider}')
+        return handler(segments[1:], query, body, profile)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _handle
+
+    # ---- providers ----
+
+    def _airtable(self, path, query, body, profile):
+        # /airtable/{base}/{table}[/{record}]
+        if len(path) == 3:
+            record = self.state.records.get(path[2])
+            if not record:
+                return self._json(404, {'error': 'NOT_FOUND'})
+            if self.command == 'PATCH':
+                record['fields'].update(self._json_body(body).get('fields', {}))
+            return self._json(200, record)
+
+        if self.command == 'PATCH':
+            updated = []
+            for item in self._json_body(body).get('records', []):
+                record = self.state.records.get(item['id'])
+                if record:
+                    record['fields'].update(item.get('fields', {}))
+                    updated.append(record)
+            return self._json(200, {'records': updated})
+
+        matching = [r for r in self.state.records.values()
+                    if matches_formula(query.get('filterByFormula'), r)]
+        if 'maxRecords' in query:
+            matching = matching[:int(query['maxRecords'])]
+        offset = int(query.get('offset', 0))
+        page_size = int(query.get('pageSize', 100))
+        page = {'records': matching[offset:offset + page_size]}
+        if offset + page_size < len(matching):
+            page['offset'] = str(offset + page_size)
+        return self._json(200, page)
+
+    def _anthropic(self, path, query, body, profile):
+        request = self._json_body(body)
+        content = request.get('messages', [{}])[-1].get('content', '')
+        if isinstance(content, list):
+            content = ' '.join(part.get('text', '') for part in content if isinstance(part, dict))
+
+        if 'comma-separated' in content:
+            text = ', '.join(KEYWORDS + ['over ear', 'travel headphones', 'hi-res audio', 'anc'])
+        elif 'Return only the optimized title' in content:
+            text = 'Top 5 Noise Cancelling Headphones You Need'
+        elif 'Return ONLY valid JSON' in content:
+            text = json.dumps({
+                'intro': 'Stop scrolling, these headphones change everything!',
+                'products': [
+                    {'rank': 5 - i, 'name': title, 'title': title, 'description': description,
+                     'script': description, 'key_features': ['noise cancelling', 'bluetooth', 'battery life']}
+                    for i, (title, description) in enumerate(PRODUCTS)
+                ],
+                'outro': 'Links are in the comments, go grab yours!',
+                'total_duration': '55',
+                'hook_phrases': ['Stop scrolling'],
+            })
+        else:
+            text = 'Stub answer. ' * max(1, profile.payload_bytes // 13)
+
+        return self._json(200, {
+            'id': f'msg_{uuid.uuid4().hex[:24]}',
+            'type': 'message',
+            'role': 'assistant',
+            'model': request.get('model', 'stub'),
+            'content': [{'type': 'text', 'text': text}],
+            'stop_reason': 'end_turn',
+            'stop_sequence': None,
+            'usage': {'input_tokens': len(content) // 4, 'output_tokens': len(text) // 4},
+        })
+
+    def _json2video(self, path, query, body, profile):
+        # POST /json2video/movies starts a render; GET ?project= polls it
+        if self.command == 'POST':
+            project = uuid.uuid4().hex[:16]
+            with self.state.lock:
+                self.state.renders[project] = time.monotonic()
+            return self._json(200, {'success': True, 'project': project, 'timestamp': time.time()})
+
+        project = query.get('project', '')
+        started = self.state.renders.get(project)
+        if started is None:
+            return self._json(404, {'success': False, 'message': 'unknown project'})
+        if time.monotonic() - started < profile.render_seconds:
+            return self._json(200, {'success': True, 'movie': {'status': 'running', 'project': project}})
+        return self._json(200, {'success': True, 'movie': {
+            'status': 'done', 'project': project, 'url': f'{self.root}/files/{project}.mp4'
+        }})
+
+    def _files(self, path, query, body, profile):
+        # Rendered videos; their size comes from the json2video profile
+        size = self.state.profiles['json2video'].payload_bytes or 1024
+        self._send(200, b'\0' * size, content_type='video/mp4')
+
+    def _google(self, path, query, body, profile):
+        if path == ['token']:
+            return self._json(200, {'access_token': 'stub-token', 'token_type': 'Bearer', 'expires_in': 3600})
+
+        if path[:1] == ['upload']:
+            return self._google_upload(path[1:], query, body)
+
+        # /google/drive/v3/files[/{id}[/permissions]]
+        if path[:3] != ['drive', 'v3', 'files']:
+            return self._json(404, {'error': {'message': 'unknown google path'}})
+        rest = path[3:]
+        if not rest and self.command == 'GET':
+            names = re.findall(r"name\s*=\s*'([^']*)'", query.get('q', ''))
+            found = [f for f in self.state.drive_files.values() if f['name'] in names]
+            return self._json(200, {'files': found[:1]})
+        if not rest:
+            return self._json(200, self._drive_file(self._json_body(body)))
+        if rest[1:] == ['permissions']:
+            return self._json(200, {'id': 'anyoneWithLink', 'type': 'anyone', 'role': 'reader'})
+        return self._json(200, {'id': rest[0], 'webViewLink': f'https://drive.google.com/file/d/{rest[0]}/view'})
+
+    def _drive_file(self, metadata: Dict) -> Dict:
+        file_id = uuid.uuid4().hex[:20]
+        entry = {'id': file_id, 'name': metadata.get('name', file_id)}
+        with self.state.lock:
+            self.state.drive_files[file_id] = entry
+        return entry
+
+    def _google_upload(self, path, query, body):
+        # Resumable protocol: POST opens a session, PUTs send Content-Range chunks until the last one
+        if path[:1] == ['session']:
+            session = self.state.uploads.get(path[1] if len(path) > 1 else '')
+            if session is None:
+                return self._json(404, {'error': {'message': 'unknown upload session'}})
+            match = re.match(r'bytes (\d+)-(\d+)/(\d+|\*)', self.headers.get('Content-Range', ''))
+            if match and match.group(3) != '*' and int(match.group(2)) + 1 < int(match.group(3)):
+                return self._send(308, headers={'Range': f'bytes=0-{match.group(2)}'})
+            self.state.uploads.pop(path[1], None)
+            if session['kind'] == 'youtube':
+                return self._json(200, {'id': uuid.uuid4().hex[:11], 'kind': 'youtube#video'})
+            return self._json(200, self._drive_file(session['metadata']))
+
+        kind = 'youtube' if path[:1] == ['youtube'] else 'drive'
+        if query.get('uploadType') == 'resumable':
+            session = uuid.uuid4().hex
+            with self.state.lock:
+                self.state.uploads[session] = {'kind': kind, 'metadata': self._json_body(body)}
+            return self._send(200, headers={'Location': f'{self.root}/google/upload/session/{session}'})
+        if kind == 'youtube':
+            return self._json(200, {'id': uuid.uuid4().hex[:11], 'kind': 'youtube#video'})
+        return self._json(200, self._drive_file({}))
+
+    def _wordpress(self, path, query, body, profile):
+        # /wordpress/wp-json/wp/v2/{categories|posts}
+        resource = path[-1] if path else ''
+        if resource == 'categories':
+            if self.command == 'GET':
+                name = query.get('search', '')
+                category = self.state.categories.get(name)
+                return self._json(200, [{'id': category, 'name': name}] if category else [])
+            name = self._json_body(body).get('name', 'Uncategorized')
+            with self.state.lock:
+                category = self.state.categories.setdefault(name, len(self.state.categories) + 1)
+            return self._json(201, {'id': category, 'name': name})
+        if resource == 'posts':
+            with self.state.lock:
+                self.state.posts += 1
+                post_id = self.state.posts
+            return self._json(201, {'id': post_id, 'link': f'{self.root}/wordpress/?p={post_id}'})
+        return self._json(404, {'code': 'rest_no_route'})
+
+    def _search_html(self, profile) -> bytes:
+        items = ''.join(
+            f'<div data-component-type="s-search-result" data-asin="B0STUB{i:04d}">'
+            f'<h2><a href="/dp/B0STUB{i:04d}"><span>{title}</span></a></h2>'
+            f'<span class="a-price-whole">{199 + i * 50}</span>'
+            f'<img class="s-image" src="{self.root}/files/B0STUB{i:04d}.jpg"/></div>'
+            for i, (title, _) in enumerate(PRODUCTS)
+        )
+        html = f'<html><body>{items}</body></html>'
+        # Real search pages are mostly markup the parser has to wade through
+        padding = max(0, profile.payload_bytes - len(html))
+        return html.replace('</body>', f'<!--{"x" * padding}--></body>').encode()
+
+    def _scrapingdog(self, path, query, body, profile):
+        if path[:2] == ['amazon', 'product']:
+            asin = query.get('asin', 'B0STUB0000')
+            return self._json(200, {'asin': asin, 'title': PRODUCTS[0][0], 'price': '$299',
+                                    'images': [f'{self.root}/files/{asin}.jpg']})
+        self._send(200, self._search_html(profile), content_type='text/html')
+
+    def _amazon(self, path, query, body, profile):
+        self._send(200, self._search_html(profile), content_type='text/html')
+
+    def _elevenlabs(self, path, query, body, profile):
+        self._send(200, b'\0' * (profile.payload_bytes or 1024), content_type='audio/mpeg')
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, state: StubState):
+        super().__init__(address, StubHandler)
+        self.state = state
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+
+def provider_urls(root: str) -> Dict[str, str]:
+    """The 'provider_urls' config that points the workflow at a stub server"""
+    return {
+        'airtable': f'{root}/airtable',
+        'anthropic': f'{root}/anthropic',
+        'amazon': f'{root}/amazon',
+        'scrapingdog': f'{root}/scrapingdog',
+        'json2video': f'{root}/json2video',
+        'elevenlabs': f'{root}/elevenlabs',
+        'google': f'{root}/google',
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve local stand-ins for the workflow's providers")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0, help='0 picks a free port')
+    parser.add_argument('--records', type=int, default=20, help='Pending records to seed (default: 20)')
+    parser.add_argument('--profile', metavar='PATH', help='provider profile JSON (see bench/profiles)')
+    parser.add_argument('--seed', type=int, help='random seed for latencies and injected errors')
+    args = parser.parse_args(argv)
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    server = StubServer((args.host, args.port), StubState(load_profile(args.profile), seed_records(args.records)))
+    # The benchmark reads this first line to find the port
+    print(server.url, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
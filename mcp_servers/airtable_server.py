@@ -4,26 +4,37 @@ from airtable import Airtable
 from typing import Dict, List, Optional
 
 class AirtableMCPServer:
-    def __init__(self, api_key: str, base_id: str, table_name: str):
+    def __init__(self, api_key: str, base_id: str, table_name: str, category_scheduler=None,
+                 api_url: str = None):
         self.airtable = Airtable(base_id, table_name, api_key)
+        if api_url:
+            # Talk to another endpoint (e.g. a local stand-in) with the same paths
+            self.airtable.url_table = self.airtable.url_table.replace(Airtable.API_URL, api_url, 1)
+        # Decides get_next_category; a default CategoryScheduler is built on first use
+        self.category_scheduler = category_scheduler
+        # The airtable client blocks, so every call below runs in a thread and leaves the loop to other records
         
     async def get_pending_titles(self, limit: int = 1) -> Optional[Dict]:
         """Get titles with 'Pending' status from Airtable"""
         try:
-            records = self.airtable.search('Status', 'Pending', max_records=limit)
+            records = await asyncio.to_thread(self.airtable.search, 'Status', 'Pending', max_records=limit)
             if records:
-                record = records[0]
-                return {
-                    'record_id': record['id'],
-                    'title': record['fields'].get('Title', ''),
-                    'video_title': record['fields'].get('VideoTitle', ''),
-                    'video_title_status': record['fields'].get('VideoTitleStatus', ''),
-                    'status': record['fields'].get('Status', '')
-                }
+                return self.to_pending_title(records[0])
             return None
         except Exception as e:
             print(f"Error fetching pending titles: {e}")
             return None
+
+    @staticmethod
+    def to_pending_title(record: Dict) -> Dict:
+        """Convert a raw Airtable record into the pending title dict the workflow uses"""
+        return {
+            'record_id': record['id'],
+            'title': record['fields'].get('Title', ''),
+            'video_title': record['fields'].get('VideoTitle', ''),
+            'video_title_status': record['fields'].get('VideoTitleStatus', ''),
+            'status': record['fields'].get('Status', '')
+        }
     
     async def save_voice_data(self, record_id: str, voice_data: Dict) -> bool:
         """Save generated voice data to Airtable Mp3 fields"""
@@ -45,7 +56,7 @@ class AirtableMCPServer:
                     update_fields[f'Product{rank}Mp3'] = voice_data[voice_key]
             
             print(f"🎵 Saving voice data to fields: {list(update_fields.keys())}")
-            self.airtable.update(record_id, update_fields)
+            await asyncio.to_thread(self.airtable.update, record_id, update_fields)
             print(f"✅ Saved voice data for record {record_id}")
             
             return True
@@ -58,7 +69,7 @@ class AirtableMCPServer:
     async def update_record_status(self, record_id: str, status: str = "Processing") -> bool:
         """Update record status - try different status values"""
         try:
-            self.airtable.update(record_id, {'Status': status})
+            await asyncio.to_thread(self.airtable.update, record_id, {'Status': status})
             print(f"✅ Updated record {record_id} status to {status}")
             return True
         except Exception as e:
@@ -68,56 +79,10 @@ class AirtableMCPServer:
     async def save_generated_content(self, record_id: str, content_data: Dict) -> bool:
         """Save generated content back to Airtable using individual product columns"""
         try:
-            update_fields = {}
-            
-            if 'keywords' in content_data:
-                update_fields['KeyWords'] = ', '.join(content_data['keywords'])
-            
-            if 'optimized_title' in content_data:
-                update_fields['VideoTitle'] = content_data['optimized_title']
-            
-            if 'script' in content_data and isinstance(content_data['script'], dict):
-                script_data = content_data['script']
-                
-                if 'intro' in script_data:
-                    update_fields['VideoDescription'] = script_data['intro']
-                
-                products = script_data.get('products', [])
-                sorted_products = sorted(products, key=lambda x: x.get('rank', 0), reverse=True)
-                
-                for product in sorted_products:
-                    rank = product.get('rank')
-                    name = product.get('name', '')
-                    script = product.get('script', '')
-                    
-                    if rank == 5:
-                        update_fields['ProductNo5Title'] = name
-                        update_fields['ProductNo5Description'] = script
-                        if 'image_urls' in content_data and 5 in content_data['image_urls']:
-                            update_fields['ProductNo5Photo'] = content_data['image_urls'][5]
-                    elif rank == 4:
-                        update_fields['ProductNo4Title'] = name
-                        update_fields['ProductNo4Description'] = script
-                        if 'image_urls' in content_data and 4 in content_data['image_urls']:
-                            update_fields['ProductNo4Photo'] = content_data['image_urls'][4]
-                    elif rank == 3:
-                        update_fields['ProductNo3Title'] = name
-                        update_fields['ProductNo3Description'] = script
-                        if 'image_urls' in content_data and 3 in content_data['image_urls']:
-                            update_fields['ProductNo3Photo'] = content_data['image_urls'][3]
-                    elif rank == 2:
-                        update_fields['ProductNo2Title'] = name
-                        update_fields['ProductNo2Description'] = script
-                        if 'image_urls' in content_data and 2 in content_data['image_urls']:
-                            update_fields['ProductNo2Photo'] = content_data['image_urls'][2]
-                    elif rank == 1:
-                        update_fields['ProductNo1Title'] = name
-                        update_fields['ProductNo1Description'] = script
-                        if 'image_urls' in content_data and 1 in content_data['image_urls']:
-                            update_fields['ProductNo1Photo'] = content_data['image_urls'][1]
+            update_fields = self.build_content_fields(content_data)
 
             print(f"📝 Saving to fields: {list(update_fields.keys())}")
-            self.airtable.update(record_id, update_fields)
+            await asyncio.to_thread(self.airtable.update, record_id, update_fields)
             print(f"✅ Saved generated content for record {record_id}")
             
             product_count = sum(1 for key in update_fields.keys() if 'ProductNo' in key and 'Title' in key)
@@ -128,10 +93,63 @@ class AirtableMCPServer:
             print(f"Error saving generated content: {e}")
             return False
 
+    @staticmethod
+    def build_content_fields(content_data: Dict) -> Dict:
+        """Map generated content onto the Airtable product columns"""
+        update_fields = {}
+        
+        if 'keywords' in content_data:
+            update_fields['KeyWords'] = ', '.join(content_data['keywords'])
+        
+        if 'optimized_title' in content_data:
+            update_fields['VideoTitle'] = content_data['optimized_title']
+        
+        if 'script' in content_data and isinstance(content_data['script'], dict):
+            script_data = content_data['script']
+            
+            if 'intro' in script_data:
+                update_fields['VideoDescription'] = script_data['intro']
+            
+            products = script_data.get('products', [])
+            sorted_products = sorted(products, key=lambda x: x.get('rank', 0), reverse=True)
+            
+            for product in sorted_products:
+                rank = product.get('rank')
+                name = product.get('name', '')
+                script = product.get('script', '')
+                
+                if rank == 5:
+                    update_fields['ProductNo5Title'] = name
+                    update_fields['ProductNo5Description'] = script
+                    if 'image_urls' in content_data and 5 in content_data['image_urls']:
+                        update_fields['ProductNo5Photo'] = content_data['image_urls'][5]
+                elif rank == 4:
+                    update_fields['ProductNo4Title'] = name
+                    update_fields['ProductNo4Description'] = script
+                    if 'image_urls' in content_data and 4 in content_data['image_urls']:
+                        update_fields['ProductNo4Photo'] = content_data['image_urls'][4]
+                elif rank == 3:
+                    update_fields['ProductNo3Title'] = name
+                    update_fields['ProductNo3Description'] = script
+                    if 'image_urls' in content_data and 3 in content_data['image_urls']:
+                        update_fields['ProductNo3Photo'] = content_data['image_urls'][3]
+                elif rank == 2:
+                    update_fields['ProductNo2Title'] = name
+                    update_fields['ProductNo2Description'] = script
+                    if 'image_urls' in content_data and 2 in content_data['image_urls']:
+                        update_fields['ProductNo2Photo'] = content_data['image_urls'][2]
+                elif rank == 1:
+                    update_fields['ProductNo1Title'] = name
+                    update_fields['ProductNo1Description'] = script
+                    if 'image_urls' in content_data and 1 in content_data['image_urls']:
+                        update_fields['ProductNo1Photo'] = content_data['image_urls'][1]
+
+        return update_fields
+
     async def get_all_records(self) -> List[Dict]:
         """Get all records from Airtable"""
         try:
-            records = self.airtable.get_all()
+            records = await asyncio.to_thread(self.airtable.get_all)
             return records
         except Exception as e:
             print(f"Error fetching all records: {e}")
@@ -140,7 +158,7 @@ class AirtableMCPServer:
     async def get_record_by_id(self, record_id: str) -> Optional[Dict]:
         """Get a single record by ID"""
         try:
-            record = self.airtable.get(record_id)
+            record = await asyncio.to_thread(self.airtable.get, record_id)
             return record
         except Exception as e:
             print(f"Error fetching record {record_id}: {e}")
@@ -149,7 +167,7 @@ class AirtableMCPServer:
     async def update_record(self, record_id: str, fields: Dict) -> bool:
         """Update a record with the given fields"""
         try:
-            self.airtable.update(record_id, fields)
+            await asyncio.to_thread(self.airtable.update, record_id, fields)
             return True
         except Exception as e:
             print(f"Error updating record {record_id}: {e}")
@@ -158,7 +176,7 @@ class AirtableMCPServer:
     async def get_records_by_category(self, category: str, status: str = None) -> List[Dict]:
         """Get records filtered by category and optionally by status"""
         try:
-            all_records = self.airtable.get_all()
+            all_records = await asyncio.to_thread(self.airtable.get_all)
             filtered_records = []
             
             for record in all_records:
@@ -172,26 +190,53 @@ class AirtableMCPServer:
             print(f"Error fetching records by category: {e}")
             return []
 
-    async def get_next_category(self, current_category: str) -> Optional[str]:
-        """Get the next category to process"""
-        categories = ["Electronics", "Fashion", "Home & Garden", "Beauty", "Sports & Outdoors", "Toys & Games", "Food & Beverage", "Other"]
-        try:
-            current_index = categories.index(current_category)
-            if current_index < len(categories) - 1:
-                return categories[current_index + 1]
-        except ValueError:
-            pass
-        return None
+    async def get_next_category(self, current_category: str = None) -> Optional[str]:
+        """
+        Get the next category to process, drawn by weight and Pending backlog; None when nothing is Pending.
+        The scheduler remembers what it handed out, so current_category is only kept for older callers.
+        """
+        if self.category_scheduler is None:
+            from services.category_scheduler import CategoryScheduler
+            self.category_scheduler = CategoryScheduler()
+        records = await self.get_pending_records()
+        return self.category_scheduler.next_batch(self.category_scheduler.backlog(records))
 
     async def get_pending_records(self, limit: int = 100) -> List[Dict]:
         """Get all pending records"""
         try:
-            records = self.airtable.search('Status', 'Pending', max_records=limit)
+            records = await asyncio.to_thread(self.airtable.search, 'Status', 'Pending', max_records=limit)
             return records
         except Exception as e:
             print(f"Error fetching pending records: {e}")
             return []
 
+    async def scan_pending_records(self, page_size: int = 100, max_records: int = 1000) -> List[Dict]:
+        """Every Pending record (up to max_records), fetched page by page off the event loop"""
+        def scan():
+            records = []
+            for page in self.airtable.get_iter(formula="{Status}='Pending'", page_size=page_size,
+                                               max_records=max_records):
+                records.extend(page)
+            return records
+        try:
+            return await asyncio.to_thread(scan)
+        except Exception as e:
+            print(f"Error scanning pending records: {e}")
+            return []
+
+    async def get_leased_records(self, limit: int = 100) -> List[Dict]:
+        """Get records that are Processing under a worker lease"""
+        try:
+            records = await asyncio.to_thread(
+                self.airtable.get_all,
+                formula="AND({Status}='Processing', {LeaseOwner}!='')",
+                max_records=limit
+            )
+            return records
+        except Exception as e:
+            print(f"Error fetching leased records: {e}")
+            return []
+
     async def update_keywords(self, record_id: str, keywords: List[str]) -> bool:
         """Update the SEO Keywords field for a record"""
         try:
@@ -200,7 +245,7 @@ class AirtableMCPServer:
             else:
                 keywords_str = keywords
                 
-            self.airtable.update(record_id, {'SEO Keywords': keywords_str})
+            await asyncio.to_thread(self.airtable.update, record_id, {'SEO Keywords': keywords_str})
             return True
         except Exception as e:
             print(f"Error updating keywords for record {record_id}: {e}")
@@ -208,8 +253,8 @@ class AirtableMCPServer:
 
 
 async def test_airtable_server():
-    with open('/app/config/api_keys.json', 'r') as f:
-        config = json.load(f)
+    from services.settings import load_config
+    config = load_config()
     
     server = AirtableMCPServer(
         api_key=config['airtable_api_key'],
@@ -292,8 +337,8 @@ if __name__ == "__main__":
             return False
 
 async def test_airtable_server():
-    with open('/app/config/api_keys.json', 'r') as f:
-        config = json.load(f)
+    from services.settings import load_config
+    config = load_config()
     
     server = AirtableMCPServer(
         api_key=config['airtable_api_key'],
@@ -16,6 +16,8 @@ from urllib.parse import quote_plus
 import httpx
 from bs4 import BeautifulSoup
 
+from services.settings import provider_url
+
 # ScrapingDog integration
 try:
     from mcp_servers.scrapingdog_amazon_server import ScrapingDogAmazonServer
@@ -31,9 +33,12 @@ logger = logging.getLogger(__name__)
 class AmazonAffiliateMCPServer:
     """Amazon Affiliate MCP Server - handles the actual Amazon API interactions"""
     
-    def __init__(self, associate_id: str, config: Dict[str, Any]):
+    def __init__(self, associate_id: str, config: Dict[str, Any], clients=None):
         self.associate_id = associate_id
         self.config = config
+        self.amazon_url = provider_url(config, 'amazon')
+        # With a ClientRegistry the HTTP clients are shared and closed by the registry
+        self.clients = clients
         
         # Rate limiting for Amazon searches
         self.last_request_time = 0
@@ -41,7 +46,7 @@ class AmazonAffiliateMCPServer:
         self.max_delay = 5  # Maximum 5 seconds between requests
         
         # HTTP client with proper headers to avoid blocking
-        self.client = httpx.AsyncClient(
+        client_options = dict(
             headers={
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
                 'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -58,12 +63,20 @@ class AmazonAffiliateMCPServer:
             timeout=30.0,
             follow_redirects=True
         )
+        if clients:
+            self.client = clients.http('amazon', **client_options)
+        else:
+            self.client = httpx.AsyncClient(**client_options)
         
         # Initialize ScrapingDog if available
         self.scrapingdog = None
         if SCRAPINGDOG_AVAILABLE and config.get('scrapingdog_api_key'):
             try:
-                self.scrapingdog = ScrapingDogAmazonServer(config)
+                self.scrapingdog = ScrapingDogAmazonServer(
+                    config,
+                    client=clients.http('scrapingdog', timeout=60.0) if clients else None,
+                    ledger=clients.ledger if clients else None
+                )
                 logger.info("✅ ScrapingDog enabled for Amazon searches")
             except Exception as e:
                 logger.warning(f"Failed to initialize ScrapingDog: {e}")
@@ -138,7 +151,7 @@ class AmazonAffiliateMCPServer:
             encoded_query = quote_plus(search_query)
             
             # Amazon search URL
-            search_url = f"https://www.amazon.com/s?k={encoded_query}&ref=nb_sb_noss"
+            search_url = f"{self.amazon_url}/s?k={encoded_query}&ref=nb_sb_noss"
             
             logger.info(f"Searching Amazon for: '{search_query}' (from: {product_title})")
             
@@ -325,7 +338,10 @@ class AmazonAffiliateMCPServer:
 
     async def close(self):
         """Clean up resources"""
-        await self.client.aclose()
+        if self.scrapingdog:
+            await self.scrapingdog.close()
+        if not self.clients:
+            await self.client.aclose()
 
 # Test function
 async def test_server():
@@ -1,11 +1,12 @@
 import asyncio
 import json
-from anthropic import Anthropic
+from anthropic import AsyncAnthropic
 from typing import Dict, List, Optional
 
 class ContentGenerationMCPServer:
-    def __init__(self, anthropic_api_key: str):
-        self.client = Anthropic(api_key=anthropic_api_key)
+    def __init__(self, anthropic_api_key: str, client: AsyncAnthropic = None):
+        # Pass a shared client to reuse its connection pool
+        self.client = client or AsyncAnthropic(api_key=anthropic_api_key)
         
     async def generate_seo_keywords(self, title: str, product_category: str) -> List[str]:
         """Generate SEO keywords for YouTube/TikTok optimization"""
@@ -23,8 +24,7 @@ class ContentGenerationMCPServer:
             Return as a simple comma-separated list.
             """
             
-            # Remove await - Anthropic client is sync
-            response = self.client.messages.create(
+            response = await self.client.messages.create(
                 model="claude-3-5-sonnet-20241022",
                 max_tokens=500,
                 messages=[{"role": "user", "content": prompt}]
@@ -61,8 +61,7 @@ class ContentGenerationMCPServer:
             Return only the optimized title, nothing else.
             """
             
-            # Remove await - Anthropic client is sync
-            response = self.client.messages.create(
+            response = await self.client.messages.create(
                 model="claude-3-5-sonnet-20241022",
                 max_tokens=200,
                 messages=[{"role": "user", "content": prompt}]
@@ -123,8 +122,7 @@ class ContentGenerationMCPServer:
             }}
             """
             
-            # Remove await - Anthropic client is sync
-            response = self.client.messages.create(
+            response = await self.client.messages.create(
                 model="claude-3-5-sonnet-20241022",
                 max_tokens=2000,
                 messages=[{"role": "user", "content": prompt}]
@@ -181,8 +179,7 @@ class ContentGenerationMCPServer:
             5. Conclusion with video CTA
             """
             
-            # Remove await - Anthropic client is sync
-            response = self.client.messages.create(
+            response = await self.client.messages.create(
                 model="claude-3-5-sonnet-20241022",
                 max_tokens=3000,
                 messages=[{"role": "user", "content": prompt}]
@@ -199,8 +196,8 @@ class ContentGenerationMCPServer:
 # Test the server
 async def test_content_generation():
     # Load config
-    with open('/app/config/api_keys.json', 'r') as f:
-        config = json.load(f)
+    from services.settings import load_config
+    config = load_config()
     
     # Initialize server
     server = ContentGenerationMCPServer(
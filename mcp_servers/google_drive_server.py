@@ -3,13 +3,21 @@ import json
 import io
 import base64
 from typing import Dict, List, Optional
+import google_auth_httplib2
+import httplib2
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseUpload
+from googleapiclient.http import HttpRequest, MediaIoBaseUpload
 from google.oauth2.service_account import Credentials
 
+from services.settings import rebase_url
+
 class GoogleDriveMCPServer:
-    def __init__(self, credentials_path: str):
+    def __init__(self, credentials_path: str, api_root: str = None, http_factory=None):
         self.credentials_path = credentials_path
+        # Send every request to this root instead of Google's (e.g. a local stand-in)
+        self.api_root = api_root
+        # Makes the httplib2.Http each request goes through (e.g. a timed one)
+        self.http_factory = http_factory or httplib2.Http
         self.service = None
         self.parent_folder_id = None
         
@@ -20,7 +28,14 @@ class GoogleDriveMCPServer:
                 self.credentials_path,
                 scopes=['https://www.googleapis.com/auth/drive']
             )
-            self.service = build('drive', 'v3', credentials=creds)
+            def build_request(http, postproc, uri, *args, **kwargs):
+                if self.api_root:
+                    uri = rebase_url(uri, self.api_root)
+                # httplib2 is not thread-safe; a connection per request lets one service serve several threads
+                return HttpRequest(google_auth_httplib2.AuthorizedHttp(creds, http=self.http_factory()), postproc, uri,
+                                   *args, **kwargs)
+
+            self.service = build('drive', 'v3', credentials=creds, requestBuilder=build_request)
             print("✅ Google Drive service initialized")
             return True
         except Exception as e:
@@ -34,7 +49,8 @@ class GoogleDriveMCPServer:
             if parent_id:
                 query += f" and '{parent_id}' in parents"
             
-            results = self.service.files().list(q=query).execute()
+            # The Drive client is blocking; in a thread it leaves the loop to the other records
+            results = await asyncio.to_thread(self.service.files().list(q=query).execute)
             items = results.get('files', [])
             
             if items:
@@ -48,7 +64,7 @@ class GoogleDriveMCPServer:
             if parent_id:
                 folder_metadata['parents'] = [parent_id]
             
-            folder = self.service.files().create(body=folder_metadata).execute()
+            folder = await asyncio.to_thread(self.service.files().create(body=folder_metadata).execute)
             print(f"📁 Created new folder: {folder_name}")
             return folder.get('id')
             
@@ -72,8 +88,9 @@ class GoogleDriveMCPServer:
             folder_ids['project'] = video_folder_id
             
             subfolders = ['Video', 'Photos', 'Audio']
-            for subfolder in subfolders:
-                subfolder_id = await self.find_or_create_folder(subfolder, video_folder_id)
+            subfolder_ids = await asyncio.gather(
+                *(self.find_or_create_folder(subfolder, video_folder_id) for subfolder in subfolders))
+            for subfolder, subfolder_id in zip(subfolders, subfolder_ids):
                 if subfolder_id:
                     folder_ids[subfolder.lower()] = subfolder_id
             
@@ -101,18 +118,18 @@ class GoogleDriveMCPServer:
                 resumable=True
             )
             
-            file = self.service.files().create(
+            file = await asyncio.to_thread(self.service.files().create(
                 body=file_metadata,
                 media_body=media
-            ).execute()
+            ).execute)
             
             file_id = file.get('id')
-            self.service.permissions().create(
+            await asyncio.to_thread(self.service.permissions().create(
                 fileId=file_id,
                 body={'role': 'reader', 'type': 'anyone'}
-            ).execute()
+            ).execute)
             
-            file_info = self.service.files().get(fileId=file_id, fields='webViewLink').execute()
+            file_info = await asyncio.to_thread(self.service.files().get(fileId=file_id, fields='webViewLink').execute)
             link = file_info.get('webViewLink')
             
             print(f"✅ Uploaded audio: {filename}")
@@ -123,8 +123,8 @@ CRITICAL INSTRUCTIONS:
             )
 # Test the server
 async def test_image_generation():
-    with open('/app/config/api_keys.json', 'r') as f:
-        config = json.load(f)
+    from services.settings import load_config
+    config = load_config()
     
     server = ImageGenerationMCPServer(config['openai_api_key'])
     
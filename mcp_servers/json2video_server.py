@@ -9,17 +9,28 @@ from datetime import datetime
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Bump whenever build_test_video_template changes the movie it produces, so cached renders are redone
+TEMPLATE_VERSION = 1
+
 class JSON2VideoMCPServer:
     """JSON2Video MCP Server for video creation"""
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, clients=None, base_url: str = "https://api.json2video.com/v2",
+                 poll_interval: float = 5.0):
         self.api_key = api_key
-        self.base_url = "https://api.json2video.com/v2"
+        self.base_url = base_url
+        # Seconds between render status checks
+        self.poll_interval = poll_interval
         self.headers = {
             "x-api-key": self.api_key,
             "Content-Type": "application/json"
         }
-        self.client = httpx.AsyncClient(timeout=60.0, headers=self.headers)
+        # With a ClientRegistry the client is shared and closed by the registry
+        self.clients = clients
+        if clients:
+            self.client = clients.http('json2video', timeout=60.0, headers=self.headers)
+        else:
+            self.client = httpx.AsyncClient(timeout=60.0, headers=self.headers)
     
     def build_test_video_template(self, record_data: Dict) -> tuple:
         """Build minimal test video: 8 seconds total"""
@@ -140,6 +151,9 @@ class JSON2VideoMCPServer:
                 
                 # The response should contain a project ID
                 project_id = result.get('project', '')
+                # An accepted movie uses a render credit whether or not we wait for it
+                if self.clients and self.clients.ledger:
+                    await self.clients.ledger.charge('json2video', 1)
                 
                 logger.info(f"✅ Video creation started. Project ID: {project_id}")
                 logger.info(f"📊 Response: {json.dumps(result, indent=2)}")
@@ -174,12 +188,17 @@ class JSON2VideoMCPServer:
                 'error': str(e)
             }
     
-    async def wait_for_video(self, project_id: str, max_attempts: int = 60) -> Optional[str]:
-        """Poll for video completion using project ID"""
+    async def wait_for_video(self, project_id: str, max_attempts: int = 60,
+                             poll_interval: float = None) -> Optional[str]:
+        """
+        Poll for video completion using project ID.
+        Cancelling the caller (e.g. a stage deadline) stops the polling at the next await.
+        """
         
+        poll_interval = self.poll_interval if poll_interval is None else poll_interval
         for attempt in range(max_attempts):
             try:
-                await asyncio.sleep(5)  # Wait 5 seconds between checks
+                await asyncio.sleep(poll_interval)  # Wait between checks
                 
                 # Check status using project parameter
                 response = await self.client.get(
@@ -213,7 +232,8 @@ class JSON2VideoMCPServer:
     
     async def close(self):
         """Close the HTTP client"""
-        await self.client.aclose()
+        if not self.clients:
+            await self.client.aclose()
 
 # MCP integration functions
 async def run_json2video_generation(config: Dict, record_id: str) -> Dict:
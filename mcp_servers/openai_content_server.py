@@ -61,8 +61,8 @@ class OpenAIContentGenerationServer:
 
 # Test function
 async def test_openai_content():
-    with open('/app/config/api_keys.json', 'r') as f:
-        config = json.load(f)
+    from services.settings import load_config
+    config = load_config()
     
     server = OpenAIContentGenerationServer(config['openai_api_key'])
     
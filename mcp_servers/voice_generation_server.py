@@ -5,9 +5,14 @@ import base64
 from typing import Dict, List, Optional
 
 class VoiceGenerationMCPServer:
-    def __init__(self, elevenlabs_api_key: str):
+    def __init__(self, elevenlabs_api_key: str, ledger=None, base_url: str = "https://api.elevenlabs.io/v1",
+                 session: requests.Session = None):
         self.api_key = elevenlabs_api_key
-        self.base_url = "https://api.elevenlabs.io/v1"
+        # Keep-alive session; a shared (timed) one comes from the client registry
+        self.session = session or requests.Session()
+        # QuotaLedger that counts the characters each request uses
+        self.ledger = ledger
+        self.base_url = base_url
         self.headers = {
             "Accept": "audio/mpeg",
             "Content-Type": "application/json",
@@ -42,9 +47,11 @@ class VoiceGenerationMCPServer:
             
             print(f"🎵 Generating {voice_type} voice: {text[:50]}...")
             
-            response = requests.post(url, json=data, headers=self.headers)
+            response = self.session.post(url, json=data, headers=self.headers)
             
             if response.status_code == 200:
+                if self.ledger:
+                    await self.ledger.charge('elevenlabs', len(text))
                 # Convert audio to base64 for storage
                 audio_base64 = base64.b64encode(response.content).decode()
                 print(f"✅ Generated {voice_type} voice ({len(audio_base64)} chars)")
@@ -74,8 +81,8 @@ class VoiceGenerationMCPServer:
 
 # Test the server
 async def test_voice_generation():
-    with open('/app/config/api_keys.json', 'r') as f:
-        config = json.load(f)
+    from services.settings import load_config
+    config = load_config()
     
     server = VoiceGenerationMCPServer(config['elevenlabs_api_key'])
     
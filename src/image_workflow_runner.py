@@ -4,12 +4,12 @@ import sys
 sys.path.append('/app')
 
 from mcp_servers.airtable_server import AirtableMCPServer
+from services.settings import load_config
 from mcp_servers.image_generation_server import ImageGenerationMCPServer
 
 class ImageGenerationOrchestrator:
     def __init__(self):
-        with open('/app/config/api_keys.json', 'r') as f:
-            self.config = json.load(f)
+        self.config = load_config()
         
         self.airtable_server = AirtableMCPServer(
             api_key=self.config['airtable_api_key'],
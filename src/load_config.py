@@ -1,11 +1,10 @@
 #!/usr/bin/env python3
-import json
 import os
 import sys
 
-config_path = "/app/config/api_keys.json"
-with open(config_path, 'r') as f:
-    config = json.load(f)
+from services.settings import load_config
+
+config = load_config()
 
 # Set environment variables
 os.environ["OPENAI_API_KEY"] = config.get("openai_api_key", "")
@@ -22,32 +22,40 @@ from mcp_servers.amazon_affiliate_server import AmazonAffiliateMCPServer
 class AmazonAffiliateAgentMCP:
     """Controls the Amazon affiliate link generation workflow logic"""
 
-    def __init__(self, config: dict):
+    def __init__(self, config: dict, clients=None):
         self.config = config
 
         # Initialize your existing MCP servers (following your pattern)
-        self.airtable_server = AirtableMCPServer(
-            api_key=config['airtable_api_key'],
-            base_id=config['airtable_base_id'],
-            table_name=config['airtable_table_name']
-        )
+        if clients:
+            self.airtable_server = clients.airtable()
+        else:
+            self.airtable_server = AirtableMCPServer(
+                api_key=config['airtable_api_key'],
+                base_id=config['airtable_base_id'],
+                table_name=config['airtable_table_name']
+            )
 
         # Initialize the new Amazon Affiliate MCP Server
         self.amazon_server = AmazonAffiliateMCPServer(
             associate_id=config.get('amazon_associate_id', 'reviewch3kr0d-20'),
-            config=config
+            config=config,
+            clients=clients
         )
 
-    async def check_and_generate_affiliate_links(self, record_id: str) -> Dict:
+    async def check_and_generate_affiliate_links(self, record_id: str, record_context=None) -> Dict:
         """
         Main entry point - checks if product titles exist and generates affiliate links
         This runs after content generation creates ProductNo1Title, ProductNo2Title, etc.
+        With a record_context the record is not fetched again and links are buffered in it
         """
         try:
             print(f"🔗 Checking affiliate links for record: {record_id}")
 
             # Get record from Airtable
-            record = await self.airtable_server.get_record_by_id(record_id)
+            if record_context:
+                record = {'id': record_id, 'fields': record_context.fields}
+            else:
+                record = await self.airtable_server.get_record_by_id(record_id)
 
             if not record:
                 return {
@@ -86,10 +94,13 @@ class AmazonAffiliateAgentMCP:
 
             # Update Airtable with the generated affiliate links
             if affiliate_results['affiliate_links']:
-                await self.airtable_server.update_record(
-                    record_id, 
-                    affiliate_results['affiliate_links']
-                )
+                if record_context:
+                    record_context.update(affiliate_results['affiliate_links'])
+                else:
+                    await self.airtable_server.update_record(
+                        record_id, 
+                        affiliate_results['affiliate_links']
+                    )
                 print(f"✅ Updated Airtable with {len(affiliate_results['affiliate_links'])} affiliate links")
 
             return {
@@ -113,15 +124,16 @@ class AmazonAffiliateAgentMCP:
         await self.amazon_server.close()
 
 # Integration function for workflow_runner.py
-async def run_amazon_affiliate_generation(config: dict, record_id: str) -> Dict:
+async def run_amazon_affiliate_generation(config: dict, record_id: str, record_context=None,
+                                          clients=None) -> Dict:
     """
     Entry point function for workflow_runner.py integration
     This follows the same pattern as your other MCP integrations
     """
     print(f"🔗 Starting Amazon affiliate link generation for record: {record_id}")
     
-    affiliate_agent = AmazonAffiliateAgentMCP(config)
-    result = await affiliate_agent.check_and_generate_affiliate_links(record_id)
+    affiliate_agent = AmazonAffiliateAgentMCP(config, clients)
+    result = await affiliate_agent.check_and_generate_affiliate_links(record_id, record_context)
     await affiliate_agent.close()
     
     print(f"🎯 Amazon affiliate generation completed for {record_id}")
@@ -133,8 +145,8 @@ async def test_affiliate_generation():
     print("🧪 Testing Amazon Affiliate MCP structure...")
     
     # Load config
-    with open('/home/claude-workflow/config/api_keys.json', 'r') as f:
-        config = json.load(f)
+    from services.settings import load_config
+    config = load_config()
 
     print(f"✅ Config loaded: Amazon Associate ID = {config.get('amazon_associate_id')}")
     print("✅ MCP Agent structure is correct")
@@ -16,7 +16,7 @@ class GoogleDriveAgentMCP:
     
     def __init__(self, config: dict):
         self.config = config
-        self.drive_server = GoogleDriveMCPServer('/home/claude-workflow/config/google_drive_credentials.json')
+        self.drive_server = GoogleDriveMCPServer(config['google_drive_credentials'])
         
 
     def _clean_folder_name(self, name: str) -> str:
@@ -33,20 +33,27 @@ class GoogleDriveAgentMCP:
         """Initialize the Google Drive service"""
         return await self.drive_server.initialize_drive_service()
     
-    async def upload_video_to_drive(self, video_url: str, video_title: str, record_id: str) -> Dict:
-        """Download video from JSON2Video and upload to Google Drive"""
+    async def upload_video_to_drive(self, video_url: str, video_title: str, record_id: str,
+                                    local_path: str = None) -> Dict:
+        """
+        Download video from JSON2Video and upload to Google Drive.
+        With local_path the already downloaded file is uploaded instead.
+        """
         try:
-            logger.info(f"📥 Downloading video from: {video_url}")
-            
-            # Download the video
-            async with httpx.AsyncClient(timeout=300.0) as client:
-                response = await client.get(video_url)
-                if response.status_code != 200:
-                    raise Exception(f"Failed to download video: {response.status_code}")
+            if local_path:
+                video_data = None
+            else:
+                logger.info(f"📥 Downloading video from: {video_url}")
                 
-                video_data = response.content
-            
-            logger.info(f"✅ Downloaded video ({len(video_data) / 1024 / 1024:.2f} MB)")
+                # Download the video
+                async with httpx.AsyncClient(timeout=300.0) as client:
+                    response = await client.get(video_url)
+                    if response.status_code != 200:
+                        raise Exception(f"Failed to download video: {response.status_code}")
+                    
+                    video_data = response.content
+                
+                logger.info(f"✅ Downloaded video ({len(video_data) / 1024 / 1024:.2f} MB)")
             
             # Create project structure in Google Drive
             folder_ids = await self.drive_server.create_project_structure(video_title)
@@ -56,39 +63,42 @@ class GoogleDriveAgentMCP:
             # Upload video to Google Drive
             logger.info(f"📤 Uploading video to Google Drive...")
             
-            # Create a file-like object from the video data
-            video_stream = io.BytesIO(video_data)
-            
             # Upload using the service directly (we need to add this method)
             file_metadata = {
                 'name': f"{video_title}.mp4",
                 'parents': [folder_ids['video']]
             }
             
-            from googleapiclient.http import MediaIoBaseUpload
-            media = MediaIoBaseUpload(
-                video_stream,
-                mimetype='video/mp4',
-                resumable=True
-            )
-            
-            file = self.drive_server.service.files().create(
+            from googleapiclient.http import MediaFileUpload, MediaIoBaseUpload
+            if local_path:
+                # Streams from disk, so the video never has to fit in memory
+                media = MediaFileUpload(local_path, mimetype='video/mp4', resumable=True)
+            else:
+                # Create a file-like object from the video data
+                media = MediaIoBaseUpload(
+                    io.BytesIO(video_data),
+                    mimetype='video/mp4',
+                    resumable=True
+                )
+            
+            # The Drive client is blocking; threads let the other publish targets run meanwhile
+            file = await asyncio.to_thread(self.drive_server.service.files().create(
                 body=file_metadata,
                 media_body=media
-            ).execute()
+            ).execute)
             
             # Make it publicly accessible
             file_id = file.get('id')
-            self.drive_server.service.permissions().create(
+            await asyncio.to_thread(self.drive_server.service.permissions().create(
                 fileId=file_id,
                 body={'role': 'reader', 'type': 'anyone'}
-            ).execute()
+            ).execute)
             
             # Get the shareable link
-            file_info = self.drive_server.service.files().get(
+            file_info = await asyncio.to_thread(self.drive_server.service.files().get(
                 fileId=file_id, 
                 fields='webViewLink'
-            ).execute()
+            ).execute)
             
             drive_url = file_info.get('webViewLink')
             
@@ -109,19 +119,25 @@ class GoogleDriveAgentMCP:
             }
 
 # Integration function
-async def upload_video_to_google_drive(config: Dict, video_url: str, video_title: str, record_id: str) -> Dict:
+async def upload_video_to_google_drive(config: Dict, video_url: str, video_title: str, record_id: str,
+                                       local_path: str = None, clients=None) -> Dict:
     """Upload video to Google Drive"""
     agent = GoogleDriveAgentMCP(config)
     
-    # Initialize Google Drive service
-    if not await agent.initialize():
+    # Initialize Google Drive service (once per process when a ClientRegistry is passed)
+    if clients:
+        agent.drive_server = await clients.drive()
+        initialized = agent.drive_server is not None
+    else:
+        initialized = await agent.initialize()
+    if not initialized:
         return {
             'success': False,
             'error': 'Failed to initialize Google Drive service'
         }
     
     # Upload the video
-    return await agent.upload_video_to_drive(video_url, video_title, record_id)
+    return await agent.upload_video_to_drive(video_url, video_title, record_id, local_path)
     async def create_project_folder_structure(self, n8n_folder_name: str, project_folder_name: str, include_affiliate_photos: bool = False) -> Dict:
         """Create the folder structure: /N8N Projects/[Project Name]/Affiliate Photos/"""
         try:
@@ -129,7 +145,7 @@ async def upload_video_to_google_drive(config: Dict, video_url: str, video_title
             
             # Find or create N8N Projects folder
             n8n_query = f"name='{n8n_folder_name}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
-            n8n_results = service.files().list(q=n8n_query, fields="files(id, name)").execute()
+            n8n_results = await asyncio.to_thread(service.files().list(q=n8n_query, fields="files(id, name)").execute)
             n8n_items = n8n_results.get('files', [])
             
             if n8n_items:
@@ -139,14 +155,14 @@ async def upload_video_to_google_drive(config: Dict, video_url: str, video_title
                     'name': n8n_folder_name,
                     'mimeType': 'application/vnd.google-apps.folder'
                 }
-                n8n_folder = service.files().create(body=n8n_folder_metadata, fields='id').execute()
+                n8n_folder = await asyncio.to_thread(service.files().create(body=n8n_folder_metadata, fields='id').execute)
                 n8n_folder_id = n8n_folder.get('id')
                 logger.info(f"📁 Created folder: {n8n_folder_name}")
             
             # Create project folder
             project_folder_name_clean = self._clean_folder_name(project_folder_name)
             project_query = f"name='{project_folder_name_clean}' and '{n8n_folder_id}' in parents and mimeType='application/vnd.google-apps.folder' and trashed=false"
-            project_results = service.files().list(q=project_query, fields="files(id, name)").execute()
+            project_results = await asyncio.to_thread(service.files().list(q=project_query, fields="files(id, name)").execute)
             project_items = project_results.get('files', [])
             
             if project_items:
@@ -157,7 +173,7 @@ async def upload_video_to_google_drive(config: Dict, video_url: str, video_title
                     'mimeType': 'application/vnd.google-apps.folder',
                     'parents': [n8n_folder_id]
                 }
-                project_folder = service.files().create(body=project_folder_metadata, fields='id').execute()
+                project_folder = await asyncio.to_thread(service.files().create(body=project_folder_metadata, fields='id').execute)
                 project_folder_id = project_folder.get('id')
                 logger.info(f"📁 Created folder: {project_folder_name_clean}")
             
@@ -169,7 +185,7 @@ async def upload_video_to_google_drive(config: Dict, video_url: str, video_title
             if include_affiliate_photos:
                 # Create Affiliate Photos subfolder
                 affiliate_query = f"name='Affiliate Photos' and '{project_folder_id}' in parents and mimeType='application/vnd.google-apps.folder' and trashed=false"
-                affiliate_results = service.files().list(q=affiliate_query, fields="files(id, name)").execute()
+                affiliate_results = await asyncio.to_thread(service.files().list(q=affiliate_query, fields="files(id, name)").execute)
                 affiliate_items = affiliate_results.get('files', [])
                 
                 if affiliate_items:
@@ -180,7 +196,7 @@ async def upload_video_to_google_drive(config: Dict, video_url: str, video_title
                         'mimeType': 'application/vnd.google-apps.folder',
                         'parents': [project_folder_id]
                     }
-                    affiliate_folder = service.files().create(body=affiliate_folder_metadata, fields='id').execute()
+                    affiliate_folder = await asyncio.to_thread(service.files().create(body=affiliate_folder_metadata, fields='id').execute)
                     affiliate_folder_id = affiliate_folder.get('id')
                     logger.info(f"📁 Created folder: Affiliate Photos")
                 
@@ -208,11 +224,11 @@ async def upload_video_to_google_drive(config: Dict, video_url: str, video_title
             from googleapiclient.http import MediaInMemoryUpload
             media = MediaInMemoryUpload(file_content, mimetype=mime_type)
             
-            file = service.files().create(
+            file = await asyncio.to_thread(service.files().create(
                 body=file_metadata,
                 media_body=media,
                 fields='id,webViewLink'
-            ).execute()
+            ).execute)
             
             logger.info(f"✅ Uploaded file: {filename}")
             return file
@@ -18,33 +18,43 @@ sys.path.append('/home/claude-workflow')
 # Import your existing servers (following your pattern)
 from mcp_servers.airtable_server import AirtableMCPServer
 from mcp_servers.json2video_server import JSON2VideoMCPServer
+from services.settings import provider_url
 
 class JSON2VideoAgentMCP:
     """Controls the video creation workflow logic"""
 
-    def __init__(self, config: dict):
+    def __init__(self, config: dict, clients=None):
         self.config = config
 
         # Initialize your existing MCP servers (following your pattern)
-        self.airtable_server = AirtableMCPServer(
-            api_key=config['airtable_api_key'],
-            base_id=config['airtable_base_id'],
-            table_name=config['airtable_table_name']
-        )
+        if clients:
+            self.airtable_server = clients.airtable()
+        else:
+            self.airtable_server = AirtableMCPServer(
+                api_key=config['airtable_api_key'],
+                base_id=config['airtable_base_id'],
+                table_name=config['airtable_table_name']
+            )
 
         # Initialize the JSON2Video MCP Server
-        self.json2video_server = JSON2VideoMCPServer(config['json2video_api_key'])
+        self.json2video_server = JSON2VideoMCPServer(config['json2video_api_key'], clients,
+                                                     base_url=provider_url(config, 'json2video'),
+                                                     poll_interval=config.get('json2video_poll_interval', 5.0))
 
-    async def create_video_from_record(self, record_id: str) -> Dict:
+    async def create_video_from_record(self, record_id: str, record_context=None) -> Dict:
         """
         Main entry point - creates video from generated content
         This runs after content generation, affiliate links, images, and voice are ready
+        With a record_context the record is not fetched again and the status write is buffered
         """
         try:
             print(f"🎬 Starting video creation for record: {record_id}")
 
             # Get record from Airtable
-            record = await self.airtable_server.get_record_by_id(record_id)
+            if record_context:
+                record = {'id': record_id, 'fields': record_context.fields}
+            else:
+                record = await self.airtable_server.get_record_by_id(record_id)
 
             if not record:
                 return {
@@ -92,10 +102,13 @@ class JSON2VideoAgentMCP:
                 print(f"✅ Video creation started. Movie ID: {video_result['movie_id']}")
                 
                 # Update Airtable with movie ID (for tracking)
-                await self.airtable_server.update_record(
-                    record_id,
-                    {'Status': 'Processing'}
-                )
+                if record_context:
+                    record_context.update({'Status': 'Processing'})
+                else:
+                    await self.airtable_server.update_record(
+                        record_id,
+                        {'Status': 'Processing'}
+                    )
                 
                 return {
                     'success': True,
@@ -209,15 +222,15 @@ class JSON2VideoAgentMCP:
         await self.json2video_server.close()
 
 # Integration function for workflow_runner.py
-async def run_video_creation(config: dict, record_id: str) -> Dict:
+async def run_video_creation(config: dict, record_id: str, record_context=None, clients=None) -> Dict:
     """
     Entry point function for workflow_runner.py integration
     This follows the same pattern as your other MCP integrations
     """
     print(f"🎬 Starting video creation for record: {record_id}")
     
-    video_agent = JSON2VideoAgentMCP(config)
-    result = await video_agent.create_video_from_record(record_id)
+    video_agent = JSON2VideoAgentMCP(config, clients)
+    result = await video_agent.create_video_from_record(record_id, record_context)
     await video_agent.close()
     
     print(f"🎯 Video creation completed for {record_id}")
@@ -229,8 +242,8 @@ async def test_video_agent():
     print("🧪 Testing JSON2Video MCP Agent structure...")
     
     # Load config
-    with open('/home/claude-workflow/config/api_keys.json', 'r') as f:
-        config = json.load(f)
+    from services.settings import load_config
+    config = load_config()
 
     print(f"✅ Config loaded: JSON2Video API key configured")
     print("✅ Video Agent structure is correct")
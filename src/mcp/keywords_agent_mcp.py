@@ -18,6 +18,7 @@ sys.path.append('/home/claude-workflow')
 # Import your existing servers
 from mcp_servers.airtable_server import AirtableMCPServer
 from mcp_servers.content_generation_server import ContentGenerationMCPServer
+from services.category_scheduler import CategoryScheduler
 
 class ControlKeywordsAgentMCP:
     """Controls the keyword generation workflow logic"""
@@ -35,6 +36,9 @@ class ControlKeywordsAgentMCP:
         self.content_server = ContentGenerationMCPServer(
             anthropic_api_key=config['anthropic_api_key']
         )
+
+        # Picks categories by weight and backlog instead of walking them in a fixed order
+        self.category_scheduler = CategoryScheduler.from_config(config)
     
     async def check_and_process_keywords(self, record_id: str) -> Dict:
         """
@@ -112,7 +116,7 @@ class ControlKeywordsAgentMCP:
     
     async def process_category_batch(self, category: str) -> Dict:
         """
-        Process all records in a specific category
+        Process up to one batch (category_batch_size) of records in a specific category
         Implements the "Send next Product Category" logic from diagram
         """
         print(f"🔄 Processing category batch: {category}")
@@ -121,12 +125,12 @@ class ControlKeywordsAgentMCP:
             # Get all records for this category
             all_records = await self.airtable_server.get_all_records()
             
-            # Filter by category and missing keywords
+            # Filter by category and missing keywords, oldest first, one batch at a time
             records_to_process = [
                 r for r in all_records 
-                if r.get('Category') == category 
-                and not r.get('SEO Keywords')
-            ]
+                if CategoryScheduler.category_of(r) == category 
+                and not r.get('fields', r).get('SEO Keywords')
+            ][:self.category_scheduler.batch_size]
             
             results = {
                 'category': category,
@@ -179,36 +183,17 @@ class ControlKeywordsAgentMCP:
     async def _get_next_category(self, current_category: str) -> Optional[str]:
         """
         Determine the next category to process
-        Based on your specific category order
+        Drawn by category weight and by how many records still lack keywords; None when done
         """
-        # Define your category processing order
-        category_order = [
-            "Electronics",
-            "Fashion",
-            "Home & Garden",
-            "Beauty",
-            "Sports & Outdoors",
-            "Toys & Games",
-            "Food & Beverage",
-            "Other"
-        ]
-        
-        try:
-            current_index = category_order.index(current_category)
-            if current_index < len(category_order) - 1:
-                return category_order[current_index + 1]
-        except ValueError:
-            # Current category not in list
-            pass
-        
-        return None
+        records = await self.get_records_without_keywords()
+        return self.category_scheduler.next_batch(CategoryScheduler.backlog(records))
     
     async def get_records_without_keywords(self) -> List[Dict]:
         """Get all records that don't have keywords yet"""
         all_records = await self.airtable_server.get_all_records()
         return [
             r for r in all_records 
-            if not r.get('SEO Keywords') and r.get('Title')
+            if not r.get('fields', r).get('SEO Keywords') and r.get('fields', r).get('Title')
         ]
     
     async def process_all_pending_keywords(self) -> Dict:
@@ -262,8 +247,8 @@ class ControlKeywordsAgentMCP:
 async def test_keywords_agent():
     """Test the Keywords Agent"""
     # Load configuration
-    with open('/home/claude-workflow/config/api_keys.json', 'r') as f:
-        config = json.load(f)
+    from services.settings import load_config
+    config = load_config()
     
     agent = ControlKeywordsAgentMCP(config)
     
@@ -24,21 +24,27 @@ logger = logging.getLogger(__name__)
 class TextGenerationControlAgentMCP:
     """Agent with automatic regeneration loop"""
     
-    def __init__(self, config: Dict):
+    def __init__(self, config: Dict, clients=None):
         self.config = config
         self.control_server = TextGenerationControlMCPServer(config)
-        self.airtable_server = AirtableMCPServer(
-            api_key=config['airtable_api_key'],
-            base_id=config['airtable_base_id'],
-            table_name=config['airtable_table_name']
-        )
+        if clients:
+            self.airtable_server = clients.airtable()
+        else:
+            self.airtable_server = AirtableMCPServer(
+                api_key=config['airtable_api_key'],
+                base_id=config['airtable_base_id'],
+                table_name=config['airtable_table_name']
+            )
         self.content_server = ContentGenerationMCPServer(
-            anthropic_api_key=config['anthropic_api_key']
+            anthropic_api_key=config['anthropic_api_key'],
+            client=clients.anthropic() if clients else None
         )
         
-    async def control_validate_and_regenerate(self, record_id: str, max_attempts: int = 3) -> Dict:
+    async def control_validate_and_regenerate(self, record_id: str, max_attempts: int = 3,
+                                              record_context=None) -> Dict:
         """
         Control, validate, and automatically regenerate until all products are valid
+        With a record_context, fields are read from and written to it instead of Airtable
         """
         logger.info(f"🎮 Text Control Agent: Starting validation loop for record {record_id}")
         
@@ -50,7 +56,10 @@ class TextGenerationControlAgentMCP:
             logger.info(f"📝 Attempt {attempt}/{max_attempts}")
             
             # Get current record
-            record = await self.airtable_server.get_record_by_id(record_id)
+            if record_context:
+                record = {'id': record_id, 'fields': record_context.fields}
+            else:
+                record = await self.airtable_server.get_record_by_id(record_id)
             if not record:
                 return {'success': False, 'error': 'Record not found'}
             
@@ -82,7 +91,7 @@ class TextGenerationControlAgentMCP:
                 all_valid = True
                 logger.info("✅ All products passed validation!")
                 
-                await self.airtable_server.update_record(record_id, {
+                await self._write(record_id, record_context, {
                     'TextControlStatus': 'Validated',
                     'GenerationAttempts': attempt
                 })
@@ -104,14 +113,15 @@ class TextGenerationControlAgentMCP:
                     validation_result['products_needing_regeneration'],
                     keywords,
                     category,
-                    title
+                    title,
+                    record_context
                 )
                 
                 # Wait a bit before next validation
                 await asyncio.sleep(2)
         
         # Max attempts reached
-        await self.airtable_server.update_record(record_id, {
+        await self._write(record_id, record_context, {
             'TextControlStatus': 'Failed',
             'GenerationAttempts': attempt,
             'TextControlIssues': json.dumps(validation_result['products_needing_regeneration'])
@@ -130,7 +140,8 @@ class TextGenerationControlAgentMCP:
                                          invalid_products: List[Dict],
                                          keywords: List[str],
                                          category: str,
-                                         main_title: str) -> None:
+                                         main_title: str,
+                                         record_context=None) -> None:
         """
         Actually regenerate the invalid products
         """
@@ -178,15 +189,23 @@ Description: [Your description]"""
         
         # Update Airtable with regenerated products
         if update_fields:
-            await self.airtable_server.update_record(record_id, update_fields)
+            await self._write(record_id, record_context, update_fields)
             logger.info(f"✅ Updated {len(update_fields)//2} products in Airtable")
 
+    async def _write(self, record_id: str, record_context, fields: Dict) -> None:
+        """Buffer writes in the record context when there is one, else write straight to Airtable"""
+        if record_context:
+            record_context.update(fields)
+        else:
+            await self.airtable_server.update_record(record_id, fields)
+
 
 # Integration function for workflow
-async def run_text_control_with_regeneration(config: Dict, record_id: str) -> Dict:
+async def run_text_control_with_regeneration(config: Dict, record_id: str, record_context=None,
+                                             clients=None) -> Dict:
     """Run text control with automatic regeneration"""
-    agent = TextGenerationControlAgentMCP(config)
-    return await agent.control_validate_and_regenerate(record_id)
+    agent = TextGenerationControlAgentMCP(config, clients)
+    return await agent.control_validate_and_regenerate(record_id, record_context=record_context)
 
 
 if __name__ == "__main__":
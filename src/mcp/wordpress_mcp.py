@@ -11,11 +11,15 @@ logger = logging.getLogger(__name__)
 class WordPressMCP:
     """WordPress MCP for automated blog post creation"""
     
-    def __init__(self, config: Dict):
+    def __init__(self, config: Dict, session: requests.Session = None):
         self.base_url = config.get('wordpress_url', 'https://reviewch3kr.com')
         self.username = config.get('wordpress_user', '')
         self.password = config.get('wordpress_password', '')
         self.enabled = config.get('wordpress_enabled', True)
+        # Seconds per HTTP call; requests has no default and would wait forever
+        self.timeout = config.get('wordpress_timeout', 30)
+        # Keep-alive session; a shared (timed) one comes from the client registry
+        self.session = session or requests.Session()
         
         # Create auth header
         credentials = f"{self.username}:{self.password}"
@@ -54,10 +58,13 @@ class WordPressMCP:
                 'Content-Type': 'application/json'
             }
             
-            response = requests.post(
+            # Blocking call in a thread so a stage deadline can cancel it without stalling the loop
+            response = await asyncio.to_thread(
+                self.session.post,
                 self.posts_endpoint,
                 headers=headers,
-                json=post_data
+                json=post_data,
+                timeout=self.timeout
             )
             
             if response.status_code == 201:
@@ -141,9 +148,11 @@ class WordPressMCP:
         
         # First, try to get existing category
         headers = {'Authorization': self.auth_header}
-        response = requests.get(
+        response = await asyncio.to_thread(
+            self.session.get,
             f"{self.categories_endpoint}?search={category_name}",
-            headers=headers
+            headers=headers,
+            timeout=self.timeout
         )
         
         if response.status_code == 200:
@@ -157,13 +166,15 @@ class WordPressMCP:
             'slug': category_name.lower().replace(' ', '-')
         }
         
-        response = requests.post(
+        response = await asyncio.to_thread(
+            self.session.post,
             self.categories_endpoint,
             headers={
                 'Authorization': self.auth_header,
                 'Content-Type': 'application/json'
             },
-            json=category_data
+            json=category_data,
+            timeout=self.timeout
         )
         
         if response.status_code == 201:
@@ -1,23 +1,40 @@
 import os
+import asyncio
 import logging
 from typing import Dict, Optional
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+from googleapiclient.http import HttpRequest, MediaFileUpload
+import google_auth_httplib2
+import httplib2
 import httpx
 
+from services.settings import rebase_url
+
 logger = logging.getLogger(__name__)
 
 class YouTubeMCP:
     """YouTube upload MCP - fixed for headless servers"""
     
     SCOPES = ['https://www.googleapis.com/auth/youtube.upload']
+    # Upload in chunks so a cancelled stage stops between chunks instead of after the whole file
+    CHUNK_SIZE = 8 * 1024 * 1024
+    # Quota units the Data API charges for videos.insert
+    UPLOAD_UNITS = 1600
     
-    def __init__(self, credentials_path: str, token_path: str = None):
+    def __init__(self, credentials_path: str, token_path: str = None, download_timeout: float = 120.0,
+                 ledger=None, api_root: str = None, http_factory=None):
         self.credentials_path = credentials_path
+        # QuotaLedger that counts the units each upload uses
+        self.ledger = ledger
+        # Send every request to this root instead of Google's (e.g. a local stand-in)
+        self.api_root = api_root
+        # Makes the httplib2.Http each request goes through (e.g. a timed one)
+        self.http_factory = http_factory or httplib2.Http
         self.token_path = token_path or credentials_path.replace('credentials.json', 'token.json')
+        self.download_timeout = download_timeout
         self.youtube = None
         self._initialize_youtube()
     
@@ -46,13 +63,21 @@ class YouTubeMCP:
             else:
                 raise Exception("No YouTube authentication found. Please run: python3 youtube_auth_console.py")
         
-        self.youtube = build('youtube', 'v3', credentials=creds)
+        def build_request(http, postproc, uri, *args, **kwargs):
+            if self.api_root:
+                uri = rebase_url(uri, self.api_root)
+            # httplib2 is not thread-safe; a connection per request lets one client upload from several threads
+            return HttpRequest(google_auth_httplib2.AuthorizedHttp(creds, http=self.http_factory()), postproc, uri,
+                               *args, **kwargs)
+        
+        self.youtube = build('youtube', 'v3', credentials=creds, requestBuilder=build_request)
         logger.info("✅ YouTube API initialized")
     
     async def upload_video(self, video_path: str, title: str, description: str, 
                           tags: list = None, category_id: str = "22", 
                           privacy_status: str = "private") -> Dict:
         """Upload video to YouTube"""
+        local_path = None
         try:
             # Download if URL
             if video_path.startswith('http'):
@@ -77,7 +102,7 @@ class YouTubeMCP:
             
             # Upload
             logger.info(f"📤 Uploading: {title}")
-            media = MediaFileUpload(local_path, chunksize=-1, resumable=True, mimetype='video/mp4')
+            media = MediaFileUpload(local_path, chunksize=self.CHUNK_SIZE, resumable=True, mimetype='video/mp4')
             
             request = self.youtube.videos().insert(
                 part=','.join(body.keys()),
@@ -91,7 +116,8 @@ class YouTubeMCP:
             
             while response is None:
                 try:
-                    status, response = request.next_chunk()
+                    # The client is blocking; a thread keeps the event loop free while it sends
+                    status, response = await asyncio.to_thread(request.next_chunk)
                     if status:
                         progress = int(status.progress() * 100)
                         logger.info(f"📊 Upload progress: {progress}%")
@@ -103,14 +129,12 @@ class YouTubeMCP:
                     logger.warning(f"Retry {retry}/3: {e}")
             
             video_id = response['id']
+            if self.ledger:
+                await self.ledger.charge('youtube', self.UPLOAD_UNITS)
             video_url = f"https://www.youtube.com/watch?v={video_id}"
             
             logger.info(f"✅ Upload complete: {video_url}")
             
-            # Cleanup
-            if video_path.startswith('http') and os.path.exists(local_path):
-                os.remove(local_path)
-            
             return {
                 'success': True,
                 'video_id': video_id,
@@ -121,15 +145,26 @@ class YouTubeMCP:
         except Exception as e:
             logger.error(f"❌ Upload failed: {e}")
             return {'success': False, 'error': str(e)}
+        finally:
+            # Cleanup, also when the upload was cancelled
+            if local_path and local_path != video_path and os.path.exists(local_path):
+                os.remove(local_path)
     
     async def _download_video(self, url: str) -> str:
-        """Download video from URL to temp file"""
+        """Download video from URL to temp file, giving up after download_timeout seconds"""
         import tempfile
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, follow_redirects=True)
-            response.raise_for_status()
-            
-            with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as tmp:
-                tmp.write(response.content)
-                return tmp.name
+        timeout = httpx.Timeout(self.download_timeout, connect=10.0)
+        with tempfile.NamedTemporaryFile(suffix='.mp4', delete=False) as tmp:
+            try:
+                async with httpx.AsyncClient(timeout=timeout) as client:
+                    async with asyncio.timeout(self.download_timeout):
+                        async with client.stream('GET', url, follow_redirects=True) as response:
+                            response.raise_for_status()
+                            async for chunk in response.aiter_bytes():
+                                tmp.write(chunk)
+            except BaseException:
+                tmp.close()
+                os.remove(tmp.name)
+                raise
+            return tmp.name
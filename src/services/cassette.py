@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Cassette
+Records every outbound HTTP call (httpx, which the Anthropic SDK also uses, requests and
+googleapiclient's httplib2) with its timing during a real run, and plays them back in later
+runs so parser, text control and template changes can be compared without calling any provider
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import urllib.parse
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = 'calls.jsonl'
+BODY_DIR = 'bodies'
+
+# Query parameters that carry credentials are never written to disk
+SECRET_PARAMS = ('key', 'token', 'secret', 'password', 'signature')
+
+# Response headers that describe the wire encoding, not the body we store
+WIRE_HEADERS = {'content-encoding', 'transfer-encoding', 'content-length'}
+
+
+class CassetteMiss(Exception):
+    """A replayed run made a call the cassette has no recording of"""
+
+
+def redact_url(url: str) -> str:
+    """The URL with credential-like query values blanked; calls are matched on this form"""
+    parts = urllib.parse.urlsplit(url)
+    if not parts.query:
+        return url
+    query = [
+        (name, 'REDACTED' if any(secret in name.lower() for secret in SECRET_PARAMS) else value)
+        for name, value in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+    ]
+    return urllib.parse.urlunsplit(parts._replace(query=urllib.parse.urlencode(query)))
+
+
+def body_digest(body) -> Optional[str]:
+    """Hash of a request body; None for streamed bodies we cannot read without consuming"""
+    if body is None:
+        body = b''
+    if isinstance(body, str):
+        body = body.encode()
+    if not isinstance(body, (bytes, bytearray)):
+        return None
+    return hashlib.sha256(body).hexdigest()
+
+
+class Cassette:
+    """
+    A directory holding calls.jsonl (one line per call, in completion order) and the response
+    bodies under bodies/, stored once per distinct content.
+    In 'record' mode every call goes out and is written down. In 'replay' mode nothing goes out:
+    a call gets the next unused recording with the same method, URL and request body, or, when
+    the body differs (timestamps, multipart boundaries), with the same method and URL. Replies
+    wait `elapsed / speed` seconds, so speed 1 keeps the recorded latencies and 0 skips them.
+    """
+
+    def __init__(self, path: str, mode: str, speed: float = 0.0):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"Cassette mode must be 'record' or 'replay', not {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._patches = []
+        self._index = None
+        self._by_body: Dict[Tuple, deque] = {}
+        self._by_url: Dict[Tuple, deque] = {}
+        self.calls = 0
+
+        if mode == 'record':
+            os.makedirs(os.path.join(path, BODY_DIR), exist_ok=True)
+            self._index = open(os.path.join(path, INDEX_FILE), 'w')
+        else:
+            self._load()
+
+    def _load(self):
+        index = os.path.join(self.path, INDEX_FILE)
+        if not os.path.exists(index):
+            raise FileNotFoundError(f"No cassette at {self.path} (missing {INDEX_FILE})")
+        with open(index, 'r') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                entry['used'] = False
+                self._by_body.setdefault((entry['method'], entry['url'], entry['body_sha']), deque()).append(entry)
+                self._by_url.setdefault((entry['method'], entry['url']), deque()).append(entry)
+
+    # ---- storage ----
+
+    def _write(self, library: str, method: str, url: str, body, started: float,
+               status: int, headers: Dict[str, str], content: bytes):
+        digest = hashlib.sha256(content).hexdigest()
+        body_path = os.path.join(self.path, BODY_DIR, digest)
+        entry = {
+            'library': library,
+            'method': method.upper(),
+            'url': redact_url(url),
+            'body_sha': body_digest(body),
+            'status': status,
+            'headers': {k: v for k, v in headers.items() if k.lower() not in WIRE_HEADERS},
+            'content_sha': digest,
+            'at': round(started - self._started, 4),
+            'elapsed': round(time.monotonic() - started, 4),
+        }
+        with self._lock:
+            if not os.path.exists(body_path):
+                with open(body_path, 'wb') as f:
+                    f.write(content)
+            self._index.write(json.dumps(entry) + '\n')
+            # Flushed per call so an interrupted run still leaves a usable cassette
+            self._index.flush()
+            self.calls += 1
+
+    def _take(self, method: str, url: str, body) -> Tuple[Dict, bytes]:
+        method, url = method.upper(), redact_url(url)
+        with self._lock:
+            entry = None
+            for queue in (self._by_body.get((method, url, body_digest(body))), self._by_url.get((method, url))):
+                while queue and queue[0]['used']:
+                    queue.popleft()
+                if queue:
+                    entry = queue.popleft()
+                    break
+            if entry is None:
+                raise CassetteMiss(f"No recorded response left for {method} {url}")
+            entry['used'] = True
+            self.calls += 1
+        with open(os.path.join(self.path, BODY_DIR, entry['content_sha']), 'rb') as f:
+            return entry, f.read()
+
+    def _delay(self, entry: Dict) -> float:
+        return entry['elapsed'] / self.speed if self.speed else 0.0
+
+    # ---- library hooks ----
+
+    def install(self):
+        """Patch every HTTP library that is importable; returns self for chaining"""
+        for hook in (self._hook_httpx, self._hook_requests, self._hook_httplib2):
+            try:
+                hook()
+            except ImportError:
+                continue
+        verb = 'Recording' if self.mode == 'record' else 'Replaying'
+        logger.info(f"📼 {verb} HTTP calls {'to' if self.mode == 'record' else 'from'} {self.path}")
+        return self
+
+    def _patch(self, owner, name: str, replacement):
+        self._patches.append((owner, name, getattr(owner, name)))
+        setattr(owner, name, replacement)
+
+    def _hook_httpx(self):
+        import asyncio
+        import httpx
+
+        cassette = self
+        sync_send = httpx.HTTPTransport.handle_request
+        async_send = httpx.AsyncHTTPTransport.handle_async_request
+
+        def replayed(request, entry, content):
+            return httpx.Response(entry['status'], headers=entry['headers'], content=content, request=request)
+
+        def handle_request(transport, request):
+            body = request.read()
+            if cassette.mode == 'replay':
+                entry, content = cassette._take(request.method, str(request.url), body)
+                time.sleep(cassette._delay(entry))
+                return replayed(request, entry, content)
+            started = time.monotonic()
+            response = sync_send(transport, request)
+            try:
+                raw = b''.join(response.stream)
+            finally:
+                response.close()
+            content = httpx.Response(response.status_code, headers=response.headers, content=raw).read()
+            cassette._write('httpx', request.method, str(request.url), body, started,
+                            response.status_code, dict(response.headers), content)
+            return replayed(request, {'status': response.status_code,
+                                      'headers': {k: v for k, v in response.headers.items()
+                                                  if k.lower() not in WIRE_HEADERS}}, content)
+
+        async def handle_async_request(transport, request):
+            body = await request.aread()
+            if cassette.mode == 'replay':
+                entry, content = cassette._take(request.method, str(request.url), body)
+                await asyncio.sleep(cassette._delay(entry))
+                return replayed(request, entry, content)
+            started = time.monotonic()
+            response = await async_send(transport, request)
+            try:
+                raw = b''.join([chunk async for chunk in response.stream])
+            finally:
+                await response.aclose()
+            content = httpx.Response(response.status_code, headers=response.headers, content=raw).read()
+            cassette._write('httpx', request.method, str(request.url), body, started,
+                            response.status_code, dict(response.headers), content)
+            return replayed(request, {'status': response.status_code,
+                                      'headers': {k: v for k, v in response.headers.items()
+                                                  if k.lower() not in WIRE_HEADERS}}, content)
+
+        self._patch(httpx.HTTPTransport, 'handle_request', handle_request)
+        self._patch(httpx.AsyncHTTPTransport, 'handle_async_request', handle_async_request)
+
+    def _hook_requests(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from requests.structures import CaseInsensitiveDict
+        from requests.utils import get_encoding_from_headers
+
+        cassette = self
+        send = HTTPAdapter.send
+
+        def replayed(request, entry, content):
+            response = requests.Response()
+            response.status_code = entry['status']
+            response.headers = CaseInsensitiveDict(entry['headers'])
+            response.encoding = get_encoding_from_headers(response.headers)
+            response._content = content
+            response.url = request.url
+            response.request = request
+            return response
+
+        def patched_send(adapter, request, **kwargs):
+            if cassette.mode == 'replay':
+                entry, content = cassette._take(request.method, request.url, request.body)
+                time.sleep(cassette._delay(entry))
+                return replayed(request, entry, content)
+            started = time.monotonic()
+            response = send(adapter, request, **kwargs)
+            # Reading here decodes gzip and leaves the content cached for the caller
+            cassette._write('requests', request.method, request.url, request.body, started,
+                            response.status_code, dict(response.headers), response.content)
+            return response
+
+        self._patch(HTTPAdapter, 'send', patched_send)
+
+    def _hook_httplib2(self):
+        import httplib2
+
+        cassette = self
+        request = httplib2.Http.request
+
+        def patched_request(http, uri, method='GET', body=None, headers=None, *args, **kwargs):
+            if cassette.mode == 'replay':
+                entry, content = cassette._take(method, uri, body)
+                time.sleep(cassette._delay(entry))
+                return httplib2.Response(dict(entry['headers'], status=str(entry['status']))), content
+            started = time.monotonic()
+            response, content = request(http, uri, method, body, headers, *args, **kwargs)
+            headers_out = {k: v for k, v in response.items() if k != 'status' and not k.startswith('-')}
+            cassette._write('httplib2', method, uri, body, started, response.status, headers_out, content or b'')
+            return response, content
+
+        self._patch(httplib2.Http, 'request', patched_request)
+
+    def close(self):
+        """Undo the patches and, when recording, close the index"""
+        while self._patches:
+            owner, name, original = self._patches.pop()
+            setattr(owner, name, original)
+        if self._index:
+            self._index.close()
+            self._index = None
+        if self.mode == 'replay':
+            unused = sum(1 for queue in self._by_url.values() for entry in queue if not entry['used'])
+            if unused:
+                logger.info(f"📼 {unused} recorded calls were not replayed")
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Category Scheduler
+Decides which product category to work on next, by configured weight and by how many
+records each category has waiting, keeping same-category records together in batches
+"""
+
+import math
+from typing import Dict, Iterable, List, Optional
+
+# The order categories were historically walked in; it still breaks ties
+DEFAULT_CATEGORIES = [
+    "Electronics",
+    "Fashion",
+    "Home & Garden",
+    "Beauty",
+    "Sports & Outdoors",
+    "Toys & Games",
+    "Food & Beverage",
+    "Other"
+]
+
+# Records without a Category are scheduled under this one
+FALLBACK_CATEGORY = "Other"
+
+
+class CategoryScheduler:
+    """
+    Stride scheduling over categories. Each category's share is its weight times the square
+    root of its backlog, so big backlogs drain faster without shutting small ones out; a
+    category is charged per record served, and the one with the lowest charge goes next.
+    Once picked, a category keeps going for up to `batch_size` records so its caches
+    (ASIN lookups, Drive folders, prompt prefixes) stay warm.
+    """
+
+    def __init__(self, weights: Dict[str, float] = None, batch_size: int = 5,
+                 categories: List[str] = None):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.weights = dict(weights or {})
+        self.batch_size = batch_size
+        self.categories = list(categories or DEFAULT_CATEGORIES)
+        self.current: Optional[str] = None
+        self._left = 0
+        self._pass: Dict[str, float] = {}
+        self._clock = 0.0
+        self._share: Dict[str, float] = {}
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'CategoryScheduler':
+        """Built from the 'category_weights', 'category_batch_size' and 'categories' config keys"""
+        return cls(
+            weights=config.get('category_weights'),
+            batch_size=config.get('category_batch_size', 5),
+            categories=config.get('categories')
+        )
+
+    @staticmethod
+    def category_of(record: Dict) -> str:
+        """Category of a raw Airtable record"""
+        return record.get('fields', record).get('Category') or FALLBACK_CATEGORY
+
+    @classmethod
+    def backlog(cls, records: Iterable[Dict]) -> Dict[str, int]:
+        """Waiting records per category"""
+        counts: Dict[str, int] = {}
+        for record in records:
+            category = cls.category_of(record)
+            counts[category] = counts.get(category, 0) + 1
+        return counts
+
+    def _rank(self, category: str) -> int:
+        return self.categories.index(category) if category in self.categories else len(self.categories)
+
+    def _start(self, category: str) -> float:
+        # A category that had nothing waiting rejoins at the current clock instead of with banked credit
+        return max(self._pass.get(category, 0.0), self._clock)
+
+    def pick(self, backlog: Dict[str, int]) -> Optional[str]:
+        """Category to serve next, or None if nothing is waiting"""
+        waiting = [category for category, count in backlog.items() if count > 0]
+        if not waiting:
+            self.current = None
+            return None
+        for category in waiting:
+            self._share[category] = self.weights.get(category, 1.0) * math.sqrt(backlog[category])
+        if self.current in waiting and self._left > 0:
+            return self.current
+
+        # Categories with a weight of 0 only run when nothing else is waiting
+        eligible = [category for category in waiting if self._share[category] > 0] or waiting
+        self.current = min(eligible, key=lambda category: (self._start(category), self._rank(category)))
+        self._clock = self._start(self.current)
+        self._pass[self.current] = self._clock
+        self._left = self.batch_size
+        return self.current
+
+    def charge(self, category: str, count: int = 1):
+        """Account for `count` records of `category` having been served"""
+        share = self._share.get(category) or 1e-9
+        self._pass[category] = self._start(category) + count / share
+        if category == self.current:
+            self._left -= count
+
+    def finish_batch(self):
+        """End the current batch early, so the next pick considers every category"""
+        self._left = 0
+
+    def next_batch(self, backlog: Dict[str, int]) -> Optional[str]:
+        """Pick a category for a whole batch of up to batch_size records, charged up front"""
+        category = self.pick(backlog)
+        if category:
+            self.charge(category, min(self.batch_size, backlog[category]))
+            self.finish_batch()
+        return category
+
+    def order(self, records: List[Dict], limit: int = None) -> List[Dict]:
+        """
+        Reorder records into category batches in scheduling order, charging each one.
+        Within a category the original (oldest first) order is kept.
+        """
+        queues: Dict[str, List[Dict]] = {}
+        for record in records:
+            queues.setdefault(self.category_of(record), []).append(record)
+
+        ordered = []
+        limit = len(records) if limit is None else min(limit, len(records))
+        while len(ordered) < limit:
+            category = self.pick({name: len(queue) for name, queue in queues.items()})
+            ordered.append(queues[category].pop(0))
+            self.charge(category)
+        return ordered
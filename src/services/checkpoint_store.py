@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Checkpoint Store
+Keeps every finished stage output in a local SQLite file so a re-run resumes where the last one stopped
+and skips stages whose inputs have not changed since
+"""
+
+import json
+import logging
+import os
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointStore:
+    """Stage outputs keyed by record id and stage name"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                record_id TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                outputs TEXT NOT NULL,
+                input_hash TEXT,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (record_id, stage)
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS runs (
+                record_id TEXT PRIMARY KEY,
+                finished_at TEXT
+            )
+        """)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(checkpoints)")]
+        if 'input_hash' not in columns:
+            # Databases written before stage memoization
+            self.conn.execute("ALTER TABLE checkpoints ADD COLUMN input_hash TEXT")
+        self.conn.commit()
+
+    def load(self, record_id: str, stage: str, input_hash: str = None) -> Optional[Dict[str, Any]]:
+        """
+        Return the saved outputs of a stage, or None if it never finished.
+        With input_hash, outputs saved for different inputs count as missing.
+        """
+        row = self.conn.execute(
+            "SELECT outputs, input_hash FROM checkpoints WHERE record_id = ? AND stage = ?",
+            (record_id, stage)
+        ).fetchone()
+        if not row:
+            return None
+        # Rows saved without a hash predate memoization; trust them like before
+        if input_hash and row[1] and row[1] != input_hash:
+            return None
+        return json.loads(row[0])
+
+    def save(self, record_id: str, stage: str, outputs: Dict[str, Any], input_hash: str = None) -> None:
+        """Persist the outputs of a finished stage, with the hash of the inputs they came from"""
+        now = datetime.now().isoformat()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO checkpoints (record_id, stage, outputs, input_hash, updated_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (record_id, stage, json.dumps(outputs, default=str), input_hash, now)
+        )
+        self.conn.execute(
+            "INSERT INTO runs (record_id, finished_at) VALUES (?, NULL) "
+            "ON CONFLICT(record_id) DO UPDATE SET finished_at = NULL",
+            (record_id,)
+        )
+        self.conn.commit()
+
+    def completed_stages(self, record_id: str) -> List[str]:
+        """Names of the stages already checkpointed for a record"""
+        rows = self.conn.execute(
+            "SELECT stage FROM checkpoints WHERE record_id = ? ORDER BY updated_at",
+            (record_id,)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def mark_finished(self, record_id: str) -> None:
+        """Flag a record whose whole pipeline went through"""
+        self.conn.execute(
+            "INSERT INTO runs (record_id, finished_at) VALUES (?, ?) "
+            "ON CONFLICT(record_id) DO UPDATE SET finished_at = excluded.finished_at",
+            (record_id, datetime.now().isoformat())
+        )
+        self.conn.commit()
+
+    def is_finished(self, record_id: str) -> bool:
+        """True once mark_finished was called and no stage was saved since"""
+        row = self.conn.execute(
+            "SELECT finished_at FROM runs WHERE record_id = ?", (record_id,)
+        ).fetchone()
+        return bool(row and row[0])
+
+    def unfinished_records(self) -> List[str]:
+        """Records with saved stages whose pipeline never finished"""
+        rows = self.conn.execute(
+            "SELECT record_id FROM runs WHERE finished_at IS NULL ORDER BY record_id"
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def clear(self, record_id: str) -> None:
+        """Forget every checkpoint of a record"""
+        self.conn.execute("DELETE FROM checkpoints WHERE record_id = ?", (record_id,))
+        self.conn.execute("DELETE FROM runs WHERE record_id = ?", (record_id,))
+        self.conn.commit()
+
+    def close(self):
+        """Close the database connection"""
+        self.conn.close()
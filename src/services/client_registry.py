@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Client Registry
+Long-lived API clients shared by every agent in the process, so connections, TLS sessions
+and Google service objects are set up once instead of once per record
+"""
+
+import asyncio
+import importlib.util
+import logging
+from typing import Dict
+
+from .settings import provider_url
+
+logger = logging.getLogger(__name__)
+
+# httpx only speaks HTTP/2 when the optional h2 package is installed
+HTTP2_AVAILABLE = importlib.util.find_spec('h2') is not None
+
+
+class ClientRegistry:
+    """Hands out pooled clients on first use and closes them all in aclose()"""
+
+    def __init__(self, config: Dict, ledger=None, signals=None):
+        # A config from services.settings.load_config, which fills in the credential file paths
+        self.config = config
+        # QuotaLedger the provider clients charge their usage to, if any
+        self.ledger = ledger
+        # FleetSignals told about every 429 a provider answers with, if any
+        self.signals = signals
+        self._http: Dict[str, 'httpx.AsyncClient'] = {}
+        self._sessions: Dict[str, 'requests.Session'] = {}
+        self._anthropic = None
+        self._airtable = None
+        self._drive = None
+        self._drive_lock = asyncio.Lock()
+        self._youtube = None
+
+    def http(self, name: str, **options) -> 'httpx.AsyncClient':
+        """
+        Keep-alive AsyncClient for one provider. Options (headers, timeout, ...) apply when the
+        client is first created; later callers asking for the same name get the same client.
+        """
+        import httpx
+        from .http_timing import httpx_event_hooks
+        client = self._http.get(name)
+        if client is None or client.is_closed:
+            options.setdefault('http2', HTTP2_AVAILABLE)
+            options.setdefault('limits', httpx.Limits(max_connections=20, max_keepalive_connections=10))
+            # Per-phase timing of every call (a no-op until services.http_timing is installed)
+            hooks = dict(options.get('event_hooks') or {})
+            for event, timing_hooks in httpx_event_hooks(name).items():
+                hooks[event] = list(hooks.get(event, [])) + timing_hooks
+            if self.signals:
+                hooks['response'] = hooks['response'] + [self._throttle_hook(name)]
+            options['event_hooks'] = hooks
+            client = httpx.AsyncClient(**options)
+            self._http[name] = client
+        return client
+
+    def session(self, name: str) -> 'requests.Session':
+        """Keep-alive requests.Session for one provider, its calls timed like the httpx clients"""
+        session = self._sessions.get(name)
+        if session is None:
+            from .http_timing import timed_session
+            session = self._sessions[name] = timed_session(name)
+        return session
+
+    def _throttle_hook(self, name: str):
+        async def on_response(response):
+            if response.status_code == 429:
+                await self.signals.record_throttle(name)
+        return on_response
+
+    def anthropic(self):
+        """Shared AsyncAnthropic client; it pools its own connections"""
+        if self._anthropic is None:
+            from anthropic import AsyncAnthropic
+            self._anthropic = AsyncAnthropic(api_key=self.config['anthropic_api_key'],
+                                        base_url=provider_url(self.config, 'anthropic'))
+            if self.ledger:
+                from services.quota_ledger import meter_anthropic
+                meter_anthropic(self._anthropic, self.ledger)
+        return self._anthropic
+
+    def airtable(self):
+        """Shared Airtable server for the configured table"""
+        if self._airtable is None:
+            from mcp_servers.airtable_server import AirtableMCPServer
+            from services.category_scheduler import CategoryScheduler
+            self._airtable = AirtableMCPServer(
+                api_key=self.config['airtable_api_key'],
+                base_id=self.config['airtable_base_id'],
+                table_name=self.config['airtable_table_name'],
+                category_scheduler=CategoryScheduler.from_config(self.config),
+                api_url=provider_url(self.config, 'airtable')
+            )
+        return self._airtable
+
+    async def drive(self):
+        """Shared, initialized Google Drive server, or None if it could not be set up"""
+        async with self._drive_lock:
+            if self._drive is None:
+                from mcp_servers.google_drive_server import GoogleDriveMCPServer
+                from .http_timing import timed_http
+                drive = GoogleDriveMCPServer(self.config['google_drive_credentials'],
+                                             api_root=provider_url(self.config, 'google'),
+                                             http_factory=lambda: timed_http('google_drive'))
+                if not await drive.initialize_drive_service():
+                    # Try again on the next call rather than caching the failure
+                    return None
+                self._drive = drive
+        return self._drive
+
+    def youtube(self):
+        """Shared, authenticated YouTube uploader"""
+        if self._youtube is None:
+            from mcp.youtube_mcp import YouTubeMCP
+            from .http_timing import timed_http
+            self._youtube = YouTubeMCP(
+                credentials_path=self.config['youtube_credentials'],
+                token_path=self.config['youtube_token'],
+                download_timeout=self.config.get('youtube_download_timeout', 120),
+                ledger=self.ledger,
+                api_root=provider_url(self.config, 'google'),
+                http_factory=lambda: timed_http('youtube')
+            )
+        return self._youtube
+
+    async def aclose(self):
+        """Close every client handed out so far"""
+        for name, client in self._http.items():
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"⚠️ Could not close {name} client: {e}")
+        self._http = {}
+        for session in self._sessions.values():
+            session.close()
+        self._sessions = {}
+        if self._anthropic is not None:
+            await self._anthropic.close()
+            self._anthropic = None
+        self._airtable = None
+        self._drive = None
+        self._youtube = None
+        logger.info("🔌 Shared clients closed")
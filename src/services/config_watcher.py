@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Config Watcher
+Notices when api_keys.json changes on disk so a long-running daemon can pick up new settings
+without a restart
+"""
+
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigWatcher:
+    """
+    Polls the file's modification time and size. Polling needs no extra package and also sees
+    edits made through a Docker bind mount or an editor that saves by renaming.
+    """
+
+    def __init__(self, path: str, interval: float = 5.0):
+        self.path = path
+        self.interval = interval
+        self._stamp = self._read_stamp()
+
+    def _read_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def changed(self) -> bool:
+        """True once per change since the last call"""
+        stamp = self._read_stamp()
+        if stamp == self._stamp or stamp is None:
+            # A file that is briefly missing mid-save is not a change
+            return False
+        self._stamp = stamp
+        return True
+
+    async def watch(self, on_change: Callable[[], Awaitable[None]]):
+        """Call `on_change` after every change until cancelled"""
+        while True:
+            await asyncio.sleep(self.interval)
+            if self.changed():
+                try:
+                    await on_change()
+                except Exception as e:
+                    logger.error(f"❌ Applying the config change failed: {e}")
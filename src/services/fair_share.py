@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Fair Share
+Weighted fair queueing for limits that several tenants (channels) share in one daemon,
+so a busy channel cannot take every slot from the quiet ones
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Deque, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class FairShare:
+    """
+    Semaphore of `limit` slots handed out by start-time fair queueing: when tenants are
+    waiting, the next free slot goes to the one that has received the least service relative
+    to its weight. A tenant that was idle rejoins at the current virtual time instead of
+    cashing in credit, so it cannot burst past everyone else either.
+    """
+
+    def __init__(self, limit: int, name: str = 'shared'):
+        if limit < 1:
+            raise ValueError(f"{name} needs a limit of at least 1")
+        self.limit = limit
+        self.name = name
+        self.active = 0
+        self.served: Dict[str, int] = {}
+        self._weights: Dict[str, float] = {}
+        self._vtime: Dict[str, float] = {}
+        self._clock = 0.0
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {}
+
+    def resize(self, limit: int):
+        """Change the number of slots; shrinking lets holders finish rather than taking slots back"""
+        if limit < 1:
+            raise ValueError(f"{self.name} needs a limit of at least 1")
+        self.limit = limit
+        self._dispatch()
+
+    def tenant(self, name: str, weight: float = 1.0) -> 'TenantSlot':
+        """Async context manager that takes one slot on behalf of `name`"""
+        if weight <= 0:
+            raise ValueError(f"Tenant {name} needs a positive weight")
+        self._weights[name] = weight
+        return TenantSlot(self, name)
+
+    def _start_tag(self, tenant: str) -> float:
+        return max(self._vtime.get(tenant, 0.0), self._clock)
+
+    def _grant(self, tenant: str):
+        start = self._start_tag(tenant)
+        self._clock = start
+        self._vtime[tenant] = start + 1.0 / self._weights.get(tenant, 1.0)
+        self.served[tenant] = self.served.get(tenant, 0) + 1
+        self.active += 1
+
+    async def acquire(self, tenant: str):
+        if self.active < self.limit and not any(self._waiters.values()):
+            self._grant(tenant)
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(tenant, deque()).append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we were cancelled; pass it on
+                self.release()
+            elif waiter in self._waiters[tenant]:
+                self._waiters[tenant].remove(waiter)
+            raise
+
+    def release(self):
+        self.active -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        while self.active < self.limit:
+            backlogged = [t for t, queue in self._waiters.items() if queue]
+            if not backlogged:
+                return
+            # min() keeps insertion order on ties, so equal tenants take turns
+            tenant = min(backlogged, key=self._start_tag)
+            waiter = self._waiters[tenant].popleft()
+            if waiter.done():
+                # Cancelled but not yet cleaned up by its task
+                continue
+            self._grant(tenant)
+            waiter.set_result(None)
+
+    def stats(self) -> Dict[str, Dict]:
+        return {
+            tenant: {'weight': self._weights.get(tenant, 1.0), 'served': self.served.get(tenant, 0),
+                     'waiting': len(self._waiters.get(tenant, ()))}
+            for tenant in self._weights
+        }
+
+
+class TenantSlot:
+    """One tenant's handle on a FairShare; usable like an asyncio.Semaphore"""
+
+    def __init__(self, share: FairShare, tenant: str):
+        self.share = share
+        self.tenant = tenant
+
+    async def __aenter__(self):
+        await self.share.acquire(self.tenant)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.share.release()
+        return False
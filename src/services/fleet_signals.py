@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Fleet Signals
+How long records take and how often providers push back, written by every worker on the host
+to one SQLite file so the fleet supervisor can size the fleet from it
+"""
+
+import asyncio
+import logging
+import os
+import re
+import sqlite3
+import statistics
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean a provider wants us to slow down rather than that the call was wrong
+THROTTLE_PATTERN = re.compile(r'\b429\b|rate.?limit|too many requests|overloaded', re.IGNORECASE)
+
+# Samples older than this are dropped on write; the supervisor never looks further back
+KEEP_SECONDS = 6 * 3600
+
+
+def is_throttle(error: Optional[str]) -> bool:
+    """True if a stage error reads like a 429 / rate limit from a provider"""
+    return bool(error and THROTTLE_PATTERN.search(error))
+
+
+class FleetSignals:
+    """
+    Record durations and throttle events, timestamped with wall time so every process agrees.
+    Writes may wait on another worker's lock, so they run in a thread with its own connection
+    and leave the event loop alone.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS runs (
+                at REAL NOT NULL,
+                seconds REAL NOT NULL
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS stages (
+                at REAL NOT NULL,
+                stage TEXT NOT NULL,
+                seconds REAL NOT NULL
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS throttles (
+                at REAL NOT NULL,
+                source TEXT NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """This thread's connection to the signals file"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    async def record_run(self, stages: Dict[str, Dict], seconds: float = None):
+        """
+        The stage report of one record run and, if it went through, its wall time. Stages that
+        failed with a rate-limit error also count as throttle events.
+        """
+        await asyncio.to_thread(self._record_run, stages, seconds)
+
+    def _record_run(self, stages: Dict[str, Dict], seconds: float = None):
+        now = time.time()
+        if seconds is not None:
+            self.conn.execute("INSERT INTO runs (at, seconds) VALUES (?, ?)", (now, seconds))
+        for name, entry in stages.items():
+            if entry['status'] == 'done':
+                self.conn.execute("INSERT INTO stages (at, stage, seconds) VALUES (?, ?, ?)",
+                                  (now, name, entry['seconds']))
+            elif entry['status'] == 'failed' and is_throttle(entry.get('error')):
+                self.conn.execute("INSERT INTO throttles (at, source) VALUES (?, ?)", (now, name))
+        self._prune(now)
+        self.conn.commit()
+
+    async def record_throttle(self, source: str):
+        """A provider answered 429 (or said it was overloaded)"""
+        await asyncio.to_thread(self._record_throttle, source)
+
+    def _record_throttle(self, source: str):
+        self.conn.execute("INSERT INTO throttles (at, source) VALUES (?, ?)", (time.time(), source))
+        self.conn.commit()
+
+    def _prune(self, now: float):
+        for table in ('runs', 'stages', 'throttles'):
+            self.conn.execute(f"DELETE FROM {table} WHERE at < ?", (now - KEEP_SECONDS,))
+
+    def record_seconds(self, window: float) -> Optional[float]:
+        """Median wall time of the records finished in the last `window` seconds, None without samples"""
+        rows = self.conn.execute("SELECT seconds FROM runs WHERE at >= ?", (time.time() - window,)).fetchall()
+        return statistics.median(row[0] for row in rows) if rows else None
+
+    def stage_seconds(self, window: float) -> Dict[str, float]:
+        """Median latency of each stage over the last `window` seconds"""
+        samples: Dict[str, list] = {}
+        for stage, seconds in self.conn.execute(
+            "SELECT stage, seconds FROM stages WHERE at >= ?", (time.time() - window,)
+        ):
+            samples.setdefault(stage, []).append(seconds)
+        return {stage: statistics.median(values) for stage, values in samples.items()}
+
+    def throttles(self, window: float) -> Dict[str, int]:
+        """Throttle events per source over the last `window` seconds"""
+        return dict(self.conn.execute(
+            "SELECT source, COUNT(*) FROM throttles WHERE at >= ? GROUP BY source",
+            (time.time() - window,)
+        ).fetchall())
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+HTTP Timing
+Splits every provider call into DNS, connect, TLS, time to first byte and transfer, with request
+and response bytes, and totals them per provider and endpoint, so slow calls can be told apart
+into connection setup (fixable with pooling) and the provider itself
+"""
+
+import asyncio
+import contextvars
+import http.client
+import logging
+import re
+import socket
+import ssl
+import threading
+import time
+import urllib.parse
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Transfer is whatever the call took beyond the other phases: sending the body and reading the response
+PHASES = ('dns', 'connect', 'tls', 'ttfb', 'transfer')
+
+# Path segments that are ids (record, video, voice, file ids), folded so endpoints aggregate
+ID_SEGMENT = re.compile(r'^(?=.*\d)[A-Za-z0-9_-]{8,}$')
+
+# The call whose connection work the socket, DNS and TLS hooks below are timing
+_current: contextvars.ContextVar[Optional['CallTiming']] = contextvars.ContextVar('http_timing', default=None)
+
+_timings: Optional['HttpTimings'] = None
+
+
+def endpoint_of(method: str, url: str) -> str:
+    """'POST /v2/movies' style name for a call, with ids in the path folded into ':id'"""
+    path = urllib.parse.urlsplit(url).path or '/'
+    segments = [':id' if ID_SEGMENT.match(segment) else segment for segment in path.split('/')]
+    return f"{method.upper()} {'/'.join(segments)}"
+
+
+class CallTiming:
+    """
+    One call being timed. Clients with their own hooks (httpx) report connect, TLS and first
+    byte themselves, so the socket level hooks only add DNS to them.
+    """
+
+    def __init__(self, provider: str, method: str, url: str, hooked: bool = False):
+        self.provider = provider
+        self.endpoint = endpoint_of(method, url)
+        self.hooked = hooked
+        self.phases: Dict[str, float] = {}
+        self.bytes_out = 0
+        self.response = None
+        self._started = time.perf_counter()
+        self._marks: Dict[str, float] = {}
+        self._done = False
+        # Set by start(); the call stops being the current one when it finishes
+        self._token = None
+
+    def add(self, phase: str, seconds: float):
+        if not self._done:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def trace(self, event: str, info: Dict):
+        """httpcore trace extension: pairs up the .started / .complete events of each step"""
+        step, _, state = event.rpartition('.')
+        if state == 'started':
+            self._marks[step] = time.perf_counter()
+            return
+        if state != 'complete' and state != 'failed':
+            return
+        started = self._marks.pop(step, None)
+        if started is None:
+            return
+        seconds = time.perf_counter() - started
+        if state == 'failed' and not step.endswith('.response_closed'):
+            # No response hook runs for a call that raised, so this is its last chance to be counted
+            self.finish(None, 0)
+            return
+        if step == 'connection.connect_tcp':
+            # Name resolution happens inside connect_tcp; the DNS hook has timed it separately
+            self.add('connect', max(seconds - self.phases.get('dns', 0.0), 0.0))
+        elif step == 'connection.start_tls':
+            self.add('tls', seconds)
+        elif step.endswith('.receive_response_headers'):
+            self.add('ttfb', seconds)
+        elif step.endswith('.response_closed') and self.response is not None:
+            self.finish(self.response.status_code, self.response.num_bytes_downloaded)
+
+    async def atrace(self, event: str, info: Dict):
+        """trace() for async clients; httpcore insists on a coroutine there"""
+        self.trace(event, info)
+
+    def finish(self, status: Optional[int], bytes_in: int):
+        if self._done:
+            return
+        total = time.perf_counter() - self._started
+        self.phases['transfer'] = max(total - sum(self.phases.values()), 0.0)
+        self._done = True
+        if _current.get() is self:
+            try:
+                _current.reset(self._token)
+            except ValueError:
+                # Finished from a copy of the context start() ran in (a to_thread call, say)
+                _current.set(None)
+        if _timings is not None:
+            _timings.record(self, status, bytes_in, total)
+
+
+class HttpTimings:
+    """Per (provider, endpoint) totals of every timed call in the process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[Tuple[str, str], Dict] = {}
+
+    def record(self, call: CallTiming, status: Optional[int], bytes_in: int, total: float):
+        # Only timed runs load the metrics registry; ClientRegistry imports this module on every run
+        from . import metrics
+        for phase, seconds in call.phases.items():
+            metrics.HTTP_PHASE_SECONDS.observe(seconds, provider=call.provider, endpoint=call.endpoint, phase=phase)
+        metrics.HTTP_BYTES.inc(call.bytes_out, provider=call.provider, endpoint=call.endpoint, direction='out')
+        metrics.HTTP_BYTES.inc(bytes_in, provider=call.provider, endpoint=call.endpoint, direction='in')
+        with self._lock:
+            stats = self._stats.setdefault((call.provider, call.endpoint), {
+                'calls': 0, 'errors': 0, 'seconds': 0.0, 'bytes_out': 0, 'bytes_in': 0,
+                'phases': {phase: 0.0 for phase in PHASES},
+            })
+            stats['calls'] += 1
+            stats['errors'] += status is None or status >= 400
+            stats['seconds'] += total
+            stats['bytes_out'] += call.bytes_out
+            stats['bytes_in'] += bytes_in
+            for phase, seconds in call.phases.items():
+                stats['phases'][phase] += seconds
+
+    def summary(self) -> Dict[str, Dict]:
+        """'provider endpoint' -> calls, errors, bytes and the mean seconds of each phase"""
+        with self._lock:
+            items = sorted(self._stats.items())
+        return {
+            f'{provider} {endpoint}': {
+                'calls': stats['calls'],
+                'errors': stats['errors'],
+                'bytes_out': stats['bytes_out'],
+                'bytes_in': stats['bytes_in'],
+                'mean_seconds': stats['seconds'] / stats['calls'],
+                'mean_phases': {phase: seconds / stats['calls'] for phase, seconds in stats['phases'].items()},
+            }
+            for (provider, endpoint), stats in items
+        }
+
+    def report(self) -> List[str]:
+        """Summary lines, slowest endpoint first"""
+        summary = self.summary()
+        lines = []
+        for name, stats in sorted(summary.items(), key=lambda item: -item[1]['mean_seconds']):
+            phases = ' '.join(f"{phase} {stats['mean_phases'][phase] * 1000:.0f}ms" for phase in PHASES)
+            lines.append(f"   {name}: {stats['calls']} calls ({stats['errors']} failed), "
+                         f"mean {stats['mean_seconds'] * 1000:.0f}ms = {phases}, "
+                         f"{stats['bytes_out']} B out / {stats['bytes_in']} B in")
+        return lines
+
+
+def get_timings() -> Optional[HttpTimings]:
+    """The process-wide totals, or None while timing is off"""
+    return _timings
+
+
+def start(provider: str, method: str, url: str, hooked: bool = False) -> Optional[CallTiming]:
+    """Begin timing a call and make it the one the socket hooks report to; None while timing is off"""
+    if _timings is None:
+        return None
+    call = CallTiming(provider, method, url, hooked)
+    call._token = _current.set(call)
+    return call
+
+
+# ---- client hooks ----
+
+def httpx_event_hooks(provider: str) -> Dict[str, list]:
+    """event_hooks for an httpx.AsyncClient that time each of its calls"""
+    async def on_request(request):
+        call = start(provider, request.method, str(request.url), hooked=True)
+        if call:
+            call.bytes_out = int(request.headers.get('content-length', 0))
+            request.extensions = dict(request.extensions, trace=call.atrace, timing=call)
+
+    async def on_response(response):
+        call = response.request.extensions.get('timing')
+        if call:
+            # Finished by the response_closed trace event, once the body has been read
+            call.response = response
+
+    return {'request': [on_request], 'response': [on_response]}
+
+
+def timed_session(provider: str):
+    """requests.Session whose calls are timed under `provider`; it also keeps connections alive"""
+    import requests
+
+    class TimedSession(requests.Session):
+        def send(self, request, **kwargs):
+            call = start(provider, request.method, request.url)
+            if call is None:
+                return super().send(request, **kwargs)
+            body = request.body
+            call.bytes_out = len(body) if isinstance(body, (bytes, str)) else 0
+            try:
+                response = super().send(request, **kwargs)
+            except Exception:
+                call.finish(None, 0)
+                raise
+            # Without stream=True the body has been read by now
+            call.finish(response.status_code,
+                        len(response.content) if not kwargs.get('stream') else
+                        int(response.headers.get('content-length', 0)))
+            return response
+
+    return TimedSession()
+
+
+def timed_http(provider: str, **options):
+    """httplib2.Http (what googleapiclient sends through) whose calls are timed under `provider`"""
+    import httplib2
+
+    class TimedHttp(httplib2.Http):
+        def request(self, uri, method='GET', body=None, headers=None, *args, **kwargs):
+            call = start(provider, method, uri)
+            if call is None:
+                return super().request(uri, method, body, headers, *args, **kwargs)
+            call.bytes_out = len(body) if isinstance(body, (bytes, str)) else 0
+            try:
+                response, content = super().request(uri, method, body, headers, *args, **kwargs)
+            except Exception:
+                call.finish(None, 0)
+                raise
+            call.finish(response.status, len(content or b''))
+            return response, content
+
+    return TimedHttp(**options)
+
+
+# ---- socket level hooks ----
+
+_patches = []
+
+
+def _patch(owner, name: str, replacement):
+    _patches.append((owner, name, getattr(owner, name)))
+    setattr(owner, name, replacement)
+
+
+def _timed(phase: str, original, low_level: bool = True):
+    """Wrap a blocking function so its time counts towards `phase` of the current call"""
+    def wrapper(*args, **kwargs):
+        call = _current.get()
+        if call is None or (low_level and call.hooked):
+            return original(*args, **kwargs)
+        started = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            call.add(phase, time.perf_counter() - started)
+    return wrapper
+
+
+def install() -> HttpTimings:
+    """
+    Start timing. Name resolution is hooked for every client; connect, TLS and first byte are
+    hooked at the socket, ssl and http.client level for requests and httplib2, which have no
+    hooks of their own.
+    """
+    global _timings
+    if _timings is not None:
+        return _timings
+    _timings = HttpTimings()
+
+    _patch(socket, 'getaddrinfo', _timed('dns', socket.getaddrinfo, low_level=False))
+    _patch(socket.socket, 'connect', _timed('connect', socket.socket.connect))
+    _patch(ssl.SSLContext, 'wrap_socket', _timed('tls', ssl.SSLContext.wrap_socket))
+    _patch(http.client.HTTPConnection, 'getresponse', _timed('ttfb', http.client.HTTPConnection.getresponse))
+
+    loop_getaddrinfo = asyncio.base_events.BaseEventLoop.getaddrinfo
+
+    async def getaddrinfo(loop, *args, **kwargs):
+        # Resolved in an executor thread that does not see the caller's call, so time it here
+        call = _current.get()
+        started = time.perf_counter()
+        try:
+            return await loop_getaddrinfo(loop, *args, **kwargs)
+        finally:
+            if call:
+                call.add('dns', time.perf_counter() - started)
+
+    _patch(asyncio.base_events.BaseEventLoop, 'getaddrinfo', getaddrinfo)
+    logger.info("⏱️ Timing outbound HTTP calls")
+    return _timings
+
+
+def uninstall():
+    """Undo the hooks and stop timing"""
+    global _timings
+    while _patches:
+        owner, name, original = _patches.pop()
+        setattr(owner, name, original)
+    _timings = None
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Lazy Import
+Stand-ins for `from module import name` that defer the import until the name is first called,
+so a run only pays for the provider SDKs its stages actually reach
+"""
+
+import importlib
+from typing import Any, Callable, List
+
+# Every module registered through lazy(), in registration order; the startup profile reports them
+LAZY_MODULES: List[str] = []
+
+
+def lazy(module_name: str, attr: str) -> Callable[..., Any]:
+    """
+    Callable that imports module_name on first use and forwards to its `attr`.
+    Works for functions, coroutine functions and classes alike.
+    """
+    target = None
+
+    def call(*args, **kwargs):
+        nonlocal target
+        if target is None:
+            target = getattr(importlib.import_module(module_name), attr)
+        return target(*args, **kwargs)
+
+    call.__name__ = attr
+    call.__qualname__ = attr
+    call.__doc__ = f"Lazily imported {module_name}.{attr}"
+    if module_name not in LAZY_MODULES:
+        LAZY_MODULES.append(module_name)
+    return call
+
+
+def lazy_value(module_name: str, attr: str) -> Callable[[], Any]:
+    """Zero-argument loader for a module constant, imported when first read"""
+    if module_name not in LAZY_MODULES:
+        LAZY_MODULES.append(module_name)
+    return lambda: getattr(importlib.import_module(module_name), attr)
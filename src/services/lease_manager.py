@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Lease Manager
+Lets several worker processes share one Airtable table without processing a record twice
+"""
+
+import asyncio
+import logging
+import os
+import random
+import socket
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def default_worker_id() -> str:
+    """host:pid is unique across the fleet and readable in Airtable"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class LeaseManager:
+    """
+    Claims records through the LeaseOwner / LeaseExpiresAt fields, with Status=Processing as the marker.
+    Airtable has no compare-and-swap, so a claim is written and then read back after a short jittered
+    pause; the worker whose write survived owns the record.
+    """
+
+    def __init__(self, airtable_server, worker_id: str = None, ttl: float = 600.0,
+                 verify_delay: float = 1.0):
+        self.airtable_server = airtable_server
+        self.worker_id = worker_id or default_worker_id()
+        self.ttl = ttl
+        self.verify_delay = verify_delay
+        # Records another worker took over; releasing them would clobber that worker's lease
+        self._lost = set()
+
+    @staticmethod
+    def _now() -> datetime:
+        return datetime.now(timezone.utc)
+
+    @staticmethod
+    def lease_expiry(fields: Dict) -> Optional[datetime]:
+        """Parse LeaseExpiresAt, or None when the record carries no lease"""
+        value = fields.get('LeaseExpiresAt')
+        if not value:
+            return None
+        try:
+            expiry = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+        if expiry.tzinfo is None:
+            expiry = expiry.replace(tzinfo=timezone.utc)
+        return expiry
+
+    def is_available(self, record: Dict) -> bool:
+        """Pending without a live cooldown, or Processing under an expired lease"""
+        fields = record.get('fields', {})
+        expiry = self.lease_expiry(fields)
+        live = expiry is not None and expiry > self._now()
+
+        if fields.get('Status') == 'Pending':
+            return not live
+        if fields.get('Status') == 'Processing' and fields.get('LeaseOwner'):
+            return not live
+        return False
+
+    async def claim(self, record_id: str) -> bool:
+        """Try to take the lease on a record; True if this worker now owns it"""
+        record = await self.airtable_server.get_record_by_id(record_id)
+        if not record or not self.is_available(record):
+            return False
+
+        expires = self._now() + timedelta(seconds=self.ttl)
+        written = await self.airtable_server.update_record(record_id, {
+            'Status': 'Processing',
+            'LeaseOwner': self.worker_id,
+            'LeaseExpiresAt': expires.isoformat()
+        })
+        if not written:
+            return False
+
+        # Let racing workers finish their writes, then see whose claim stuck
+        await asyncio.sleep(self.verify_delay * random.uniform(0.5, 1.5))
+        record = await self.airtable_server.get_record_by_id(record_id)
+        owned = bool(record) and record.get('fields', {}).get('LeaseOwner') == self.worker_id
+        if owned:
+            logger.info(f"🔒 {self.worker_id} claimed {record_id} until {expires.isoformat()}")
+        return owned
+
+    async def renew(self, record_id: str) -> bool:
+        """Push the expiry out again; False only if another worker took the record over"""
+        record = await self.airtable_server.get_record_by_id(record_id)
+        if not record:
+            # Airtable hiccup: keep working and try again on the next renewal
+            return True
+        if record.get('fields', {}).get('LeaseOwner') != self.worker_id:
+            logger.warning(f"⚠️ Lost the lease on {record_id}")
+            self._lost.add(record_id)
+            return False
+
+        expires = self._now() + timedelta(seconds=self.ttl)
+        await self.airtable_server.update_record(record_id, {
+            'LeaseExpiresAt': expires.isoformat()
+        })
+        return True
+
+    async def release(self, record_id: str, success: bool, cooldown: float = 0.0) -> bool:
+        """
+        Drop the lease. A finished record keeps the status the pipeline gave it;
+        a failed one goes back to Pending, blocked for `cooldown` seconds across the fleet.
+        A lease that was lost is left alone.
+        """
+        if record_id in self._lost:
+            self._lost.discard(record_id)
+            return False
+        if success:
+            fields = {'LeaseOwner': '', 'LeaseExpiresAt': ''}
+        else:
+            retry_at = self._now() + timedelta(seconds=cooldown)
+            fields = {
+                'Status': 'Pending',
+                'LeaseOwner': '',
+                'LeaseExpiresAt': retry_at.isoformat() if cooldown else ''
+            }
+        return await self.airtable_server.update_record(record_id, fields)
+
+    async def hold(self, record_id: str, task: asyncio.Task):
+        """
+        Renew the lease until `task` finishes; cancel the task if the lease is lost. A renewal
+        that fails is retried on the next tick rather than ending the hold.
+        """
+        while not task.done():
+            await asyncio.sleep(self.ttl / 3)
+            if task.done():
+                return
+            try:
+                renewed = await self.renew(record_id)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not renew the lease on {record_id}: {e}")
+                continue
+            if not renewed:
+                task.cancel()
+                return
+
+    async def expired_leases(self, limit: int = 100) -> List[Dict]:
+        """Records left Processing by a worker that stopped renewing"""
+        records = await self.airtable_server.get_leased_records(limit=limit)
+        return [record for record in records if self.is_available(record)]
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Metrics
+Counters, gauges and histograms for the daemon, served in the Prometheus text format on
+/metrics so throughput can be dashboarded and regressions alerted on without tailing logs
+"""
+
+import asyncio
+import bisect
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds; stages range from sub-second Airtable writes to ten-minute renders
+STAGE_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200)
+CALL_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+RECORD_BUCKETS = (30, 60, 120, 300, 600, 900, 1200, 1800, 3600)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """A named family of samples, one per combination of label values"""
+    kind = 'untyped'
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Labels:
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} takes labels {list(self.labels)}, got {sorted(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        return '\n'.join(lines + self.samples())
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f'{self.name}{_format_labels(self.labels, key)} {_number(value)}' for key, value in values]
+
+
+class Gauge(Counter):
+    """Set or moved directly; use a GaugeFunction for values read at scrape time"""
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class GaugeFunction(Metric):
+    """
+    A gauge computed on every scrape. Each source returns {label values: value}; several sources
+    (one per tenant, say) can feed the same gauge. A failing source is skipped for that scrape.
+    """
+    kind = 'gauge'
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        super().__init__(name, help, labels)
+        self._sources: List[Callable[[], Dict[Labels, float]]] = []
+
+    def source(self, func: Callable[[], Dict[Labels, float]]):
+        with self._lock:
+            self._sources.append(func)
+
+    def clear(self):
+        with self._lock:
+            self._sources = []
+
+    def samples(self) -> List[str]:
+        values: Dict[Labels, float] = {}
+        with self._lock:
+            sources = list(self._sources)
+        for func in sources:
+            try:
+                values.update(func())
+            except Exception as e:
+                logger.warning(f"⚠️ Could not read {self.name}: {e}")
+        return [f'{self.name}{_format_labels(self.labels, key)} {_number(value)}'
+                for key, value in sorted(values.items()) if value is not None]
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), buckets: Iterable[float] = STAGE_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (count per bucket, +Inf excluded; sum; count)
+        self._values: Dict[Labels, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(entry[0]), entry[1], entry[2])) for key, entry in self._values.items())
+        lines = []
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                le = f'le="{_number(bound)}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}')
+            le = 'le="+Inf"'
+            lines.append(f'{self.name}_bucket{_format_labels(self.labels, key, le)} {count}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labels, key)} {_number(total)}')
+            lines.append(f'{self.name}_count{_format_labels(self.labels, key)} {count}')
+        return lines
+
+
+class MetricsRegistry:
+    """Every metric of the process, rendered together for a scrape"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is registered twice")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Iterable[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Iterable[str] = ()) -> Gauge:
+        return self._add(Gauge(name, help, labels))
+
+    def gauge_function(self, name: str, help: str, labels: Iterable[str] = ()) -> GaugeFunction:
+        return self._add(GaugeFunction(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Iterable[str] = (),
+                  buckets: Iterable[float] = STAGE_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+RECORDS = REGISTRY.counter('workflow_records_total', 'Records that went through process_record, by outcome',
+                           ['tenant', 'outcome'])
+RECORD_SECONDS = REGISTRY.histogram('workflow_record_seconds', 'Wall time of records that went through',
+                                    ['tenant'], RECORD_BUCKETS)
+# status: done, restored (checkpoint hit), failed, skipped, ... as reported by the stage graph
+STAGE_RUNS = REGISTRY.counter('workflow_stage_runs_total', 'Stage results by status; restored means a checkpoint hit',
+                              ['tenant', 'stage', 'status'])
+STAGE_SECONDS = REGISTRY.histogram('workflow_stage_seconds', 'Run time of stages that executed',
+                                   ['tenant', 'stage'], STAGE_BUCKETS)
+STAGES_IN_FLIGHT = REGISTRY.gauge('workflow_stages_in_flight', 'Stages running right now; stage="video" is renders',
+                                  ['stage'])
+PROVIDER_CALLS = REGISTRY.counter('workflow_provider_calls_total', 'Outbound HTTP calls by provider and status code',
+                                  ['provider', 'status'])
+PROVIDER_SECONDS = REGISTRY.histogram('workflow_provider_call_seconds', 'Outbound HTTP call latency by provider',
+                                      ['provider'], CALL_BUCKETS)
+# Filled in by http_timing when --http-timing is on
+HTTP_PHASE_SECONDS = REGISTRY.histogram('workflow_http_phase_seconds',
+                                        'Time per phase of outbound HTTP calls (dns, connect, tls, ttfb, transfer)',
+                                        ['provider', 'endpoint', 'phase'], CALL_BUCKETS)
+HTTP_BYTES = REGISTRY.counter('workflow_http_bytes_total', 'Bytes sent and received by outbound HTTP calls',
+                              ['provider', 'endpoint', 'direction'])
+QUEUE_DEPTH = REGISTRY.gauge_function('workflow_queue_depth', 'Records waiting in front of each pipeline phase',
+                                      ['tenant', 'phase'])
+RECORDS_IN_FLIGHT = REGISTRY.gauge_function('workflow_records_in_flight', 'Records the scheduler has running',
+                                            ['tenant'])
+PENDING_QUEUED = REGISTRY.gauge_function('workflow_pending_queued', 'Pending records fetched and not started yet',
+                                         ['tenant'])
+QUOTA_REMAINING = REGISTRY.gauge_function('workflow_quota_remaining', "Provider quota left today, in the provider's units",
+                                          ['tenant', 'provider'])
+
+
+def observe_span(event: str, span):
+    """
+    Tracer listener: records and their stage statuses, stages in flight and their seconds, and
+    provider call latency and status codes
+    """
+    tenant = span.attrs.get('tenant') or ''
+    if span.kind == 'record' and event == 'end':
+        RECORDS.inc(tenant=tenant, outcome=span.attrs['outcome'])
+        if span.attrs['outcome'] == 'ok':
+            RECORD_SECONDS.observe(span.seconds, tenant=tenant)
+        for name, status in (span.attrs.get('stages') or {}).items():
+            STAGE_RUNS.inc(tenant=tenant, stage=name, status=status)
+    elif span.kind == 'stage':
+        STAGES_IN_FLIGHT.inc(1 if event == 'start' else -1, stage=span.attrs['stage'])
+        if event == 'end':
+            STAGE_SECONDS.observe(span.seconds, tenant=tenant, stage=span.attrs['stage'])
+    elif span.kind == 'call' and event == 'end':
+        provider = span.attrs.get('provider', 'unknown')
+        PROVIDER_CALLS.inc(provider=provider, status=span.attrs.get('status', span.attrs['outcome']))
+        PROVIDER_SECONDS.observe(span.seconds, provider=provider)
+
+
+def watch_daemon(tenant: Optional[str], orchestrator, scheduler):
+    """Read one daemon's queue depths, in-flight records and quota headroom on every scrape"""
+    tenant = tenant or ''
+    QUEUE_DEPTH.source(lambda: {
+        (tenant, phase): depth
+        for phase, depth in (orchestrator.pipeline.queue_depths() if orchestrator.pipeline else {}).items()
+    })
+    RECORDS_IN_FLIGHT.source(lambda: {(tenant,): scheduler.in_flight})
+    PENDING_QUEUED.source(lambda: {(tenant,): len(orchestrator.pending)})
+    QUOTA_REMAINING.source(lambda: {
+        (tenant, provider): orchestrator.quota.remaining(provider) for provider in orchestrator.quota.limits
+    })
+
+
+class MetricsServer:
+    """Minimal HTTP server answering GET /metrics from a registry"""
+
+    def __init__(self, registry: MetricsRegistry, port: int, host: str = '0.0.0.0'):
+        self.registry = registry
+        self.port = port
+        self.host = host
+        self._server = None
+
+    async def start(self) -> 'MetricsServer':
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        # Port 0 picks a free one; report the real one
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"📈 Serving metrics on http://{self.host}:{self.port}/metrics")
+        return self
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request = await asyncio.wait_for(reader.readline(), timeout=10)
+            # Skip the headers; nothing in them changes the answer
+            while (await asyncio.wait_for(reader.readline(), timeout=10)) not in (b'\r\n', b'\n', b''):
+                pass
+            parts = request.decode('latin-1').split()
+            path = parts[1].split('?', 1)[0] if len(parts) > 1 else ''
+            if len(parts) > 1 and parts[0] == 'GET' and path == '/metrics':
+                status, content_type, body = '200 OK', 'text/plain; version=0.0.4; charset=utf-8', self.registry.render()
+            else:
+                status, content_type, body = '404 Not Found', 'text/plain; charset=utf-8', 'Try /metrics\n'
+            payload = body.encode()
+            writer.write(f'HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n'
+                         f'Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n'.encode() + payload)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def close(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Pending Queue
+Local priority queue of Pending records, filled from a paged Airtable scan and ordered by
+configurable record fields, so urgent titles go first without anyone reordering the table
+"""
+
+import heapq
+import itertools
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Airtable's own creation timestamp, usable as a rule field for ordering by age
+CREATED_TIME = 'createdTime'
+
+
+@dataclass(frozen=True)
+class PriorityRule:
+    """
+    One sort key: a record field read as a number, a date or, through `values`, a mapped
+    single-select. Records missing the field sort after those that have it.
+    """
+    field: str
+    descending: bool = False
+    values: Dict[str, float] = field(default_factory=dict)
+
+    @classmethod
+    def from_config(cls, entry: Dict) -> 'PriorityRule':
+        if not isinstance(entry, dict) or not entry.get('field'):
+            raise ValueError(f"priority rule needs a field, got {entry!r}")
+        order = entry.get('order', 'asc')
+        if order not in ('asc', 'desc'):
+            raise ValueError(f"priority rule order must be 'asc' or 'desc', got {order!r}")
+        values = entry.get('values', {})
+        if not isinstance(values, dict) or not all(isinstance(v, (int, float)) for v in values.values()):
+            raise ValueError(f"priority rule values must map options to numbers, got {values!r}")
+        return cls(entry['field'], order == 'desc', dict(values))
+
+    def value(self, record: Dict) -> Optional[float]:
+        """The record's sort value, or None if it has none"""
+        raw = record.get(CREATED_TIME) if self.field == CREATED_TIME else record.get('fields', {}).get(self.field)
+        if raw is None or raw == '':
+            return None
+        if self.values:
+            return self.values.get(raw)
+        try:
+            return float(raw)
+        except (TypeError, ValueError):
+            pass
+        try:
+            return datetime.fromisoformat(str(raw).replace('Z', '+00:00')).timestamp()
+        except ValueError:
+            return None
+
+    def key(self, record: Dict) -> tuple:
+        value = self.value(record)
+        if value is None:
+            return (1, 0.0)
+        return (0, -value if self.descending else value)
+
+
+def parse_rules(entries: Optional[Iterable[Dict]]) -> List[PriorityRule]:
+    """Rules from the 'pending_priority' config list"""
+    if entries is None:
+        return []
+    if not isinstance(entries, list):
+        raise ValueError(f"pending_priority must be a list, got {type(entries).__name__}")
+    return [PriorityRule.from_config(entry) for entry in entries]
+
+
+class PendingQueue:
+    """
+    Heap of Pending records keyed by the priority rules. Records whose keys tie form a tier;
+    within a tier the category scheduler (when given) decides, otherwise scan order does.
+    With no rules every record is in one tier, so categories alone decide.
+    """
+
+    def __init__(self, airtable_server, rules: List[PriorityRule] = None, categories=None,
+                 scan_limit: int = 1000, page_size: int = 100):
+        self.airtable_server = airtable_server
+        self.rules = list(rules or [])
+        self.categories = categories
+        self.scan_limit = scan_limit
+        self.page_size = page_size
+        self._heap: List[tuple] = []
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def key(self, record: Dict) -> tuple:
+        return tuple(rule.key(record) for rule in self.rules)
+
+    def push(self, records: Iterable[Dict]):
+        """Add records, e.g. ones whose lease expired, to the queue"""
+        for record in records:
+            heapq.heappush(self._heap, (self.key(record), next(self._seq), record))
+
+    async def refresh(self) -> int:
+        """Replace the queue with a fresh paged scan of Pending records; returns how many it holds"""
+        records = await self.airtable_server.scan_pending_records(
+            page_size=self.page_size, max_records=self.scan_limit
+        )
+        self._heap = []
+        self.push(records)
+        if len(records) >= self.scan_limit:
+            logger.warning(f"⚠️ Pending scan hit its limit of {self.scan_limit} records; older ones wait for the next scan")
+        return len(self._heap)
+
+    def take(self, limit: int, skip: Iterable[str] = ()) -> List[Dict]:
+        """Pop up to `limit` records in priority order, dropping those whose id is in `skip`"""
+        skip = set(skip)
+        taken = []
+        while len(taken) < limit and self._heap:
+            top = self._heap[0][0]
+            tier = []
+            while self._heap and self._heap[0][0] == top:
+                entry = heapq.heappop(self._heap)
+                if entry[2]['id'] not in skip:
+                    tier.append(entry)
+
+            records = [entry[2] for entry in tier]
+            wanted = limit - len(taken)
+            chosen = self.categories.order(records, limit=wanted) if self.categories else records[:wanted]
+            taken += chosen
+
+            chosen_ids = {record['id'] for record in chosen}
+            for entry in tier:
+                if entry[2]['id'] not in chosen_ids:
+                    heapq.heappush(self._heap, entry)
+        return taken
+
+    async def next(self, skip: Iterable[str] = ()) -> Optional[Dict]:
+        """Rescan and return the most urgent Pending record not in `skip`"""
+        await self.refresh()
+        records = self.take(1, skip)
+        return records[0] if records else None
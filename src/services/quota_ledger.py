@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Quota Ledger
+Counts what every provider call consumes per day in a local SQLite file, so records are held
+back before they start instead of failing half way when a daily limit runs out
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# What the numbers mean for each provider we meter
+PROVIDER_UNITS = {
+    'anthropic': 'tokens',
+    'json2video': 'renders',
+    'scrapingdog': 'credits',
+    'youtube': 'units',
+    'elevenlabs': 'characters',
+    'google_drive': 'uploads',
+}
+
+
+class QuotaLedger:
+    """
+    Daily usage per provider, shared by every process that opens the same file. Limits come from
+    'provider_quotas'; providers without one are counted but never hold a record back.
+    Reservations cover what admitted records are still expected to spend. They live in the same
+    file, so every worker sees them, and lapse after `reservation_ttl` seconds in case the
+    worker that made them died before releasing them.
+    Writes may wait on another worker's lock, so charge(), admit() and release() run in a thread
+    and leave the event loop (and the lease renewals on it) alone; each thread gets its own connection.
+    """
+
+    def __init__(self, db_path: str, limits: Dict[str, float] = None, reservation_ttl: float = 3600.0):
+        self.db_path = db_path
+        self.limits = dict(limits or {})
+        self.reservation_ttl = reservation_ttl
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS usage (
+                provider TEXT NOT NULL,
+                day TEXT NOT NULL,
+                amount REAL NOT NULL,
+                PRIMARY KEY (provider, day)
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS reservations (
+                record_id TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                provider TEXT NOT NULL,
+                amount REAL NOT NULL,
+                expires REAL NOT NULL,
+                PRIMARY KEY (record_id, stage, provider)
+            )
+        """)
+        self.conn.commit()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """This thread's connection to the ledger file"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Several workers may write at once; wait for the lock rather than fail
+            conn = self._local.conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @staticmethod
+    def today() -> str:
+        """Quotas reset at midnight UTC"""
+        return datetime.now(timezone.utc).strftime('%Y-%m-%d')
+
+    @staticmethod
+    def seconds_until_reset() -> float:
+        now = datetime.now(timezone.utc)
+        tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        return (tomorrow - now).total_seconds()
+
+    async def charge(self, provider: str, amount: float):
+        """Record `amount` consumed by one call"""
+        if amount:
+            await asyncio.to_thread(self._charge, provider, amount)
+
+    def _charge(self, provider: str, amount: float):
+        self.conn.execute(
+            "INSERT INTO usage (provider, day, amount) VALUES (?, ?, ?) "
+            "ON CONFLICT(provider, day) DO UPDATE SET amount = amount + excluded.amount",
+            (provider, self.today(), float(amount))
+        )
+        self.conn.commit()
+
+    def used(self, provider: str) -> float:
+        """Consumed today, by this and every other process"""
+        row = self.conn.execute(
+            "SELECT amount FROM usage WHERE provider = ? AND day = ?",
+            (provider, self.today())
+        ).fetchone()
+        return row[0] if row else 0.0
+
+    def reserved(self, provider: str) -> float:
+        """Held for admitted records, by this and every other process"""
+        row = self.conn.execute(
+            "SELECT SUM(amount) FROM reservations WHERE provider = ? AND expires > ?",
+            (provider, time.time())
+        ).fetchone()
+        return row[0] or 0.0
+
+    def remaining(self, provider: str) -> Optional[float]:
+        """Left today after usage and reservations; None if the provider has no limit"""
+        if provider not in self.limits:
+            return None
+        return self.limits[provider] - self.used(provider) - self.reserved(provider)
+
+    async def admit(self, record_id: str, stage_costs: Dict[str, Dict[str, float]]) -> Optional[str]:
+        """
+        Reserve what a record's remaining stages are expected to spend. Returns None when it fits,
+        otherwise why not, in which case nothing is reserved.
+        """
+        return await asyncio.to_thread(self._admit, record_id, stage_costs)
+
+    def _admit(self, record_id: str, stage_costs: Dict[str, Dict[str, float]]) -> Optional[str]:
+        totals: Dict[str, float] = {}
+        for costs in stage_costs.values():
+            for provider, amount in costs.items():
+                totals[provider] = totals.get(provider, 0.0) + amount
+
+        now = time.time()
+        # Check and reserve under the write lock, so two workers cannot both take the last of a quota
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute("DELETE FROM reservations WHERE expires <= ? OR record_id = ?", (now, record_id))
+            for provider, amount in totals.items():
+                left = self.remaining(provider)
+                if left is not None and amount > left:
+                    self.conn.commit()
+                    unit = PROVIDER_UNITS.get(provider, 'units')
+                    return f"{provider} quota: needs {amount:g} {unit}, {max(left, 0):g} left today"
+            self.conn.executemany(
+                "INSERT INTO reservations (record_id, stage, provider, amount, expires) VALUES (?, ?, ?, ?, ?)",
+                [(record_id, stage, provider, float(amount), now + self.reservation_ttl)
+                 for stage, costs in stage_costs.items() for provider, amount in costs.items()]
+            )
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        return None
+
+    async def release(self, record_id: str, stage: str = None):
+        """Drop a stage's reservation once it has run (its real usage is charged), or the whole record's"""
+        await asyncio.to_thread(self._release, record_id, stage)
+
+    def _release(self, record_id: str, stage: str = None):
+        if stage is None:
+            self.conn.execute("DELETE FROM reservations WHERE record_id = ?", (record_id,))
+        else:
+            self.conn.execute("DELETE FROM reservations WHERE record_id = ? AND stage = ?", (record_id, stage))
+        self.conn.commit()
+
+    def summary(self) -> Dict[str, Dict]:
+        providers = set(self.limits) | {
+            row[0] for row in self.conn.execute("SELECT provider FROM usage WHERE day = ?", (self.today(),))
+        }
+        return {
+            provider: {'used': self.used(provider), 'limit': self.limits.get(provider)}
+            for provider in sorted(providers)
+        }
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+
+def meter_anthropic(client, ledger: QuotaLedger):
+    """Charge the input and output tokens of every messages.create call made through `client` (an AsyncAnthropic)"""
+    messages = client.messages
+    create = messages.create
+
+    async def metered_create(*args, **kwargs):
+        response = await create(*args, **kwargs)
+        usage = getattr(response, 'usage', None)
+        if usage is not None:
+            await ledger.charge('anthropic', (usage.input_tokens or 0) + (usage.output_tokens or 0))
+        return response
+
+    messages.create = metered_create
+    return client
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Record Context
+One in-memory copy of an Airtable record shared by every stage of a run
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RecordContext:
+    """Fields are read once at the start of a run; writes are buffered until flush()"""
+    record_id: str
+    fields: Dict[str, Any] = field(default_factory=dict)
+    pending: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_record(cls, record: Dict) -> 'RecordContext':
+        """Wrap a raw Airtable record ({'id': ..., 'fields': {...}})"""
+        return cls(record_id=record['id'], fields=dict(record.get('fields', {})))
+
+    @classmethod
+    async def load(cls, airtable_server, record_id: str) -> 'RecordContext':
+        """Read the record from Airtable once"""
+        record = await airtable_server.get_record_by_id(record_id)
+        if not record:
+            raise ValueError(f"Record {record_id} not found")
+        return cls.from_record(record)
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self.fields.get(name, default)
+
+    def update(self, updates: Dict[str, Any]) -> None:
+        """Apply updates locally and queue the ones that change something for the next flush"""
+        changed = {name: value for name, value in updates.items() if self.fields.get(name) != value}
+        self.fields.update(changed)
+        self.pending.update(changed)
+
+    def products(self) -> List[Dict]:
+        """Products 1-5 that have a title, in Airtable field order"""
+        products = []
+        for i in range(1, 6):
+            title = self.fields.get(f'ProductNo{i}Title')
+            if title:
+                products.append({
+                    'number': i,
+                    'title': title,
+                    'description': self.fields.get(f'ProductNo{i}Description', '')
+                })
+        return products
+
+    async def flush(self, airtable_server) -> bool:
+        """Write every queued field in a single Airtable update"""
+        if not self.pending:
+            return True
+        updates, self.pending = self.pending, {}
+        if await airtable_server.update_record(self.record_id, updates):
+            logger.info(f"💾 Flushed {len(updates)} fields for {self.record_id}")
+            return True
+        # Keep the writes queued so the next flush retries them
+        self.pending = {**updates, **self.pending}
+        return False
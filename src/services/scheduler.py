@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Workflow Scheduler
+Long-running daemon that keeps the orchestrator warm and drains Pending records as they appear
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+from typing import Awaitable, Callable, Dict
+
+from mcp_servers.airtable_server import AirtableMCPServer
+
+logger = logging.getLogger(__name__)
+
+
+class WorkflowScheduler:
+    """Polls Airtable on an adaptive interval and keeps up to `concurrency` records in flight"""
+
+    def __init__(self, orchestrator, concurrency: int = 2,
+                 min_interval: float = 15.0, max_interval: float = 600.0,
+                 retry_delay: float = 900.0, leases=None, slots=None, queue=None):
+        self.orchestrator = orchestrator
+        self.leases = leases
+        # Shared run slots (e.g. a tenant's share of a multi-channel daemon), taken per record
+        self.slots = slots
+        # PendingQueue that decides which Pending records go first; without one, oldest first
+        self.queue = queue
+        self.concurrency = concurrency
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.retry_delay = retry_delay
+
+        self.interval = min_interval
+        self.processed = 0
+        self.failed = 0
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._retry_at: Dict[str, float] = {}
+        self._holders: Dict[str, asyncio.Task] = {}
+        self._stopping = None
+        self._wakeup = None
+        # Set while draining for a config change; no new records start
+        self._paused = False
+
+    @property
+    def in_flight(self) -> int:
+        """Records running right now"""
+        return len(self._inflight)
+
+    def stop(self):
+        """Stop polling; records already in flight are allowed to finish"""
+        if self._stopping and not self._stopping.is_set():
+            logger.info("🛑 Scheduler stopping, draining in-flight records...")
+            self._stopping.set()
+            self._wakeup.set()
+
+    async def reconfigure(self, apply: Callable[[], Awaitable[None]]):
+        """Stop starting records, let the in-flight ones finish, run `apply`, then carry on"""
+        self._paused = True
+        try:
+            while self._inflight:
+                await asyncio.gather(*self._inflight.values(), return_exceptions=True)
+            await apply()
+        finally:
+            self._paused = False
+            if self._wakeup:
+                self._wakeup.set()
+
+    async def run(self):
+        """Poll and process until stop() is called"""
+        self._stopping = asyncio.Event()
+        self._wakeup = asyncio.Event()
+        logger.info(f"⏰ Scheduler started (concurrency={self.concurrency}, "
+                    f"poll {self.min_interval:.0f}-{self.max_interval:.0f}s)")
+
+        await self._resume_unfinished()
+
+        while not self._stopping.is_set():
+            found = await self._fill_slots()
+            if found or self._inflight:
+                self.interval = self.min_interval
+            else:
+                # Nothing to do: back off so an idle daemon barely touches Airtable
+                self.interval = min(self.interval * 2, self.max_interval)
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+        if self._inflight:
+            await asyncio.gather(*self._inflight.values(), return_exceptions=True)
+        logger.info(f"✅ Scheduler stopped. Processed {self.processed}, failed {self.failed}")
+
+    async def _resume_unfinished(self):
+        """Pick up records a previous process left part way through"""
+        for record_id in self.orchestrator.checkpoints.unfinished_records():
+            if len(self._inflight) >= self.concurrency:
+                break
+            if self.leases and not await self.leases.claim(record_id):
+                continue
+            record = await self.orchestrator.airtable_server.get_record_by_id(record_id)
+            if record:
+                logger.info(f"♻️ Resuming unfinished record {record_id}")
+                self._start(AirtableMCPServer.to_pending_title(record))
+
+    async def _fill_slots(self) -> bool:
+        """Start Pending records in free slots; returns True if work was found"""
+        free = self.concurrency - len(self._inflight)
+        if free <= 0 or self._paused:
+            return True
+
+        now = time.monotonic()
+        self._retry_at = {rid: at for rid, at in self._retry_at.items() if at > now}
+
+        if self.queue:
+            # Scan the whole Pending backlog so urgent records jump ahead of older ones
+            await self.queue.refresh()
+            if self.leases:
+                # Records whose worker died mid-run come back once their lease runs out
+                self.queue.push(await self.leases.expired_leases(limit=free))
+            records = self.queue.take(free, skip=set(self._inflight) | set(self._retry_at))
+        else:
+            # Records stay Pending while in flight or backing off, so ask for enough to see past them
+            limit = min(100, free + len(self._inflight) + len(self._retry_at))
+            records = await self.orchestrator.airtable_server.get_pending_records(limit=limit)
+            if self.leases:
+                # Records whose worker died mid-run come back once their lease runs out
+                records += await self.leases.expired_leases(limit=free)
+            records = [
+                record for record in records
+                if record['id'] not in self._inflight and record['id'] not in self._retry_at
+            ]
+
+        started = 0
+        for record in records:
+            record_id = record['id']
+            if self.leases and not (self.leases.is_available(record) and await self.leases.claim(record_id)):
+                continue
+            self._start(AirtableMCPServer.to_pending_title(record))
+            started += 1
+            if started >= free:
+                break
+        return started > 0
+
+    def _start(self, pending_title: Dict):
+        """Launch one record in the background"""
+        record_id = pending_title['record_id']
+        task = asyncio.create_task(self._process(pending_title))
+        self._inflight[record_id] = task
+        if self.leases:
+            self._holders[record_id] = asyncio.create_task(self.leases.hold(record_id, task))
+
+        def done(_task):
+            self._inflight.pop(record_id, None)
+            holder = self._holders.pop(record_id, None)
+            if holder:
+                holder.cancel()
+            self._wakeup.set()
+
+        task.add_done_callback(done)
+
+    async def _process(self, pending_title: Dict):
+        """Run one record and remember failures so they are not retried right away"""
+        record_id = pending_title['record_id']
+        result = {}
+        cancelled = False
+        try:
+            async with self.slots or contextlib.nullcontext():
+                result = await self.orchestrator.process_record(pending_title)
+            ok = result['success']
+        except asyncio.CancelledError:
+            # Shutdown, or the lease holder gave up on a record another worker took over
+            cancelled = True
+            ok = False
+        except Exception as e:
+            logger.error(f"❌ Record {record_id} crashed: {e}")
+            ok = False
+
+        cooldown = self.retry_delay
+        if ok:
+            self.processed += 1
+            self._retry_at.pop(record_id, None)
+        elif cancelled:
+            # Not counted as a failure, but not picked up again by this worker right away either
+            self._retry_at[record_id] = time.monotonic() + self.retry_delay
+            cooldown = 0.0
+            logger.warning(f"⚠️ Record {record_id} cancelled")
+        elif result.get('deferred'):
+            # Not a failure: the record waits until the provider quota it needs has reset
+            cooldown = result['retry_after']
+            self._retry_at[record_id] = time.monotonic() + cooldown
+            logger.info(f"⏸️ Record {record_id} deferred for {cooldown:.0f}s: {result['error']}")
+        else:
+            self.failed += 1
+            self._retry_at[record_id] = time.monotonic() + self.retry_delay
+            logger.warning(f"⚠️ Record {record_id} failed, retrying in {self.retry_delay:.0f}s at the earliest")
+
+        try:
+            if self.leases:
+                # Shielded, so a second cancel during shutdown cannot leave the record Processing
+                await asyncio.shield(self.leases.release(record_id, ok, cooldown=cooldown))
+        finally:
+            if cancelled:
+                raise asyncio.CancelledError()
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Settings
+Loads api_keys.json once per process, applies environment overrides and exposes the typed
+settings (limits, timeouts, directories) the orchestrator and its services need
+"""
+
+import json
+import logging
+import os
+import urllib.parse
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .pending_queue import PriorityRule, parse_rules
+
+logger = logging.getLogger(__name__)
+
+# The checkout root: /home/claude-workflow on the host, /app in Docker
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Environment variables that locate files rather than override keys
+CONFIG_FILE_ENV = 'WORKFLOW_CONFIG'
+CONFIG_DIR_ENV = 'WORKFLOW_CONFIG_DIR'
+OUTPUT_DIR_ENV = 'WORKFLOW_OUTPUT_DIR'
+
+# Secrets can come from the environment under their conventional names
+ENV_KEYS = {
+    'ANTHROPIC_API_KEY': 'anthropic_api_key',
+    'OPENAI_API_KEY': 'openai_api_key',
+    'AIRTABLE_API_TOKEN': 'airtable_api_key',
+    'AIRTABLE_BASE_ID': 'airtable_base_id',
+    'AIRTABLE_TABLE_NAME': 'airtable_table_name',
+    'ELEVENLABS_API_KEY': 'elevenlabs_api_key',
+    'JSON2VIDEO_API_KEY': 'json2video_api_key',
+}
+
+# Any other key can be set as WORKFLOW_<KEY>; values are parsed as JSON when they are JSON
+ENV_PREFIX = 'WORKFLOW_'
+
+# Where each provider's API lives; 'provider_urls' in the config points them elsewhere,
+# e.g. at the local stand-ins bench/ runs against
+PROVIDER_URLS = {
+    'airtable': 'https://api.airtable.com/v0',
+    'anthropic': 'https://api.anthropic.com',
+    'amazon': 'https://www.amazon.com',
+    'scrapingdog': 'https://api.scrapingdog.com',
+    'json2video': 'https://api.json2video.com/v2',
+    'elevenlabs': 'https://api.elevenlabs.io/v1',
+    # Drive and YouTube use the root URLs of their discovery documents unless this is set
+    'google': None,
+}
+
+# Keys without which the orchestrator cannot start
+REQUIRED_KEYS = ['anthropic_api_key', 'airtable_api_key', 'airtable_base_id', 'airtable_table_name']
+
+
+class ConfigError(ValueError):
+    """The configuration is missing or has a value of the wrong shape"""
+
+
+def config_dir() -> str:
+    return os.environ.get(CONFIG_DIR_ENV) or os.path.join(PROJECT_ROOT, 'config')
+
+
+def output_dir() -> str:
+    return os.environ.get(OUTPUT_DIR_ENV) or os.path.join(PROJECT_ROOT, 'output')
+
+
+def config_path() -> str:
+    return os.environ.get(CONFIG_FILE_ENV) or os.path.join(config_dir(), 'api_keys.json')
+
+
+def _env_value(raw: str):
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return raw
+
+
+def _env_overrides(environ) -> Dict:
+    overrides = {}
+    for name, key in ENV_KEYS.items():
+        if environ.get(name):
+            overrides[key] = environ[name]
+    located = {CONFIG_FILE_ENV, CONFIG_DIR_ENV, OUTPUT_DIR_ENV}
+    for name, raw in environ.items():
+        if name.startswith(ENV_PREFIX) and name not in located:
+            overrides[name[len(ENV_PREFIX):].lower()] = _env_value(raw)
+    return overrides
+
+
+def read_config(path: str = None, environ=None) -> Dict:
+    """Read api_keys.json from disk, apply environment overrides and fill in default file locations"""
+    path = path or config_path()
+    environ = os.environ if environ is None else environ
+    try:
+        with open(path, 'r') as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        raise ConfigError(f"Config file not found: {path} (set {CONFIG_FILE_ENV} or {CONFIG_DIR_ENV})")
+    except json.JSONDecodeError as e:
+        raise ConfigError(f"Config file {path} is not valid JSON: {e}")
+
+    config.update(_env_overrides(environ))
+
+    # Credential files live next to api_keys.json unless configured otherwise
+    directory = os.path.dirname(os.path.abspath(path))
+    config.setdefault('google_drive_credentials', os.path.join(directory, 'google_drive_credentials.json'))
+    config.setdefault('youtube_credentials', os.path.join(directory, 'youtube_credentials.json'))
+    config.setdefault('youtube_token', os.path.join(directory, 'youtube_token.json'))
+    return config
+
+
+_config: Optional[Dict] = None
+_settings: Optional['Settings'] = None
+
+
+def load_config(reload: bool = False) -> Dict:
+    """
+    The process-wide config dict, read from disk on first call only.
+    Every caller gets the same dict; reload=True reads the file again.
+    """
+    global _config, _settings
+    if _config is None or reload:
+        _config = read_config()
+        _settings = None
+        logger.info(f"⚙️ Loaded config from {config_path()}")
+    return _config
+
+
+def get_settings(reload: bool = False) -> 'Settings':
+    """Typed view of load_config(), validated once and cached with it"""
+    global _settings
+    config = load_config(reload)
+    if _settings is None:
+        _settings = Settings.from_config(config)
+    return _settings
+
+
+def reload_settings() -> Tuple[Dict, 'Settings']:
+    """
+    Read the config file again and make it the process-wide config, but only if it validates;
+    on a ConfigError the previous config stays in place.
+    """
+    global _config, _settings
+    config = read_config()
+    require(config)
+    settings = Settings.from_config(config)
+    tenant_configs(config)
+    _config, _settings = config, settings
+    logger.info(f"⚙️ Reloaded config from {config_path()}")
+    return config, settings
+
+
+def provider_url(config: Dict, name: str) -> Optional[str]:
+    """Base URL of a provider's API without a trailing slash, honouring 'provider_urls' overrides"""
+    url = (config.get('provider_urls') or {}).get(name, PROVIDER_URLS[name])
+    return url.rstrip('/') if url else None
+
+
+def rebase_url(url: str, base: str) -> str:
+    """Move `url` onto `base`, keeping its path and query"""
+    parts = urllib.parse.urlsplit(url)
+    rest = parts.path + (f'?{parts.query}' if parts.query else '')
+    return base.rstrip('/') + rest
+
+
+def require(config: Dict, keys: Iterable[str] = REQUIRED_KEYS):
+    """Raise ConfigError naming every key in `keys` that is missing or empty"""
+    missing = [key for key in keys if not config.get(key)]
+    if missing:
+        raise ConfigError(f"Missing config keys: {', '.join(missing)}")
+
+
+def _positive(key: str, value, kind=float, optional: bool = False):
+    if value is None and optional:
+        return None
+    try:
+        number = kind(value)
+    except (TypeError, ValueError):
+        raise ConfigError(f"{key} must be a number, got {value!r}")
+    if number <= 0:
+        raise ConfigError(f"{key} must be positive, got {value!r}")
+    return number
+
+
+def _mapping(config: Dict, key: str) -> Dict:
+    values = config.get(key) or {}
+    if not isinstance(values, dict):
+        raise ConfigError(f"{key} must be an object, got {type(values).__name__}")
+    return values
+
+
+def _weights(config: Dict, key: str) -> Dict[str, float]:
+    values = _mapping(config, key)
+    weights = {}
+    for name, value in values.items():
+        if not isinstance(value, (int, float)) or value < 0:
+            raise ConfigError(f"{key}.{name} must be a number of at least 0, got {value!r}")
+        weights[name] = float(value)
+    return weights
+
+
+def _priority_rules(config: Dict) -> List[PriorityRule]:
+    try:
+        return parse_rules(config.get('pending_priority'))
+    except ValueError as e:
+        raise ConfigError(str(e))
+
+
+def _positive_map(config: Dict, key: str, kind=float, optional: bool = False) -> Dict:
+    values = config.get(key, {})
+    if not isinstance(values, dict):
+        raise ConfigError(f"{key} must be an object, got {type(values).__name__}")
+    return {name: _positive(f"{key}.{name}", value, kind, optional) for name, value in values.items()}
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Typed, validated settings. Stage maps hold only the overrides, the runner owns the defaults;
+    a timeout of None means no limit.
+    """
+    config_dir: str
+    output_dir: str
+    checkpoint_db: str
+    spool_dir: str
+    google_drive_credentials: str
+    youtube_credentials: str
+    youtube_token: str
+    stage_concurrency: Dict[str, int] = field(default_factory=dict)
+    stage_timeouts: Dict[str, Optional[float]] = field(default_factory=dict)
+    pipeline_phases: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    record_timeout: Optional[float] = 1800
+    spool_download_timeout: float = 300
+    youtube_download_timeout: float = 120
+    lease_ttl: float = 600
+    poll_min_seconds: float = 15
+    poll_max_seconds: float = 600
+    retry_failed_after: float = 900
+    category_weights: Dict[str, float] = field(default_factory=dict)
+    category_batch_size: int = 5
+    pending_priority: List[PriorityRule] = field(default_factory=list)
+    pending_scan_limit: int = 1000
+    quota_db: str = ''
+    provider_quotas: Dict[str, float] = field(default_factory=dict)
+    stage_quota_costs: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    fleet_db: str = ''
+    autoscale_interval: float = 60
+    autoscale_drain_seconds: float = 1800
+    autoscale_scale_down_after: float = 300
+    config_watch_interval: float = 5
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'Settings':
+        output = config.get('output_dir', output_dir())
+        phases = config.get('pipeline_phases', {})
+        if not isinstance(phases, dict):
+            raise ConfigError(f"pipeline_phases must be an object, got {type(phases).__name__}")
+        settings = cls(
+            config_dir=config_dir(),
+            output_dir=output,
+            checkpoint_db=config.get('checkpoint_db', os.path.join(output, 'pipeline_checkpoints.db')),
+            spool_dir=config.get('spool_dir', os.path.join(output, 'spool')),
+            google_drive_credentials=config['google_drive_credentials'],
+            youtube_credentials=config['youtube_credentials'],
+            youtube_token=config['youtube_token'],
+            stage_concurrency=_positive_map(config, 'stage_concurrency', int),
+            stage_timeouts=_positive_map(config, 'stage_timeouts', optional=True),
+            pipeline_phases={name: _positive_map(phases, name, int) for name in phases},
+            record_timeout=_positive('record_timeout_seconds', config.get('record_timeout_seconds', 1800), optional=True),
+            spool_download_timeout=_positive('spool_download_timeout', config.get('spool_download_timeout', 300)),
+            youtube_download_timeout=_positive('youtube_download_timeout', config.get('youtube_download_timeout', 120)),
+            lease_ttl=_positive('lease_ttl_seconds', config.get('lease_ttl_seconds', 600)),
+            poll_min_seconds=_positive('poll_min_seconds', config.get('poll_min_seconds', 15)),
+            poll_max_seconds=_positive('poll_max_seconds', config.get('poll_max_seconds', 600)),
+            retry_failed_after=_positive('retry_failed_after_seconds', config.get('retry_failed_after_seconds', 900)),
+            category_weights=_weights(config, 'category_weights'),
+            category_batch_size=_positive('category_batch_size', config.get('category_batch_size', 5), int),
+            pending_priority=_priority_rules(config),
+            pending_scan_limit=_positive('pending_scan_limit', config.get('pending_scan_limit', 1000), int),
+            quota_db=config.get('quota_db', os.path.join(output, 'quota_ledger.db')),
+            provider_quotas=_positive_map(config, 'provider_quotas'),
+            stage_quota_costs={stage: _weights(costs, stage) for stage, costs in _mapping(config, 'stage_quota_costs').items()},
+            fleet_db=config.get('fleet_db', os.path.join(output, 'fleet_signals.db')),
+            autoscale_interval=_positive('autoscale_interval_seconds', config.get('autoscale_interval_seconds', 60)),
+            autoscale_drain_seconds=_positive('autoscale_drain_seconds', config.get('autoscale_drain_seconds', 1800)),
+            autoscale_scale_down_after=_positive('autoscale_scale_down_after_seconds',
+                                                 config.get('autoscale_scale_down_after_seconds', 300)),
+            config_watch_interval=_positive('config_watch_interval_seconds', config.get('config_watch_interval_seconds', 5)),
+        )
+        if settings.poll_min_seconds > settings.poll_max_seconds:
+            raise ConfigError("poll_min_seconds must not exceed poll_max_seconds")
+        return settings
+
+
+@dataclass(frozen=True)
+class Tenant:
+    """One channel served by a multi-tenant daemon"""
+    name: str
+    weight: float
+    config: Dict
+
+
+def tenant_configs(config: Dict) -> List[Tenant]:
+    """
+    Expand the 'tenants' list into one full config per channel. Each entry overrides the
+    shared keys (Airtable base, YouTube token, WordPress site, ...) and may set a 'weight';
+    relative credential paths are resolved against the config directory.
+    """
+    entries = config.get('tenants') or []
+    if not isinstance(entries, list):
+        raise ConfigError(f"tenants must be a list, got {type(entries).__name__}")
+    shared = {key: value for key, value in config.items() if key != 'tenants'}
+    output = config.get('output_dir', output_dir())
+
+    tenants = []
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict) or not entry.get('name'):
+            raise ConfigError(f"tenants[{index}] needs a name")
+        name = entry['name']
+        if any(tenant.name == name for tenant in tenants):
+            raise ConfigError(f"Duplicate tenant name: {name}")
+        weight = _positive(f"tenants[{index}].weight", entry.get('weight', 1))
+
+        tenant_config = dict(shared)
+        tenant_config.update({key: value for key, value in entry.items() if key not in ('name', 'weight')})
+        for key in ('google_drive_credentials', 'youtube_credentials', 'youtube_token'):
+            tenant_config[key] = os.path.join(config_dir(), tenant_config[key])
+        # Records of one base are never resumed by another channel's scheduler
+        tenant_config.setdefault('checkpoint_db', os.path.join(output, f'pipeline_checkpoints_{name}.db'))
+        require(tenant_config)
+        Settings.from_config(tenant_config)
+        tenants.append(Tenant(name, weight, tenant_config))
+    return tenants
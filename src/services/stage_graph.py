@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Stage Graph Executor
+Runs a declarative graph of pipeline stages, overlapping stages whose inputs are ready
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+StageFunc = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+# Stage statuses that let dependents run
+FINISHED = ('done', 'restored')
+
+
+@dataclass
+class Stage:
+    """One pipeline step: reads named inputs, produces named outputs"""
+    name: str
+    func: StageFunc
+    inputs: List[str] = field(default_factory=list)
+    outputs: List[str] = field(default_factory=list)
+    concurrency: int = 1
+    # Seconds the stage may run before it is cancelled and counted as failed; None means no limit
+    timeout: Optional[float] = None
+    # Decides whether outputs are worth checkpointing; None means always
+    checkpoint_if: Optional[Callable[[Dict[str, Any]], bool]] = None
+    # Picks the part of the inputs that decides the result; None means all of them
+    fingerprint: Optional[Callable[[Dict[str, Any]], Any]] = None
+
+
+class StageGraph:
+    """Validates the stage graph once and runs it as many times as needed"""
+
+    def __init__(self, stages: List[Stage], initial_inputs: List[str] = None,
+                 limiters: Dict[str, Any] = None):
+        self.stages = {}
+        self.producers = {}
+        self.initial_inputs = set(initial_inputs or [])
+
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage name: {stage.name}")
+            if stage.concurrency < 1:
+                raise ValueError(f"Stage {stage.name} needs a concurrency limit of at least 1")
+            if stage.timeout is not None and stage.timeout <= 0:
+                raise ValueError(f"Stage {stage.name} needs a positive timeout")
+            self.stages[stage.name] = stage
+            for output in stage.outputs:
+                if output in self.producers or output in self.initial_inputs:
+                    raise ValueError(f"Output '{output}' is produced more than once")
+                self.producers[output] = stage.name
+
+        for stage in stages:
+            for name in stage.inputs:
+                if name not in self.producers and name not in self.initial_inputs:
+                    raise ValueError(f"Stage {stage.name} needs '{name}' but nothing produces it")
+
+        self.order = self._topological_order()
+
+        # Semaphores live on the graph so the limit holds across concurrent runs;
+        # `limiters` swaps in async context managers shared with other graphs
+        unknown = set(limiters or {}) - set(self.stages)
+        if unknown:
+            raise ValueError(f"Limiters for unknown stages: {sorted(unknown)}")
+        self._semaphores = {
+            name: (limiters or {}).get(name) or asyncio.Semaphore(stage.concurrency)
+            for name, stage in self.stages.items()
+        }
+
+    def dependencies(self, stage_name: str) -> List[str]:
+        """Names of the stages whose outputs this stage reads"""
+        deps = []
+        for name in self.stages[stage_name].inputs:
+            producer = self.producers.get(name)
+            if producer and producer not in deps:
+                deps.append(producer)
+        return deps
+
+    def downstream(self, stage_names: List[str]) -> List[str]:
+        """The given stages plus every stage that depends on them, in run order"""
+        unknown = set(stage_names) - set(self.stages)
+        if unknown:
+            raise ValueError(f"Unknown stages: {sorted(unknown)}")
+        affected = set(stage_names)
+        for name in self.order:
+            if any(dep in affected for dep in self.dependencies(name)):
+                affected.add(name)
+        return [name for name in self.order if name in affected]
+
+    def input_hash(self, stage_name: str, inputs: Dict[str, Any]) -> str:
+        """Stable hash of what a stage would be run on"""
+        stage = self.stages[stage_name]
+        key = stage.fingerprint(inputs) if stage.fingerprint else inputs
+        encoded = json.dumps([stage_name, key], sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+    def _restore(self, stage: Stage, inputs: Dict[str, Any], checkpoint, run_id: str,
+                 force: List[str] = None) -> Optional[Dict[str, Any]]:
+        """The checkpointed outputs a run would reuse for this stage, or None if it has to execute"""
+        if not checkpoint or stage.name in (force or []):
+            return None
+        saved = checkpoint.load(run_id, stage.name, self.input_hash(stage.name, inputs))
+        if saved is not None and all(name in saved for name in stage.outputs):
+            return saved
+        return None
+
+    def pending(self, initial: Dict[str, Any], checkpoint=None, run_id: str = None,
+                force: List[str] = None) -> List[str]:
+        """
+        Stages a run with these arguments would execute rather than restore, in run order.
+        Outputs of stages that execute are not known yet, so a stage reading them is checked
+        against its fingerprint of the inputs that are known: a fingerprint that leaves those
+        outputs out (like a never-checkpointed local copy) still finds its checkpoint, while
+        any other stage downstream of one that executes counts as executing too.
+        """
+        values = dict(initial)
+        pending = []
+        for name in self.order:
+            stage = self.stages[name]
+            saved = None
+            known = {key: values[key] for key in stage.inputs if key in values}
+            if len(known) == len(stage.inputs) or stage.fingerprint:
+                try:
+                    saved = self._restore(stage, known, checkpoint, run_id, force)
+                except KeyError:
+                    # The fingerprint reads one of the unknown outputs
+                    saved = None
+            if saved is None:
+                pending.append(name)
+            else:
+                values.update({output: saved[output] for output in stage.outputs})
+        return pending
+
+    def _topological_order(self) -> List[str]:
+        """Order stages so every stage comes after its dependencies"""
+        order = []
+        state = {}
+
+        def visit(name: str, path: List[str]):
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise ValueError(f"Stage graph has a cycle: {' -> '.join(path + [name])}")
+            state[name] = 'visiting'
+            for dep in self.dependencies(name):
+                visit(dep, path + [name])
+            state[name] = 'done'
+            order.append(name)
+
+        for name in self.stages:
+            visit(name, [])
+        return order
+
+    async def run(self, initial: Dict[str, Any], checkpoint=None, run_id: str = None,
+                  stages: List[str] = None, force: List[str] = None,
+                  on_start: Callable[[str], None] = None) -> Dict[str, Any]:
+        """
+        Run every stage as soon as its inputs exist.
+        A failed (or timed out) stage skips its dependents; independent branches keep going.
+        Cancelling the run cancels every stage still in flight.
+        With a checkpoint store, stages saved under run_id for the same inputs are restored
+        instead of re-run, the way make skips targets that are up to date; stages in `force` always run.
+        `stages` limits the run to a subset; inputs from stages outside it must be in `initial`.
+        `on_start` is called with a stage name whenever a stage actually starts executing.
+        """
+        missing = self.initial_inputs - set(initial)
+        if missing:
+            raise ValueError(f"Missing initial inputs: {sorted(missing)}")
+        unknown = set(stages or []) - set(self.stages)
+        if unknown:
+            raise ValueError(f"Unknown stages: {sorted(unknown)}")
+        selected = [name for name in self.order if stages is None or name in stages]
+
+        values = dict(initial)
+        report = {}
+        tasks = {}
+
+        async def run_stage(stage: Stage):
+            deps = self.dependencies(stage.name)
+            internal = [dep for dep in deps if dep in tasks]
+            if internal:
+                await asyncio.gather(*(tasks[dep] for dep in internal))
+
+            blocked = [dep for dep in internal if report[dep]['status'] not in FINISHED]
+            # Stages outside this run count as finished only if their outputs were handed in
+            blocked += [
+                self.producers[name] for name in stage.inputs
+                if self.producers.get(name) not in (None, *internal) and name not in values
+            ]
+            if blocked:
+                report[stage.name] = {
+                    'status': 'skipped',
+                    'seconds': 0.0,
+                    'error': f"upstream stage(s) did not finish: {', '.join(blocked)}"
+                }
+                return
+
+            inputs = {name: values[name] for name in stage.inputs}
+            input_hash = self.input_hash(stage.name, inputs) if checkpoint else None
+            saved = self._restore(stage, inputs, checkpoint, run_id, force)
+            if saved is not None:
+                for name in stage.outputs:
+                    values[name] = saved[name]
+                report[stage.name] = {'status': 'restored', 'seconds': 0.0, 'error': None}
+                return
+
+            async with self._semaphores[stage.name]:
+                started = time.monotonic()
+                if on_start:
+                    on_start(stage.name)
+                try:
+                    # The deadline starts once the stage holds its slot, so queueing does not count
+                    outputs = await asyncio.wait_for(stage.func(inputs), timeout=stage.timeout) or {}
+                    missing_outputs = [name for name in stage.outputs if name not in outputs]
+                    if missing_outputs:
+                        raise ValueError(f"Stage did not produce {missing_outputs}")
+                    for name in stage.outputs:
+                        values[name] = outputs[name]
+                    if checkpoint and (stage.checkpoint_if is None or stage.checkpoint_if(outputs)):
+                        checkpoint.save(run_id, stage.name, {name: outputs[name] for name in stage.outputs},
+                                        input_hash)
+                    report[stage.name] = {
+                        'status': 'done',
+                        'seconds': time.monotonic() - started,
+                        'error': None
+                    }
+                except Exception as e:
+                    error = str(e)
+                    if isinstance(e, asyncio.TimeoutError) and stage.timeout:
+                        error = f"timed out after {stage.timeout:g}s"
+                    logger.error(f"❌ Stage {stage.name} failed: {error}")
+                    report[stage.name] = {
+                        'status': 'failed',
+                        'seconds': time.monotonic() - started,
+                        'error': error
+                    }
+
+        for name in selected:
+            tasks[name] = asyncio.create_task(run_stage(self.stages[name]))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        finally:
+            for task in tasks.values():
+                if not task.done():
+                    task.cancel()
+
+        return {
+            'success': all(entry['status'] in FINISHED for entry in report.values()),
+            'outputs': values,
+            'stages': {name: report[name] for name in selected}
+        }
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Staged Pipeline
+Splits the stage graph into phases connected by bounded queues so several records are in flight at once
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+from services.stage_graph import FINISHED, StageGraph
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+@dataclass
+class Phase:
+    """A group of graph stages handled by its own pool of workers"""
+    name: str
+    stages: List[str]
+    workers: int = 1
+    queue_size: int = 2
+
+
+class StagedPipeline:
+    """
+    Producer/consumer pipeline over a StageGraph.
+    Each phase pulls records from its inbound queue and pushes them to the next one;
+    a full queue blocks the phase before it, so throughput follows the slowest phase.
+    """
+
+    def __init__(self, graph: StageGraph, phases: List[Phase], checkpoint=None):
+        covered = [name for phase in phases for name in phase.stages]
+        if sorted(covered) != sorted(graph.stages):
+            raise ValueError("Pipeline phases must cover every graph stage exactly once")
+        for phase in phases:
+            if phase.workers < 1 or phase.queue_size < 1:
+                raise ValueError(f"Phase {phase.name} needs at least one worker and one queue slot")
+
+        self.graph = graph
+        self.phases = phases
+        self.checkpoint = checkpoint
+        self._queues: List[asyncio.Queue] = []
+        self._workers: List[asyncio.Task] = []
+
+    @property
+    def capacity(self) -> int:
+        """Most records the pipeline can hold before submit() blocks"""
+        return sum(phase.workers + phase.queue_size for phase in self.phases)
+
+    def queue_depths(self) -> Dict[str, int]:
+        """Records waiting in front of each phase"""
+        return {phase.name: queue.qsize() for phase, queue in zip(self.phases, self._queues)}
+
+    async def start(self):
+        """Spawn the phase workers"""
+        self._queues = [asyncio.Queue(maxsize=phase.queue_size) for phase in self.phases]
+        for index, phase in enumerate(self.phases):
+            for _ in range(phase.workers):
+                self._workers.append(asyncio.create_task(self._worker(index)))
+        logger.info("🏭 Pipeline started: " + " → ".join(
+            f"{phase.name}(x{phase.workers})" for phase in self.phases))
+
+    async def submit(self, run_id: str, initial: Dict[str, Any], force: List[str] = None) -> Dict[str, Any]:
+        """Feed one record into the pipeline and wait for it to come out the other end"""
+        item = {
+            'run_id': run_id,
+            'values': dict(initial),
+            'force': force,
+            'stages': {},
+            'future': asyncio.get_running_loop().create_future()
+        }
+        await self._queues[0].put(item)
+        return await item['future']
+
+    async def close(self):
+        """Let queued records drain, then stop the workers"""
+        for index, phase in enumerate(self.phases):
+            # Earlier phases are already stopped, so nothing else lands in this queue
+            for _ in range(phase.workers):
+                await self._queues[index].put(_STOP)
+            start, end = self._worker_offset(index), self._worker_offset(index + 1)
+            await asyncio.gather(*self._workers[start:end])
+        self._workers = []
+
+    def _worker_offset(self, phase_index: int) -> int:
+        """Number of worker tasks belonging to phases before phase_index"""
+        return sum(phase.workers for phase in self.phases[:phase_index])
+
+    async def _worker(self, index: int):
+        """Process records for one phase until told to stop"""
+        phase = self.phases[index]
+        queue = self._queues[index]
+        last = index == len(self.phases) - 1
+
+        while True:
+            item = await queue.get()
+            if item is _STOP:
+                return
+            if item['future'].done():
+                # The submitter gave up on this record (e.g. its lease was lost), so drop it
+                continue
+
+            run = asyncio.create_task(self.graph.run(
+                item['values'],
+                checkpoint=self.checkpoint,
+                run_id=item['run_id'],
+                stages=phase.stages,
+                force=item['force']
+            ))
+            # A submitter that gives up (record deadline, lost lease) cancels the phase work too
+            cancel_run = lambda _future, run=run: run.cancel()
+            item['future'].add_done_callback(cancel_run)
+            try:
+                await asyncio.wait([run])
+            finally:
+                item['future'].remove_done_callback(cancel_run)
+                if not run.done():
+                    run.cancel()
+            if run.cancelled():
+                continue
+
+            try:
+                result = run.result()
+                item['values'] = result['outputs']
+                item['stages'].update(result['stages'])
+            except Exception as e:
+                logger.error(f"❌ Phase {phase.name} crashed on {item['run_id']}: {e}")
+                for name in phase.stages:
+                    item['stages'][name] = {'status': 'failed', 'seconds': 0.0, 'error': str(e)}
+
+            if last:
+                if not item['future'].done():
+                    item['future'].set_result({
+                        'success': all(entry['status'] in FINISHED for entry in item['stages'].values()),
+                        'outputs': item['values'],
+                        'stages': {name: item['stages'][name] for name in self.graph.order}
+                    })
+            else:
+                # Blocks while the next phase is full: that is the backpressure
+                await self._queues[index + 1].put(item)
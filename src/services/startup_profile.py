@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Startup Profile
+Summarizes `python -X importtime` so cold-start cost stays visible as modules are added
+"""
+
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List
+
+
+@dataclass
+class ImportTiming:
+    """One line of -X importtime output"""
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def measure_imports(modules: List[str], cwd: str = None) -> List[ImportTiming]:
+    """Import `modules` in order in a fresh interpreter and return its import timings"""
+    code = '; '.join(f'import {module}' for module in modules)
+    env = dict(os.environ)
+    if cwd:
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [cwd, os.path.dirname(cwd), env.get('PYTHONPATH')]))
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=cwd, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {', '.join(modules)} failed:\n{proc.stderr.strip().splitlines()[-1]}")
+
+    timings = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        timings.append(ImportTiming(name.strip(), int(self_us), int(cumulative_us), depth))
+    return timings
+
+
+def summarize(timings: List[ImportTiming], modules: List[str]) -> Dict[str, int]:
+    """Cumulative microseconds of each requested module, on top of everything imported before it"""
+    requested = set(modules)
+    return {t.module: t.cumulative_us for t in timings if t.module in requested and t.depth == 0}
+
+
+def heaviest_packages(timings: List[ImportTiming], limit: int = 10) -> List[tuple]:
+    """Self time grouped by top-level package, largest first"""
+    totals = defaultdict(int)
+    for t in timings:
+        totals[t.module.split('.')[0]] += t.self_us
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+def print_startup_profile(entry: str, lazy_modules: List[str], cwd: str = None, limit: int = 10):
+    """Report what `import entry` costs and what each lazily loaded module adds on first use"""
+    startup = measure_imports([entry], cwd)
+    print(f"🚀 Startup import profile for {entry}")
+    print(f"   import {entry}: {summarize(startup, [entry]).get(entry, 0) / 1000:.1f} ms")
+    print("   Heaviest packages at startup:")
+    for package, us in heaviest_packages(startup, limit):
+        print(f"      {package}: {us / 1000:.1f} ms")
+
+    # Import order matters: each module is charged only for what the ones before it did not load
+    everything = measure_imports([entry] + lazy_modules, cwd)
+    costs = summarize(everything, lazy_modules)
+    print("   Loaded on first use:")
+    for module in lazy_modules:
+        print(f"      {module}: {costs.get(module, 0) / 1000:.1f} ms")
+    print(f"   Everything: {sum(t.self_us for t in everything) / 1000:.1f} ms")
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Tracing
+Spans for every record, stage and outbound HTTP call of a run, written as JSONL and as
+Chrome trace events so a run can be opened in chrome://tracing or Perfetto
+"""
+
+import contextvars
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+import urllib.parse
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from .settings import PROVIDER_URLS, provider_url
+
+logger = logging.getLogger(__name__)
+
+# Hosts that are not in PROVIDER_URLS but that every run talks to
+KNOWN_HOSTS = {
+    'googleapis.com': 'google',
+    'oauth2.googleapis.com': 'google',
+    'amazon.com': 'amazon',
+    'media-amazon.com': 'amazon',
+}
+
+# The span the current task or thread is inside of; stages and calls attach to it
+_current: contextvars.ContextVar[Optional['Span']] = contextvars.ContextVar('trace_span', default=None)
+
+_tracer: Optional['Tracer'] = None
+
+
+class Span:
+    """
+    One timed piece of work. Calls inherit record_id and stage from the span they run in and
+    add their bytes, calls and retries to it when they finish.
+    """
+
+    def __init__(self, tracer: 'Tracer', name: str, kind: str, parent: Optional['Span'], attrs: Dict):
+        self.tracer = tracer
+        self.id = next(tracer._ids)
+        self.parent = parent
+        self.name = name
+        self.kind = kind
+        self.attrs = {'record_id': parent.attrs.get('record_id') if parent else None,
+                      'stage': parent.attrs.get('stage') if parent else None}
+        self.attrs.update(attrs)
+        self.start = time.time()
+        self._started = time.perf_counter()
+        self.seconds = None
+        # (method, endpoint) -> failed calls to it in a row from inside this span; the next call
+        # to it is a retry. Polling an endpoint that answers fine is not
+        self._failures: Dict[tuple, int] = {}
+        self._lock = threading.Lock()
+
+    def set(self, **attrs):
+        """Add or overwrite attributes (outcome, status, ...) before the span ends"""
+        self.attrs.update(attrs)
+
+    def failures(self, method: str, endpoint: str) -> int:
+        """How many calls to `endpoint` in a row have failed inside this span"""
+        with self._lock:
+            return self._failures.get((method, endpoint), 0)
+
+    def called(self, method: str, endpoint: str, failed: bool):
+        with self._lock:
+            self._failures[(method, endpoint)] = self._failures.get((method, endpoint), 0) + 1 if failed else 0
+
+    def add(self, **counts):
+        """Add to numeric attributes, e.g. the bytes a child call moved"""
+        with self._lock:
+            for key, value in counts.items():
+                if value:
+                    self.attrs[key] = self.attrs.get(key, 0) + value
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self._started
+        self.attrs.setdefault('outcome', 'ok')
+        if self.parent and self.kind == 'call':
+            self.parent.called(self.attrs['method'], self.attrs['endpoint'], self.attrs['outcome'] != 'ok')
+            self.parent.add(calls=1, retries=1 if self.attrs['retries'] else 0,
+                            bytes_out=self.attrs.get('bytes_out', 0), bytes_in=self.attrs.get('bytes_in', 0))
+        self.tracer._write(self)
+
+
+class Tracer:
+    """
+    Writes finished spans to spans-<pid>.jsonl and trace-<pid>.json in a directory, one pair per
+    process so leased workers can share it. Both files are flushed per span, and the trace file
+    is a JSON array the viewers open even when a crash left it without its closing bracket.
+    Without a path nothing is written and the spans only go to `listeners`, each called with
+    ('start' | 'end', span).
+    """
+
+    def __init__(self, path: Optional[str], config: Dict = None):
+        self.path = path
+        self.listeners: List[Callable[[str, Span], None]] = []
+        self.pid = os.getpid()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._origin = time.time()
+        self._lanes: Dict[str, int] = {}
+        self._hosts = provider_hosts(config or {})
+        self._patches = []
+        self.spans = 0
+        self._jsonl = None
+        self._chrome = None
+        self._events = 0
+
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self._jsonl = open(os.path.join(path, f'spans-{self.pid}.jsonl'), 'w')
+            self._chrome = open(os.path.join(path, f'trace-{self.pid}.json'), 'w')
+            self._chrome.write('[')
+            self._chrome_event({'name': 'process_name', 'ph': 'M', 'pid': self.pid, 'tid': 0,
+                                'args': {'name': f'workflow_runner {self.pid}'}})
+
+    # ---- spans ----
+
+    @contextmanager
+    def span(self, name: str, kind: str, **attrs):
+        """Time the block as a child of the current span; exceptions mark it failed and propagate"""
+        span = Span(self, name, kind, _current.get(), attrs)
+        self._notify('start', span)
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            # CancelledError is a BaseException: a stage past its deadline ends up here
+            span.set(outcome='cancelled' if type(e).__name__ == 'CancelledError' else 'failed',
+                     error=str(e)[:300] or type(e).__name__)
+            raise
+        finally:
+            _current.reset(token)
+            span.finish()
+
+    def provider(self, url: str) -> str:
+        """Provider name for a URL, or its host when no provider lives there"""
+        host = (urllib.parse.urlsplit(url).hostname or '').lower()
+        while host:
+            if host in self._hosts:
+                return self._hosts[host]
+            host = host.partition('.')[2] if '.' in host else ''
+        return urllib.parse.urlsplit(url).hostname or 'unknown'
+
+    def call(self, method: str, url: str, bytes_out: int = 0):
+        """Span for one outbound request; callers set status and bytes_in on it"""
+        from .cassette import redact_url
+        parent = _current.get()
+        url = redact_url(url)
+        endpoint = url.split('?', 1)[0]
+        retries = parent.failures(method.upper(), endpoint) if parent else 0
+        return self.span(f'{method.upper()} {self.provider(url)}', 'call', provider=self.provider(url),
+                         method=method.upper(), url=url, endpoint=endpoint, bytes_out=bytes_out, retries=retries)
+
+    # ---- output ----
+
+    def _lane(self, span: Span) -> int:
+        # A row per record and stage, so overlapping stages of one record do not stack into each other
+        name = span.attrs.get('record_id') or 'process'
+        if span.attrs.get('stage'):
+            name += f" · {span.attrs['stage']}"
+        lane = self._lanes.get(name)
+        if lane is None:
+            lane = self._lanes[name] = len(self._lanes) + 1
+            self._chrome_event({'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': lane,
+                                'args': {'name': name}})
+        return lane
+
+    def _chrome_event(self, event: Dict):
+        self._chrome.write((',\n' if self._events else '\n') + json.dumps(event, default=str))
+        self._events += 1
+
+    def _notify(self, event: str, span: Span):
+        for listener in self.listeners:
+            try:
+                listener(event, span)
+            except Exception as e:
+                logger.warning(f"⚠️ Span listener failed: {e}")
+
+    def _write(self, span: Span):
+        self._notify('end', span)
+        if self._jsonl is None:
+            return
+        entry = {
+            'id': span.id,
+            'parent': span.parent.id if span.parent else None,
+            'name': span.name,
+            'kind': span.kind,
+            'start': round(span.start, 6),
+            'seconds': round(span.seconds, 6),
+            'pid': self.pid,
+        }
+        entry.update(span.attrs)
+        with self._lock:
+            if self._jsonl.closed:
+                return
+            self._jsonl.write(json.dumps(entry, default=str) + '\n')
+            self._chrome_event({
+                'name': span.name,
+                'cat': span.kind,
+                'ph': 'X',
+                'ts': round((span.start - self._origin) * 1e6),
+                'dur': round(span.seconds * 1e6),
+                'pid': self.pid,
+                'tid': self._lane(span),
+                'args': span.attrs,
+            })
+            self._jsonl.flush()
+            self._chrome.flush()
+            self.spans += 1
+
+    # ---- library hooks ----
+
+    def install(self):
+        """Trace calls of every HTTP library that is importable; returns self for chaining"""
+        for hook in (self._hook_httpx, self._hook_requests, self._hook_httplib2):
+            try:
+                hook()
+            except ImportError:
+                continue
+        if self.path:
+            logger.info(f"🧭 Tracing to {self.path}")
+        return self
+
+    def _patch(self, owner, name: str, replacement):
+        self._patches.append((owner, name, getattr(owner, name)))
+        setattr(owner, name, replacement)
+
+    def _hook_httpx(self):
+        import httpx
+
+        tracer = self
+        sync_send = httpx.HTTPTransport.handle_request
+        async_send = httpx.AsyncHTTPTransport.handle_async_request
+
+        def handle_request(transport, request):
+            with tracer.call(request.method, str(request.url), len(request.read())) as span:
+                response = sync_send(transport, request)
+                span.set(status=response.status_code, bytes_in=int(response.headers.get('content-length', 0)),
+                         outcome='ok' if response.status_code < 400 else 'error')
+                return response
+
+        async def handle_async_request(transport, request):
+            with tracer.call(request.method, str(request.url), len(await request.aread())) as span:
+                response = await async_send(transport, request)
+                span.set(status=response.status_code, bytes_in=int(response.headers.get('content-length', 0)),
+                         outcome='ok' if response.status_code < 400 else 'error')
+                return response
+
+        self._patch(httpx.HTTPTransport, 'handle_request', handle_request)
+        self._patch(httpx.AsyncHTTPTransport, 'handle_async_request', handle_async_request)
+
+    def _hook_requests(self):
+        import requests
+
+        tracer = self
+        send = requests.Session.send
+
+        def patched_send(session, request, **kwargs):
+            body = request.body
+            size = len(body) if isinstance(body, (bytes, str)) else 0
+            with tracer.call(request.method, request.url, size) as span:
+                response = send(session, request, **kwargs)
+                # Without stream=True the body has been read by now
+                received = len(response.content) if not kwargs.get('stream') else \
+                    int(response.headers.get('content-length', 0))
+                span.set(status=response.status_code, bytes_in=received,
+                         outcome='ok' if response.status_code < 400 else 'error')
+                return response
+
+        self._patch(requests.Session, 'send', patched_send)
+
+    def _hook_httplib2(self):
+        import httplib2
+
+        tracer = self
+        request = httplib2.Http.request
+
+        def patched_request(http, uri, method='GET', body=None, headers=None, *args, **kwargs):
+            size = len(body) if isinstance(body, (bytes, str)) else 0
+            with tracer.call(method, uri, size) as span:
+                response, content = request(http, uri, method, body, headers, *args, **kwargs)
+                span.set(status=response.status, bytes_in=len(content or b''),
+                         outcome='ok' if response.status < 400 else 'error')
+                return response, content
+
+        self._patch(httplib2.Http, 'request', patched_request)
+
+    def close(self):
+        """Undo the patches and close both files"""
+        while self._patches:
+            owner, name, original = self._patches.pop()
+            setattr(owner, name, original)
+        with self._lock:
+            if self._jsonl is None or self._jsonl.closed:
+                return
+            self._jsonl.close()
+            self._chrome.write('\n]\n')
+            self._chrome.close()
+
+
+def provider_hosts(config: Dict) -> Dict[str, str]:
+    """Host -> provider name for every configured provider URL, the WordPress site and KNOWN_HOSTS"""
+    hosts = dict(KNOWN_HOSTS)
+    urls = {name: provider_url(config, name) for name in PROVIDER_URLS}
+    urls['wordpress'] = config.get('wordpress_url')
+    for name, url in urls.items():
+        host = urllib.parse.urlsplit(url).hostname if url else None
+        if host:
+            hosts[host.lower()] = name
+    return hosts
+
+
+def install_tracer(tracer: Optional[Tracer]):
+    """Make `tracer` the process-wide tracer; None switches tracing off"""
+    global _tracer
+    _tracer = tracer
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _tracer
+
+
+class _NoSpan:
+    """Stands in for a span when tracing is off, so callers need no checks"""
+
+    def set(self, **attrs):
+        pass
+
+    def add(self, **counts):
+        pass
+
+
+@contextmanager
+def span(name: str, kind: str, **attrs):
+    """A span on the process-wide tracer, or a no-op one when tracing is off"""
+    if _tracer is None:
+        yield _NoSpan()
+        return
+    with _tracer.span(name, kind, **attrs) as current:
+        yield current
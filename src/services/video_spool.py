@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Video Spool
+Downloads a finished render once and shares the local file between every publish target
+"""
+
+import asyncio
+import logging
+import os
+import tempfile
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class VideoSpool:
+    """
+    Lazy local copy of a video URL. The first caller of path() downloads it, later callers
+    wait for that download and get the same file; if nobody asks, nothing is downloaded.
+    The download goes through `client`, a pooled one from the client registry.
+    """
+
+    def __init__(self, url: str, client: httpx.AsyncClient, directory: str = None, timeout: float = 300.0):
+        self.url = url
+        self.client = client
+        self.directory = directory
+        self.timeout = timeout
+        self._path: Optional[str] = None
+        self._lock = asyncio.Lock()
+
+    async def path(self) -> str:
+        """Local file holding the video, downloading it on first use"""
+        async with self._lock:
+            if self._path is None:
+                self._path = await self._download()
+        return self._path
+
+    async def _download(self) -> str:
+        """Stream the video to a spool file, removing the partial file on any failure"""
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+        logger.info(f"📥 Spooling video from: {self.url}")
+        with tempfile.NamedTemporaryFile(suffix='.mp4', dir=self.directory, delete=False) as spool:
+            try:
+                async with asyncio.timeout(self.timeout):
+                    async with self.client.stream('GET', self.url, follow_redirects=True,
+                                                  timeout=httpx.Timeout(self.timeout, connect=10.0)) as response:
+                        response.raise_for_status()
+                        async for chunk in response.aiter_bytes():
+                            spool.write(chunk)
+            except BaseException:
+                spool.close()
+                os.remove(spool.name)
+                raise
+
+        logger.info(f"✅ Spooled video ({os.path.getsize(spool.name) / 1024 / 1024:.2f} MB)")
+        return spool.name
+
+    def close(self):
+        """Delete the spool file once every target is done with it"""
+        if self._path and os.path.exists(self._path):
+            os.remove(self._path)
+        self._path = None
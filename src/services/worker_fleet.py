@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Worker Fleet
+Supervises several local daemon processes that share the Airtable table through record leases,
+optionally growing and shrinking the fleet with the Pending backlog
+"""
+
+import asyncio
+import logging
+import math
+import signal
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerFleet:
+    """Keeps `count` worker processes running and restarts the ones that die"""
+
+    def __init__(self, command: List[str], count: int, restart_delay: float = 5.0):
+        self.command = command
+        self.count = count
+        self.restart_delay = restart_delay
+        self._procs: Dict[int, asyncio.subprocess.Process] = {}
+        self._slots: Dict[int, asyncio.Task] = {}
+        self._retiring = set()
+        self._stopping = None
+
+    @property
+    def running(self) -> int:
+        """Worker slots that are up and not being retired"""
+        return len(self._slots) - len(self._retiring)
+
+    def stop(self):
+        """Ask every worker to drain and exit"""
+        if self._stopping and not self._stopping.is_set():
+            logger.info(f"🛑 Stopping {len(self._procs)} workers...")
+            self._stopping.set()
+            for proc in self._procs.values():
+                if proc.returncode is None:
+                    proc.send_signal(signal.SIGTERM)
+
+    async def run(self):
+        """Start the workers and supervise them until stop() is called"""
+        self._stopping = asyncio.Event()
+        self.scale_to(self.count)
+        await self._stopping.wait()
+        # Retired and stopping workers finish their in-flight records before they exit
+        await asyncio.gather(*self._slots.values())
+        logger.info("✅ All workers stopped")
+
+    def scale_to(self, count: int):
+        """
+        Grow or shrink to `count` workers. New slots start right away; surplus workers (newest
+        first) get SIGTERM and drain their in-flight records before they exit.
+        """
+        if self._stopping.is_set():
+            return
+        self.count = count
+        slot = 0
+        while self.running < count:
+            if slot not in self._slots:
+                self._start_slot(slot)
+            slot += 1
+        for slot in sorted(self._slots, reverse=True):
+            if self.running <= count:
+                break
+            if slot in self._retiring:
+                continue
+            self._retiring.add(slot)
+            proc = self._procs.get(slot)
+            if proc and proc.returncode is None:
+                logger.info(f"📉 Retiring worker {slot} (pid {proc.pid})")
+                proc.send_signal(signal.SIGTERM)
+
+    def _start_slot(self, slot: int):
+        task = asyncio.create_task(self._supervise(slot))
+        self._slots[slot] = task
+
+        def done(_task):
+            self._slots.pop(slot, None)
+            self._retiring.discard(slot)
+
+        task.add_done_callback(done)
+
+    async def _supervise(self, slot: int):
+        """Run one worker slot, restarting the process when it exits unexpectedly"""
+        while not self._stopping.is_set() and slot not in self._retiring:
+            proc = await asyncio.create_subprocess_exec(*self.command)
+            self._procs[slot] = proc
+            logger.info(f"👷 Worker {slot} started (pid {proc.pid})")
+            if slot in self._retiring:
+                # Retired while it was starting up
+                proc.send_signal(signal.SIGTERM)
+
+            code = await proc.wait()
+            if self._stopping.is_set() or slot in self._retiring:
+                break
+            logger.warning(f"⚠️ Worker {slot} exited with code {code}, restarting in {self.restart_delay:.0f}s")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.restart_delay)
+            except asyncio.TimeoutError:
+                pass
+        self._procs.pop(slot, None)
+
+
+@dataclass
+class ScalingInputs:
+    """What the autoscaler looks at on each tick"""
+    pending: int
+    # Median record wall time lately; None before any record finished
+    record_seconds: Optional[float]
+    # Median stage latency over the last tick and over the longer baseline window
+    stage_seconds: Dict[str, float]
+    baseline_seconds: Dict[str, float]
+    throttles: int
+
+
+class Autoscaler:
+    """
+    Sizes the fleet so the Pending backlog drains within `drain_seconds`: each worker finishes
+    about concurrency / record_seconds records a second. Providers throttling us (429s) or
+    a stage running far slower than its baseline mean more workers would only queue behind
+    that provider, so the fleet then holds or, while throttling persists, shrinks by one.
+    Growth happens at once; shrinking waits until the lower target has held `scale_down_after`
+    seconds and then retires one worker per tick, so short lulls do not thrash processes.
+    """
+
+    def __init__(self, min_workers: int, max_workers: int, concurrency: int,
+                 drain_seconds: float = 1800, scale_down_after: float = 300,
+                 default_record_seconds: float = 600, slowdown_factor: float = 2.0):
+        if min_workers < 1 or max_workers < min_workers:
+            raise ValueError("Autoscaler needs 1 <= min_workers <= max_workers")
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.concurrency = concurrency
+        self.drain_seconds = drain_seconds
+        self.scale_down_after = scale_down_after
+        self.default_record_seconds = default_record_seconds
+        self.slowdown_factor = slowdown_factor
+        self._lower_since: Optional[float] = None
+
+    def slowed_stages(self, inputs: ScalingInputs) -> List[str]:
+        """Stages whose recent latency is well above their baseline"""
+        return [
+            stage for stage, seconds in inputs.stage_seconds.items()
+            if inputs.baseline_seconds.get(stage) and seconds > self.slowdown_factor * inputs.baseline_seconds[stage]
+        ]
+
+    def target(self, inputs: ScalingInputs) -> int:
+        """Workers the backlog calls for, ignoring provider feedback"""
+        record_seconds = inputs.record_seconds or self.default_record_seconds
+        per_worker = self.concurrency * self.drain_seconds / record_seconds
+        wanted = math.ceil(inputs.pending / per_worker) if inputs.pending else 0
+        return max(self.min_workers, min(self.max_workers, wanted))
+
+    def decide(self, current: int, inputs: ScalingInputs, now: float = None) -> int:
+        """Worker count for the next tick"""
+        now = time.monotonic() if now is None else now
+        wanted = self.target(inputs)
+        if inputs.throttles:
+            # Providers are already pushing back; shed a worker rather than add load
+            wanted = min(wanted, max(self.min_workers, current - 1))
+        elif self.slowed_stages(inputs):
+            wanted = min(wanted, current)
+
+        if wanted > current:
+            self._lower_since = None
+            return wanted
+        if wanted == current:
+            self._lower_since = None
+            return current
+        if inputs.throttles:
+            self._lower_since = None
+            return wanted
+        if self._lower_since is None:
+            self._lower_since = now
+        if now - self._lower_since < self.scale_down_after:
+            return current
+        self._lower_since = now
+        return current - 1
+
+
+def worker_command(script: str, concurrency: int, trace: str = None) -> List[str]:
+    """Command line for one leased daemon worker"""
+    command = [sys.executable, script, '--scheduled', '--lease', '--concurrency', str(concurrency)]
+    if trace:
+        command += ['--trace', trace]
+    return command
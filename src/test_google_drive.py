@@ -4,10 +4,10 @@ import sys
 sys.path.append('/app')
 
 from mcp_servers.google_drive_server import GoogleDriveMCPServer
+from services.settings import load_config
 
 async def test_drive_connection():
-    with open('/app/config/api_keys.json', 'r') as f:
-        config = json.load(f)
+    config = load_config()
     
     # Initialize Google Drive server
     drive_server = GoogleDriveMCPServer(config['google_drive_credentials'])
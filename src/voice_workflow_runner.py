@@ -4,21 +4,25 @@ import sys
 sys.path.append('/app')
 
 from mcp_servers.airtable_server import AirtableMCPServer
+from services.http_timing import timed_session
+from services.settings import load_config, provider_url
 from mcp_servers.voice_generation_server import VoiceGenerationMCPServer
 
 class VoiceGenerationOrchestrator:
     def __init__(self):
-        with open('/app/config/api_keys.json', 'r') as f:
-            self.config = json.load(f)
+        self.config = load_config()
         
         self.airtable_server = AirtableMCPServer(
             api_key=self.config['airtable_api_key'],
             base_id=self.config['airtable_base_id'],
-            table_name=self.config['airtable_table_name']
+            table_name=self.config['airtable_table_name'],
+            api_url=provider_url(self.config, 'airtable')
         )
         
         self.voice_server = VoiceGenerationMCPServer(
-            elevenlabs_api_key=self.config['elevenlabs_api_key']
+            elevenlabs_api_key=self.config['elevenlabs_api_key'],
+            base_url=provider_url(self.config, 'elevenlabs'),
+            session=timed_session('elevenlabs')
         )
     
     async def generate_single_product_voice(self, record_id: str = None):
@@ -1,353 +1,1370 @@
 
+import argparse
 import asyncio
-import json
+import signal
 import sys
 import os
+import time
+import traceback
 from datetime import datetime
 
 # Add the project root to Python path
 sys.path.append('/home/claude-workflow')
 
 from mcp_servers.airtable_server import AirtableMCPServer
-from mcp.amazon_affiliate_agent_mcp import run_amazon_affiliate_generation
-from mcp_servers.content_generation_server import ContentGenerationMCPServer
-from mcp.text_generation_control_agent_mcp_v2 import run_text_control_with_regeneration
-from mcp.json2video_agent_mcp import run_video_creation
-from mcp.amazon_drive_integration import save_amazon_images_to_drive
-from mcp.amazon_images_workflow import download_and_save_amazon_images
-from mcp.google_drive_agent_mcp import upload_video_to_google_drive
-from mcp.wordpress_mcp import WordPressMCP
-from mcp.youtube_mcp import YouTubeMCP
+from services.category_scheduler import CategoryScheduler
+from services.checkpoint_store import CheckpointStore
+from services.fair_share import FairShare
+from services.client_registry import ClientRegistry
+from services.lazy_import import LAZY_MODULES, lazy, lazy_value
+from services.lease_manager import LeaseManager
+from services.pending_queue import PendingQueue
+from services.quota_ledger import QuotaLedger
+from services.record_context import RecordContext
+from services.scheduler import WorkflowScheduler
+from services.settings import (ConfigError, Settings, config_path, get_settings, load_config, reload_settings,
+                               require, tenant_configs)
+from services.stage_graph import Stage, StageGraph
+from services import tracing
+from services.staged_pipeline import Phase, StagedPipeline
+from services.startup_profile import print_startup_profile
+
+# Stage modules pull in the provider SDKs (anthropic, googleapiclient, bs4, ...), so they load on first use
+ContentGenerationMCPServer = lazy('mcp_servers.content_generation_server', 'ContentGenerationMCPServer')
+run_text_control_with_regeneration = lazy('mcp.text_generation_control_agent_mcp_v2', 'run_text_control_with_regeneration')
+run_amazon_affiliate_generation = lazy('mcp.amazon_affiliate_agent_mcp', 'run_amazon_affiliate_generation')
+download_and_save_amazon_images = lazy('mcp.amazon_images_workflow', 'download_and_save_amazon_images')
+run_video_creation = lazy('mcp.json2video_agent_mcp', 'run_video_creation')
+VideoSpool = lazy('services.video_spool', 'VideoSpool')
+upload_video_to_google_drive = lazy('mcp.google_drive_agent_mcp', 'upload_video_to_google_drive')
+WordPressMCP = lazy('mcp.wordpress_mcp', 'WordPressMCP')
+
+# Per-stage concurrency limits, overridable through the 'stage_concurrency' config key
+DEFAULT_STAGE_CONCURRENCY = {
+    'keywords': 4,
+    'optimize_title': 4,
+    'script': 4,
+    'text_control': 4,
+    'save_content': 4,
+    'affiliate': 2,
+    'product_images': 2,
+    'video': 2,
+    'video_spool': 4,
+    'drive_upload': 2,
+    'wordpress': 2,
+    'youtube': 1,
+}
+
+# Text stages a record can run ahead of time while another record is rendering
+PREFETCH_STAGES = ['keywords', 'optimize_title', 'script', 'text_control']
+
+# Per-stage deadlines in seconds, overridable through the 'stage_timeouts' config key (null = no limit).
+# A stage past its deadline is cancelled and fails, freeing its concurrency slot.
+DEFAULT_STAGE_TIMEOUTS = {
+    'keywords': 120,
+    'optimize_title': 120,
+    'script': 180,
+    'text_control': 600,
+    'save_content': 60,
+    'affiliate': 300,
+    'product_images': 300,
+    'video': 420,
+    'video_spool': 10,
+    'drive_upload': 300,
+    'wordpress': 120,
+    'youtube': 600,
+}
+
+# Provider quota each stage is expected to use, overridable per stage through 'stage_quota_costs'.
+# A record only starts if every provider with a 'provider_quotas' limit has enough left today.
+DEFAULT_STAGE_QUOTA_COSTS = {
+    'keywords': {'anthropic': 1000},
+    'optimize_title': {'anthropic': 1000},
+    'script': {'anthropic': 4000},
+    'text_control': {'anthropic': 8000},
+    'affiliate': {'scrapingdog': 5},
+    # One Drive upload per image: up to 5 products with 5 images each
+    'product_images': {'google_drive': 25},
+    'video': {'json2video': 1},
+    'youtube': {'youtube': 1600},
+}
+
+# Keys only read at startup (clients, files, the Airtable base); a daemon needs a restart to change them
+RESTART_KEYS = [
+    'anthropic_api_key', 'airtable_api_key', 'airtable_base_id', 'airtable_table_name',
+    'google_drive_credentials', 'youtube_credentials', 'youtube_token',
+    'output_dir', 'checkpoint_db', 'spool_dir', 'quota_db', 'fleet_db',
+]
+
+# Multi-record runs push records through these phases; each has its own workers and queue
+PIPELINE_PHASES = [
+    ('generate', ['keywords', 'optimize_title', 'script']),
+    ('validate', ['text_control', 'save_content']),
+    ('affiliate', ['affiliate', 'product_images']),
+    ('render', ['video']),
+    ('publish', ['video_spool', 'drive_upload', 'wordpress', 'youtube']),
+]
+
+# Record fields each stage reads from the context, hashed with its inputs to decide whether it must re-run
+PRODUCT_TITLE_FIELDS = [f'ProductNo{i}Title' for i in range(1, 6)]
+PRODUCT_FIELDS = PRODUCT_TITLE_FIELDS + [f'ProductNo{i}{part}' for i in range(1, 6) for part in ('Description', 'Photo')]
+AFFILIATE_FIELDS = [f'ProductNo{i}AffiliateLink' for i in range(1, 6)]
+STAGE_RECORD_FIELDS = {
+    'affiliate': PRODUCT_TITLE_FIELDS,
+    'video': ['VideoTitle', 'VideoDescription'] + PRODUCT_FIELDS,
+    'wordpress': ['VideoTitle', 'VideoDescription'] + PRODUCT_FIELDS + AFFILIATE_FIELDS,
+    'youtube': ['VideoTitle', 'Title'] + PRODUCT_FIELDS + AFFILIATE_FIELDS,
+}
+
+# Output version of stages whose result depends on more than their inputs
+STAGE_VERSIONS = {
+    'video': lazy_value('mcp_servers.json2video_server', 'TEMPLATE_VERSION'),
+}
+
+def stage_fingerprint(name: str, inputs: dict) -> dict:
+    """What a stage's result depends on: its inputs, the record fields it reads and its version"""
+    # The spool is just a local copy of video_result's URL, which is hashed already
+    key = {k: v for k, v in inputs.items() if k not in ('context', 'pending_title', 'video_spool')}
+    if 'pending_title' in inputs:
+        # The rest of the pending title is status bookkeeping
+        key['title'] = inputs['pending_title']['title']
+    key['fields'] = {f: inputs['context'].get(f) for f in STAGE_RECORD_FIELDS.get(name, [])}
+    key['version'] = STAGE_VERSIONS[name]() if name in STAGE_VERSIONS else None
+    return key
+
+def stage_concurrency(settings: Settings) -> dict:
+    """Per-stage limits with the config's overrides; names that are not stages are reported and left out"""
+    limits = dict(DEFAULT_STAGE_CONCURRENCY)
+    for name, limit in settings.stage_concurrency.items():
+        if name in limits:
+            limits[name] = limit
+        else:
+            print(f"⚠️ Ignoring stage_concurrency for unknown stage '{name}'")
+    return limits
 
 class ContentPipelineOrchestrator:
-    def __init__(self):
-        # Load configuration
-        with open('/home/claude-workflow/config/api_keys.json', 'r') as f:
-            self.config = json.load(f)
-        
+    def __init__(self, config: dict = None, tenant: str = None, stage_limiters: dict = None):
+        # Loaded once per process; the typed settings are validated up front so bad values fail here.
+        # A multi-tenant daemon passes each channel's config and the stage slots it shares with the others
+        self.config = config if config is not None else load_config()
+        require(self.config)
+        self.settings = Settings.from_config(self.config) if config is not None else get_settings()
+        self.tenant = tenant
+        self.stage_limiters = stage_limiters
+
+        # What every provider call consumed today, shared by all workers using the same file
+        self.quota = QuotaLedger(self.settings.quota_db, self.settings.provider_quotas,
+                                 reservation_ttl=self._reservation_ttl(self.settings))
+        # Record and stage latencies and provider 429s, read by the fleet autoscaler
+        from services.fleet_signals import FleetSignals
+        self.signals = FleetSignals(self.settings.fleet_db)
+
+        # One set of pooled clients for the orchestrator and every agent it calls
+        self.clients = ClientRegistry(self.config, ledger=self.quota, signals=self.signals)
+
         # Initialize MCP servers
-        self.airtable_server = AirtableMCPServer(
-            api_key=self.config['airtable_api_key'],
-            base_id=self.config['airtable_base_id'],
-            table_name=self.config['airtable_table_name']
+        self.airtable_server = self.clients.airtable()
+
+        # Built on first use, so runs that never reach their stages skip the SDK imports
+        self.content_server = None
+        self.wordpress_mcp = None
+        self.stage_graph = self._build_stage_graph()
+        self.pipeline = None
+        self.pipeline_workers = 0
+        # Local copies of finished renders, deleted when their record's run ends
+        self.spools = {}
+        # Which Pending records go next: 'pending_priority' fields first, then categories
+        # by weight and backlog, in batches
+        self.categories = CategoryScheduler(
+            self.settings.category_weights,
+            self.settings.category_batch_size,
+            self.config.get('categories')
         )
-        
-        self.content_server = ContentGenerationMCPServer(
-            anthropic_api_key=self.config['anthropic_api_key']
+        self.pending = PendingQueue(
+            self.airtable_server,
+            rules=self.settings.pending_priority,
+            categories=self.categories,
+            scan_limit=self.settings.pending_scan_limit
         )
-        self.wordpress_mcp = WordPressMCP(self.config)
+
+        # Finished stage outputs survive crashes so a re-run does not pay for them again
+        self.checkpoints = CheckpointStore(self.settings.checkpoint_db)
+
+    def _build_stage_graph(self) -> StageGraph:
+        """Declare the pipeline stages and the data each one needs"""
+        limits = stage_concurrency(self.settings)
+        timeouts = dict(DEFAULT_STAGE_TIMEOUTS)
+        timeouts.update(self.settings.stage_timeouts)
+
+        def stage(name, func, inputs, outputs, checkpoint_if=None):
+            return Stage(name=name, func=self._traced(name, self._metered(name, self._flushing(func))), inputs=['context'] + inputs, outputs=outputs,
+                         concurrency=limits[name], timeout=timeouts[name], checkpoint_if=checkpoint_if,
+                         fingerprint=lambda inputs: stage_fingerprint(name, inputs))
+
+        def succeeded(key):
+            # Only checkpoint provider results that actually went through, so a resume retries the rest
+            return lambda outputs: bool(outputs[key] and outputs[key].get('success'))
+
+        return StageGraph([
+            stage('keywords', self._stage_keywords, ['pending_title'], ['keywords'],
+                  checkpoint_if=lambda outputs: bool(outputs['keywords'])),
+            stage('optimize_title', self._stage_optimize_title, ['pending_title', 'keywords'], ['optimized_title']),
+            stage('script', self._stage_script, ['optimized_title', 'keywords'], ['script_data'],
+                  checkpoint_if=lambda outputs: bool(outputs['script_data'].get('products'))),
+            stage('text_control', self._stage_text_control, ['pending_title', 'script_data'], ['control_result']),
+            stage('save_content', self._stage_save_content,
+                  ['pending_title', 'optimized_title', 'script_data', 'control_result'], ['content_saved'],
+                  checkpoint_if=lambda outputs: bool(outputs['content_saved'])),
+            # Everything below only needs the saved content, so these branches overlap
+            stage('affiliate', self._stage_affiliate, ['pending_title', 'content_saved'], ['affiliate_result'],
+                  checkpoint_if=succeeded('affiliate_result')),
+            stage('product_images', self._stage_product_images,
+                  ['pending_title', 'optimized_title', 'affiliate_result'], ['images_result'],
+                  checkpoint_if=succeeded('images_result')),
+            stage('video', self._stage_video, ['pending_title', 'content_saved'], ['video_result'],
+                  checkpoint_if=succeeded('video_result')),
+            # The render is downloaded once and shared by the publish targets, which all run at once
+            stage('video_spool', self._stage_video_spool, ['pending_title', 'video_result'], ['video_spool'],
+                  checkpoint_if=lambda outputs: False),
+            stage('drive_upload', self._stage_drive_upload, ['pending_title', 'video_result', 'video_spool'],
+                  ['upload_result'], checkpoint_if=succeeded('upload_result')),
+            stage('wordpress', self._stage_wordpress, ['pending_title', 'affiliate_result'], ['wp_result'],
+                  checkpoint_if=succeeded('wp_result')),
+            stage('youtube', self._stage_youtube, ['pending_title', 'keywords', 'video_result', 'video_spool'],
+                  ['youtube_result'], checkpoint_if=succeeded('youtube_result')),
+        ], initial_inputs=['pending_title', 'context'], limiters=self.stage_limiters)
+
+    def _flushing(self, func):
+        """Write whatever a stage buffered in the record context once the stage is done"""
+        async def run(inputs: dict) -> dict:
+            outputs = await func(inputs)
+            if not await inputs['context'].flush(self.airtable_server):
+                raise RuntimeError("could not write stage results to Airtable")
+            return outputs
+        return run
+
+    def _traced(self, name: str, func):
+        """Run a stage inside a trace span, so its provider calls are attributed to it"""
+        async def run(inputs: dict) -> dict:
+            with tracing.span(name, 'stage', record_id=inputs['context'].record_id, stage=name, tenant=self.tenant):
+                return await func(inputs)
+        return run
+
+    def _metered(self, name: str, func):
+        """Hand a stage's quota reservation back once it has run; its real usage is in the ledger by then"""
+        async def run(inputs: dict) -> dict:
+            try:
+                return await func(inputs)
+            finally:
+                await self.quota.release(inputs['context'].record_id, name)
+        return run
+
+    @staticmethod
+    def _reservation_ttl(settings: Settings) -> float:
+        """A record's quota reservation outlives its deadline only if its worker died holding it"""
+        return (settings.record_timeout or 3600) + 60
+
+    def _expected_quota(self, pending_title: dict, context: RecordContext, rerun: list = None) -> dict:
+        """
+        Quota the record's remaining stages should use. Stages the graph would restore from a
+        checkpoint for the same inputs will not call out again; rerun ones always do.
+        """
+        costs = dict(DEFAULT_STAGE_QUOTA_COSTS)
+        costs.update(self.settings.stage_quota_costs)
+        if not self.config.get('youtube_enabled', False):
+            costs.pop('youtube', None)
+        pending = self.stage_graph.pending(
+            {'pending_title': pending_title, 'context': context},
+            checkpoint=self.checkpoints,
+            run_id=pending_title['record_id'],
+            force=rerun
+        )
+        return {stage: stage_costs for stage, stage_costs in costs.items() if stage in pending}
+
+    def _build_pipeline(self, workers: int) -> StagedPipeline:
+        """Phase workers default to `workers`; 'pipeline_phases' config overrides per phase"""
+        overrides = self.settings.pipeline_phases
+        phases = []
+        for name, stages in PIPELINE_PHASES:
+            settings = overrides.get(name, {})
+            phases.append(Phase(
+                name=name,
+                stages=stages,
+                workers=settings.get('workers', workers),
+                queue_size=settings.get('queue_size', max(1, workers))
+            ))
+        return StagedPipeline(self.stage_graph, phases, checkpoint=self.checkpoints)
+
+    def _content(self):
+        """Content generation server, created on the first text stage"""
+        if self.content_server is None:
+            self.content_server = ContentGenerationMCPServer(
+                anthropic_api_key=self.config['anthropic_api_key'],
+                client=self.clients.anthropic()
+            )
+        return self.content_server
+
+    async def close(self):
+        """Release the shared clients and the checkpoint database at shutdown"""
+        await self.stop_pipeline()
+        await self.clients.aclose()
+        self.checkpoints.close()
+        self.quota.close()
+        self.signals.close()
+
+    async def reconfigure(self, config: dict, settings: Settings):
+        """
+        Switch to a new config between records: stage limits and timeouts, phase workers,
+        enabled stages, YouTube/WordPress options, record ordering and quotas. Only call this
+        while no record is in flight; RESTART_KEYS keep their startup values.
+        """
+        stale = [key for key in RESTART_KEYS if config.get(key) != self.config.get(key)]
+        if stale:
+            print(f"⚠️ Changed {', '.join(stale)} only take effect after a restart")
+        self.config = config
+        self.settings = settings
+        self.clients.config = config
+        self.quota.limits = dict(settings.provider_quotas)
+        self.quota.reservation_ttl = self._reservation_ttl(settings)
+        # Rebuilt on first use with the new options
+        self.wordpress_mcp = None
+        self.stage_graph = self._build_stage_graph()
+        self.categories = CategoryScheduler(settings.category_weights, settings.category_batch_size,
+                                            config.get('categories'))
+        self.airtable_server.category_scheduler = CategoryScheduler.from_config(config)
+        # Updated in place, since the scheduler holds on to the queue
+        self.pending.rules = list(settings.pending_priority)
+        self.pending.categories = self.categories
+        self.pending.scan_limit = settings.pending_scan_limit
+        if self.pipeline:
+            workers = self.pipeline_workers
+            await self.stop_pipeline()
+            await self.start_pipeline(workers)
+
+    async def start_pipeline(self, workers: int) -> StagedPipeline:
+        """Switch process_record over to the staged pipeline"""
+        self.pipeline_workers = workers
+        self.pipeline = self._build_pipeline(workers)
+        await self.pipeline.start()
+        return self.pipeline
+
+    async def stop_pipeline(self):
+        """Drain the staged pipeline and go back to running records one graph at a time"""
+        if self.pipeline:
+            await self.pipeline.close()
+            self.pipeline = None
 
     async def run_complete_workflow(self):
         """Run the complete content generation workflow"""
         print(f"🚀 Starting content workflow at {datetime.now()}")
-        
-        # Step 1: Get pending title from Airtable
+
+        # Step 1: Get the most urgent pending title from Airtable
         print("📋 Getting pending title from Airtable...")
-        pending_title = await self.airtable_server.get_pending_titles()
-        
-        if not pending_title:
+        record = await self.pending.next()
+
+        if not record:
             print("❌ No pending titles found. Exiting.")
             return
-        
+
+        pending_title = AirtableMCPServer.to_pending_title(record)
         print(f"✅ Found title: {pending_title['title']}")
-        
-        # Step 2: Generate SEO keywords
+        await self.process_record(pending_title, record)
+
+    async def run_back_to_back(self, leases: LeaseManager = None) -> int:
+        """
+        Process Pending records one after another. While a record waits on its render,
+        the next Pending record runs its text stages, so it is ready to render the moment
+        the current one finishes instead of paying for keywords and script first.
+        Every record is claimed before any work on it, through `leases` when given.
+        Returns the number of records that went through.
+        """
+        print(f"🚀 Starting back-to-back workflow at {datetime.now()}")
+        seen = set()
+        succeeded = 0
+        prefetch = {}
+        current = await self._claim_next(seen, leases)
+
+        try:
+            while current:
+                pending_title, record = current
+                seen.add(pending_title['record_id'])
+                print(f"✅ Found title: {pending_title['title']}")
+
+                prefetch = {}
+
+                def on_stage_start(name):
+                    if name == 'video' and 'task' not in prefetch:
+                        prefetch['task'] = asyncio.create_task(self._prefetch_next(seen, leases))
+
+                try:
+                    if leases:
+                        result = await self._process_leased(pending_title, record, leases, on_stage_start)
+                    else:
+                        result = await self.process_record(pending_title, record, on_stage_start=on_stage_start)
+                    succeeded += result['success']
+                except Exception as e:
+                    print(f"❌ Record {pending_title['record_id']} crashed: {e}")
+
+                # A prefetch that found nothing or failed has handed its record back already
+                current = None
+                if 'task' in prefetch:
+                    current = await prefetch.pop('task')
+                if current is None:
+                    current = await self._claim_next(seen, leases)
+        finally:
+            # Stopped while the next record was being prepared: it unclaims itself when cancelled
+            task = prefetch.get('task')
+            if task:
+                task.cancel()
+                prepared = (await asyncio.gather(task, return_exceptions=True))[0]
+                if isinstance(prepared, tuple):
+                    await self._unclaim(prepared[0]['record_id'], leases)
+
+        print(f"🏁 No more pending titles. {succeeded}/{len(seen)} records succeeded")
+        return succeeded
+
+    async def _next_pending(self, seen: set):
+        """The most urgent Pending record not handled in this run yet, as (pending_title, record)"""
+        record = await self.pending.next(skip=seen)
+        if record:
+            return AirtableMCPServer.to_pending_title(record), record
+        return None
+
+    async def _claim_next(self, seen: set, leases: LeaseManager = None):
+        """
+        _next_pending(), claimed so no other run starts it meanwhile: through the lease
+        when there is one, otherwise by marking it Processing. Records another worker
+        claimed first are skipped.
+        """
+        while True:
+            current = await self._next_pending(seen)
+            if not current:
+                return None
+            record_id = current[0]['record_id']
+            if leases is None:
+                await self.airtable_server.update_record_status(record_id, 'Processing')
+                return current
+            if await leases.claim(record_id):
+                return current
+            seen.add(record_id)
+
+    async def _unclaim(self, record_id: str, leases: LeaseManager = None):
+        """Hand a claimed record that will not be processed back to Pending"""
+        if leases:
+            await leases.release(record_id, False)
+        else:
+            await self.airtable_server.update_record_status(record_id, 'Pending')
+
+    async def _process_leased(self, pending_title: dict, record: dict, leases: LeaseManager,
+                              on_stage_start) -> dict:
+        """process_record under a lease that is renewed while it runs and released after it"""
+        record_id = pending_title['record_id']
+        # A prepared record waited through the previous render, so make sure it is still ours
+        if not await leases.renew(record_id):
+            return {'success': False, 'record_id': record_id, 'error': 'lease lost to another worker'}
+
+        task = asyncio.create_task(self.process_record(pending_title, record, on_stage_start=on_stage_start))
+        holder = asyncio.create_task(leases.hold(record_id, task))
+        try:
+            await asyncio.wait([task])
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        finally:
+            holder.cancel()
+            ok = task.done() and not task.cancelled() and task.exception() is None and task.result()['success']
+            await asyncio.shield(leases.release(record_id, ok, cooldown=self.settings.retry_failed_after))
+
+        if task.cancelled():
+            # hold() cancelled it: another worker took the record over
+            return {'success': False, 'record_id': record_id, 'error': 'lease lost to another worker'}
+        return task.result()
+
+    async def _prefetch_next(self, seen: set, leases: LeaseManager = None):
+        """
+        Claim the next Pending record and run its text stages; their checkpoints are picked
+        up when it is processed. A record whose preparation is abandoned goes back to Pending.
+        """
+        try:
+            current = await self._claim_next(seen, leases)
+        except Exception as e:
+            print(f"⚠️ Prefetch failed: {e}")
+            return None
+        if not current:
+            return None
+        pending_title, record = current
+        try:
+            print(f"⏩ Preparing {pending_title['record_id']} while the render runs")
+            context = RecordContext.from_record(record)
+            result = await self.stage_graph.run(
+                {'pending_title': pending_title, 'context': context},
+                checkpoint=self.checkpoints,
+                run_id=pending_title['record_id'],
+                stages=PREFETCH_STAGES
+            )
+            if not result['success']:
+                print(f"⚠️ Preparing {pending_title['record_id']} failed, its text stages will run again")
+            # Hand over the fields as the prefetch left them, text control writes included
+            return pending_title, {'id': context.record_id, 'fields': context.fields}
+        except asyncio.CancelledError:
+            await asyncio.shield(self._unclaim(pending_title['record_id'], leases))
+            raise
+        except Exception as e:
+            print(f"⚠️ Prefetch failed: {e}")
+            await self._unclaim(pending_title['record_id'], leases)
+            return None
+
+    async def run_batch(self, batch_size: int, concurrency: int) -> dict:
+        """Process up to batch_size pending records, running `concurrency` pipelines at once"""
+        print(f"🚀 Starting batch workflow at {datetime.now()} (batch={batch_size}, concurrency={concurrency})")
+
+        print("📋 Getting pending records from Airtable...")
+        await self.pending.refresh()
+        records = self.pending.take(batch_size)
+
+        if not records:
+            print("❌ No pending titles found. Exiting.")
+            return {'processed': 0, 'succeeded': 0, 'failed': 0, 'results': []}
+
+        print(f"✅ Found {len(records)} pending titles")
+        return await self._run_records(records, concurrency)
+
+    async def run_record(self, record_id: str, from_stage: str = None):
+        """
+        Run (or resume) the workflow for one specific record.
+        Stages whose inputs match their checkpoint are reused; `from_stage` (a stage or
+        pipeline phase name) forces it and everything downstream of it to run again.
+        """
+        print(f"🚀 Starting content workflow for {record_id} at {datetime.now()}")
+        record = await self.airtable_server.get_record_by_id(record_id)
+        if not record:
+            print(f"❌ Record {record_id} not found. Exiting.")
+            return None
+
+        rerun = []
+        if from_stage:
+            rerun = self.stage_graph.downstream(dict(PIPELINE_PHASES).get(from_stage, [from_stage]))
+            print(f"🔁 Re-running: {', '.join(rerun)}")
+
+        done = self.checkpoints.completed_stages(record_id)
+        if done:
+            print(f"♻️ Checkpointed stages (reused if their inputs are unchanged): {', '.join(done)}")
+        return await self.process_record(AirtableMCPServer.to_pending_title(record), record, rerun=rerun)
+
+    async def resume_unfinished(self, concurrency: int) -> dict:
+        """Resume every record whose last run stopped part way"""
+        record_ids = self.checkpoints.unfinished_records()
+        print(f"♻️ Found {len(record_ids)} unfinished records in the checkpoint store")
+
+        records = []
+        for record_id in record_ids:
+            record = await self.airtable_server.get_record_by_id(record_id)
+            if record:
+                records.append(record)
+            else:
+                print(f"⚠️ Record {record_id} no longer exists, dropping its checkpoints")
+                self.checkpoints.clear(record_id)
+
+        return await self._run_records(records, concurrency)
+
+    async def _run_records(self, records: list, concurrency: int) -> dict:
+        """Run several records through the staged pipeline, isolating failures per record"""
+        async def run_one(record: dict) -> dict:
+            try:
+                return await self.process_record(AirtableMCPServer.to_pending_title(record), record)
+            except Exception as e:
+                # One bad record must not take the rest of the batch down
+                print(f"❌ Record {record['id']} crashed: {e}")
+                return {'success': False, 'record_id': record['id'], 'error': str(e)}
+
+        # Full phase queues hold back the submitters, so no extra limit is needed here
+        await self.start_pipeline(concurrency)
+        try:
+            results = await asyncio.gather(*(run_one(r) for r in records))
+        finally:
+            await self.stop_pipeline()
+
+        succeeded = sum(1 for r in results if r['success'])
+        print("📊 Batch summary:")
+        print(f"   Processed: {len(results)}")
+        print(f"   Succeeded: {succeeded}")
+        print(f"   Failed: {len(results) - succeeded}")
+        for r in results:
+            if not r['success']:
+                print(f"   ❌ {r['record_id']}: {r['error']}")
+
+        return {
+            'processed': len(results),
+            'succeeded': succeeded,
+            'failed': len(results) - succeeded,
+            'results': results
+        }
+
+    async def process_record(self, pending_title: dict, record: dict = None, rerun: list = None,
+                             on_stage_start=None) -> dict:
+        """
+        Run steps 2-10 for one pending record.
+        The record is read from Airtable once (or taken from `record`) and every stage
+        works on that copy; each stage's writes go out as a single update.
+        `rerun` lists stages that must run even if their inputs are unchanged; passing it
+        (even empty) also keeps the checkpoints of a record that already finished.
+        `on_stage_start` is told when each stage starts (single-record runs only).
+        """
+        with tracing.span('record', 'record', record_id=pending_title['record_id'], tenant=self.tenant) as span:
+            result = await self._process_record(pending_title, record, rerun, on_stage_start)
+            # The stage statuses are what --metrics-port counts per stage
+            span.set(outcome='ok' if result['success'] else 'deferred' if result.get('deferred') else 'failed',
+                     error=result.get('error'),
+                     stages={name: entry['status'] for name, entry in (result.get('stages') or {}).items()})
+            return result
+
+    async def _process_record(self, pending_title: dict, record: dict, rerun: list, on_stage_start) -> dict:
+        if rerun is None and self.checkpoints.is_finished(pending_title['record_id']):
+            # The record went through before and was sent back through Pending, so start clean
+            self.checkpoints.clear(pending_title['record_id'])
+
+        if record:
+            context = RecordContext.from_record(record)
+        else:
+            context = await RecordContext.load(self.airtable_server, pending_title['record_id'])
+
+        # Hold the record back rather than let it run out of quota half way through
+        shortfall = await self.quota.admit(pending_title['record_id'],
+                                           self._expected_quota(pending_title, context, rerun))
+        if shortfall:
+            print(f"⏸️ Deferring {pending_title['record_id']}: {shortfall}")
+            return {
+                'success': False,
+                'deferred': True,
+                'retry_after': self.quota.seconds_until_reset(),
+                'record_id': pending_title['record_id'],
+                'error': shortfall
+            }
+
+        initial = {'pending_title': pending_title, 'context': context}
+        started = time.monotonic()
+
+        # Steps 2-9 run as a stage graph; independent stages overlap
+        if self.pipeline:
+            run = self.pipeline.submit(pending_title['record_id'], initial, force=rerun)
+        else:
+            run = self.stage_graph.run(
+                initial,
+                checkpoint=self.checkpoints,
+                run_id=pending_title['record_id'],
+                force=rerun,
+                on_start=on_stage_start
+            )
+        try:
+            # Cancels whatever is still running; finished stages stay checkpointed for the next attempt
+            result = await asyncio.wait_for(run, timeout=self.settings.record_timeout)
+        except asyncio.TimeoutError:
+            result = None
+        finally:
+            spool = self.spools.pop(pending_title['record_id'], None)
+            if spool:
+                spool.close()
+            await self.quota.release(pending_title['record_id'])
+
+        if result is None:
+            print(f"⏰ Record {pending_title['record_id']} passed its {self.settings.record_timeout:g}s deadline, record status left unchanged")
+            return {
+                'success': False,
+                'record_id': pending_title['record_id'],
+                'error': f"record deadline of {self.settings.record_timeout:g}s exceeded"
+            }
+        outputs = result['outputs']
+        await self.signals.record_run(result['stages'], time.monotonic() - started if result['success'] else None)
+
+        print(f"⏱️ Stage timings for {pending_title['record_id']}:")
+        for name, entry in result['stages'].items():
+            line = f"   {name}: {entry['status']} ({entry['seconds']:.1f}s)"
+            if entry['error']:
+                line += f" - {entry['error']}"
+            print(line)
+
+        if not result['success']:
+            failed = [name for name, entry in result['stages'].items() if entry['status'] == 'failed']
+            print("❌ Workflow stopped early, record status left unchanged")
+            return {
+                'success': False,
+                'record_id': pending_title['record_id'],
+                'error': f"failed stages: {', '.join(failed)}",
+                'stages': result['stages']
+            }
+
+        # Step 10: Update status
+        print("✅ Updating record status to 'Done'...")
+        context.update({'Status': 'Processing'})
+        await context.flush(self.airtable_server)
+        self.checkpoints.mark_finished(pending_title['record_id'])
+
+        print("🎉 Complete workflow finished successfully!")
+        print("📊 Summary:")
+        print(f"   Original: {pending_title['title']}")
+        print(f"   Optimized: {outputs['optimized_title']}")
+        print(f"   Products: {len(outputs['script_data'].get('products', []))}")
+        return {'success': True, 'record_id': pending_title['record_id'], 'stages': result['stages']}
+
+    async def _stage_keywords(self, inputs: dict) -> dict:
+        """Step 2: Generate SEO keywords"""
         print("🔍 Generating SEO keywords...")
-        keywords = await self.content_server.generate_seo_keywords(
-            pending_title['title'], 
+        keywords = await self._content().generate_seo_keywords(
+            inputs['pending_title']['title'],
             "Electronics"  # You can make this dynamic later
         )
-        
-        # Step 3: Optimize title
+        return {'keywords': keywords}
+
+    async def _stage_optimize_title(self, inputs: dict) -> dict:
+        """Step 3: Optimize title"""
         print("🎯 Optimizing title for social media...")
-        optimized_title = await self.content_server.optimize_title(
-            pending_title['title'], 
-            keywords
+        optimized_title = await self._content().optimize_title(
+            inputs['pending_title']['title'],
+            inputs['keywords']
         )
-        
-        # Step 4: Generate countdown script
+        return {'optimized_title': optimized_title}
+
+    async def _stage_script(self, inputs: dict) -> dict:
+        """Step 4: Generate countdown script"""
         print("📝 Generating countdown script...")
-        script_data = await self.content_server.generate_countdown_script(
-            optimized_title, 
-            keywords
+        script_data = await self._content().generate_countdown_script(
+            inputs['optimized_title'],
+            inputs['keywords']
         )
-        
-        # Step 4.5: Text Generation Quality Control
+        return {'script_data': script_data}
+
+    async def _stage_text_control(self, inputs: dict) -> dict:
+        """Step 4.5: Text Generation Quality Control"""
         print("🎮 Running text generation quality control...")
-        
-        # First, we need to save the countdown script to Airtable
-        await self._save_countdown_to_airtable(pending_title['record_id'], script_data)
-        
+        record_id = inputs['pending_title']['record_id']
+        context = inputs['context']
+
+        # First, we need to save the countdown script to the record
+        self._save_countdown_to_context(context, inputs['script_data'])
+
         # Now run quality control
-        control_result = await run_text_control_with_regeneration(self.config, pending_title['record_id'])
-        
+        control_result = await run_text_control_with_regeneration(self.config, record_id, context, self.clients)
+
         if not control_result['success']:
             print(f"❌ Text control failed after {control_result.get('attempts', 0)} attempts")
             print(f"Issues: {control_result.get('error', 'Unknown error')}")
             # Continue anyway but log the issue
-            await self.airtable_server.update_record(pending_title['record_id'], {
+            context.update({
                 'TextControlStatus': 'Failed',
                 'Status': 'Processing'  # Keep processing but note the failure
             })
         elif control_result['all_valid']:
             print(f"✅ Text validated after {control_result['attempts']} attempt(s)")
-            await self.airtable_server.update_record(pending_title['record_id'], {
+            context.update({
                 'TextControlStatus': 'Validated'
             })
+        return {'control_result': control_result}
 
-        # Step 5: Generate blog post (disabled for testing)
-        blog_post = "Blog post generation disabled during testing to save tokens."
-        
-        # Step 6: Save everything back to Airtable
+    async def _stage_save_content(self, inputs: dict) -> dict:
+        """Step 6: Save everything back to Airtable"""
+        # Step 5: Blog post generation is disabled for testing to save tokens
         print("💾 Saving generated content to Airtable...")
         content_data = {
-            'optimized_title': optimized_title,
-            'script': script_data,
+            'optimized_title': inputs['optimized_title'],
+            'script': inputs['script_data'],
         }
-        await self.airtable_server.save_generated_content(
-            pending_title['record_id'],
-            content_data
-        )
-        
-        # Step 7: Generate Amazon affiliate links
+        inputs['context'].update(AirtableMCPServer.build_content_fields(content_data))
+        # The stage wrapper raises if the flush fails, so reaching the end means it was saved
+        return {'content_saved': True}
+
+    async def _stage_affiliate(self, inputs: dict) -> dict:
+        """Step 7: Generate Amazon affiliate links"""
         print("🔗 Generating Amazon affiliate links...")
         affiliate_result = await run_amazon_affiliate_generation(
             self.config,
-            pending_title['record_id']
+            inputs['pending_title']['record_id'],
+            inputs['context'],
+            self.clients
         )
-        
+
         if affiliate_result.get('success'):
             links_count = affiliate_result.get('links_generated', 0)
             print(f"✅ Generated {links_count} affiliate links")
         else:
             print(f"⚠️ Affiliate link generation had issues: {affiliate_result.get('error', 'Unknown error')}")
-        
-        
-            # Step 7b: Download and save Amazon product images
-            print("📸 Downloading Amazon product images...")
-            
-            products_list = []
-            for i in range(1, 6):
-                product_title = saved_content.get(f'ProductNo{i}Title')
-                if product_title:
-                    products_list.append({
-                        'title': product_title,
-                        'description': saved_content.get(f'ProductNo{i}Description', '')
-                    })
-            
-            amazon_images_result = await save_amazon_images_to_drive(
+        return {'affiliate_result': affiliate_result}
+
+    async def _stage_product_images(self, inputs: dict) -> dict:
+        """Step 7b: Download Amazon product images if available"""
+        affiliate_result = inputs['affiliate_result']
+        if not affiliate_result.get('product_results'):
+            return {'images_result': None}
+
+        print("📸 Downloading Amazon product images...")
+        try:
+            images_result = await download_and_save_amazon_images(
                 self.config,
-                pending_title['record_id'],
-                video_result.get('project_name', pending_title['title']),
-                products_list
+                inputs['pending_title']['record_id'],
+                inputs['optimized_title'],
+                affiliate_result.get('product_results', {})
             )
-            
-            if amazon_images_result['success']:
-                print(f"✅ Saved {amazon_images_result['images_saved']} Amazon product images")
-                
-                for link_info in amazon_images_result.get('affiliate_links', []):
-                    await update_airtable_record(
-                        self.config,
-                        pending_title['record_id'],
-                        {f'ProductNo{link_info["product_num"]}AffiliateLink': link_info['affiliate_link']}
-                    )
-
-
-            # Step 7b: Download Amazon product images if available
-            if affiliate_result.get('product_results'):
-                print("📸 Downloading Amazon product images...")
-                
-                images_result = await download_and_save_amazon_images(
-                    self.config,
-                    pending_title['record_id'],
-                    video_result.get('project_name', pending_title['title']),
-                    affiliate_result.get('product_results', {})
-                )
-                
-                if images_result['success']:
-                    print(f"✅ Saved {images_result['images_saved']} Amazon product images")
-                    print(f"📦 Products with images: {images_result['products_with_images']}")
-
-# Step 8: Create video with JSON2Video
+        except Exception as e:
+            print(f"❌ Product image error: {e}")
+            return {'images_result': {'success': False, 'error': str(e)}}
+
+        await self.quota.charge('google_drive', images_result.get('images_saved', 0))
+        if images_result['success']:
+            print(f"✅ Saved {images_result['images_saved']} Amazon product images")
+            print(f"📦 Products with images: {images_result['products_with_images']}")
+        return {'images_result': images_result}
+
+    async def _stage_video(self, inputs: dict) -> dict:
+        """Step 8: Create video with JSON2Video"""
         print("🎬 Creating video with JSON2Video...")
         video_result = await run_video_creation(
             self.config,
-            pending_title['record_id']
+            inputs['pending_title']['record_id'],
+            inputs['context'],
+            self.clients
         )
-        
-        print(f"🔍 DEBUG: video_result = {video_result}")
-        
+
         if video_result['success']:
             print(f"✅ Video created successfully!")
-            
-            # Step 9: Upload to Google Drive
-            print("☁️ Uploading video to Google Drive...")
-            upload_result = await upload_video_to_google_drive(
-                self.config,
-                video_result['video_url'],
-                video_result.get('project_name', f'Video_{pending_title["record_id"]}'),
-                pending_title['record_id']
-            )
-            
-            if upload_result['success']:
-                print(f"✅ Video uploaded to Google Drive: {upload_result['drive_url']}")
-                
-                # Create WordPress blog post
-                try:
-                    wp_result = await self.wordpress_mcp.create_review_post(pending_title)
-                    if wp_result.get('success'):
-                        print(f"✅ Blog post created: {wp_result.get('post_url')}")
-                except Exception as e:
-                    print(f"❌ Blog post error: {e}")
+        return {'video_result': video_result}
 
-        # Upload to YouTube (if enabled)
-        youtube_enabled = self.config.get('youtube_enabled', False)
-        if youtube_enabled and video_result.get('video_url'):
-            print("📹 Uploading to YouTube Shorts...")
-            try:
-                # Initialize YouTube MCP
-                self.youtube_mcp = YouTubeMCP(
-                    credentials_path=self.config.get('youtube_credentials', '/home/claude-workflow/config/youtube_credentials.json'),
-                    token_path=self.config.get('youtube_token', '/home/claude-workflow/config/youtube_token.json')
-                )
-                
-                # Prepare YouTube title (optimized for Shorts)
-                youtube_prefix = self.config.get('youtube_title_prefix', '')
-                youtube_suffix = self.config.get('youtube_title_suffix', '')
-                youtube_title = f"{youtube_prefix}{pending_title.get("VideoTitle", pending_title.get("Title", pending_title.get("VideoTitle", "")))}{youtube_suffix}"[:100]  # YouTube limit
-                
-                # Build YouTube description
-                youtube_description = f"{pending_title.get("VideoTitle", pending_title.get("Title", pending_title.get("VideoTitle", "")))}\n\n"
-                
-                # Add timestamps (for 8-second test videos)
-                youtube_description += "⏱️ Timestamps:\n"
-                youtube_description += "0:00 Intro\n"
-                youtube_description += "0:02 Products\n"
-                youtube_description += "0:06 Outro\n\n"
-                
-                # Add products with affiliate links
-                youtube_description += "🛒 Featured Products:\n\n"
-                products_found = False
-                
-                for i in range(1, 6):
-                    product_title = pending_title.get(f'ProductNo{i}Title', '')
-                    product_desc = pending_title.get(f'ProductNo{i}Description', '')
-                    affiliate_link = pending_title.get(f'ProductNo{i}AffiliateLink', '')
-                    
-                    if product_title:
-                        products_found = True
-                        youtube_description += f"#{i} {product_title}\n"
-                        if product_desc:
-                            # Add first 100 chars of description
-                            youtube_description += f"{product_desc[:100]}...\n"
-                        if affiliate_link:
-                            youtube_description += f"→ {affiliate_link}\n"
-                        youtube_description += "\n"
-                
-                # Add keywords as hashtags
-                if keywords:
-                    youtube_description += "\n"
-                    # Add up to 10 hashtags
-                    for keyword in keywords[:10]:
-                        hashtag = keyword.replace(' ', '').replace('-', '')
-                        youtube_description += f"#{hashtag} "
-                    youtube_description += "\n"
-                
-                # Add shorts hashtag
-                shorts_tag = self.config.get('youtube_shorts_tag', '#shorts')
-                youtube_description += f"\n{shorts_tag}\n"
-                
-                # Add disclaimer
-                youtube_description += "\n" + "="*50 + "\n"
-                youtube_description += "As an Amazon Associate I earn from qualifying purchases.\n"
-                youtube_description += "="*50
-                
-                # Prepare tags
-                youtube_tags = self.config.get('youtube_tags', []).copy()
-                youtube_tags.append('shorts')  # Always add shorts tag
-                
-                # Add keywords as tags
-                if keywords:
-                    youtube_tags.extend([k.lower() for k in keywords[:10]])
-                
-                # Remove duplicates and limit tags
-                youtube_tags = list(dict.fromkeys(youtube_tags))[:30]  # YouTube allows max 30 tags
-                
-                # Upload video
-                youtube_result = await self.youtube_mcp.upload_video(
-                    video_path=video_result.get('video_url'),
-                    title=youtube_title,
-                    description=youtube_description[:5000],  # YouTube limit
-                    tags=youtube_tags,
-                    category_id=self.config.get('youtube_category', '22'),  # People & Blogs
-                    privacy_status=self.config.get('youtube_privacy', 'private')
-                )
-                
-                if youtube_result.get('success'):
-                    print(f"✅ YouTube upload successful!")
-                    print(f"   URL: {youtube_result['video_url']}")
-                    print(f"   Title: {youtube_result['title']}")
-                    
-                    # Update Airtable with YouTube info
-                    youtube_updates = {
-                        'YouTubeURL': youtube_result['video_url']
-                    }
-                    
-                    await self.airtable_server.update_record(pending_title["record_id"], youtube_updates)
-                    print("✅ Updated Airtable with YouTube URL")
-                    
-                else:
-                    print(f"⚠️ YouTube upload failed: {youtube_result.get('error')}")
-                    # Don't fail the whole workflow
-                    
-            except Exception as e:
-                print(f"❌ YouTube error: {e}")
-                # Continue workflow even if YouTube fails
-                import traceback
-                traceback.print_exc()
-        
+    async def _stage_video_spool(self, inputs: dict) -> dict:
+        """Step 9a: Prepare one local copy of the render for every publish target"""
+        video_result = inputs['video_result']
+        if not (video_result['success'] and video_result.get('video_url')):
+            return {'video_spool': None}
+
+        # Nothing is downloaded until a target asks, so restored uploads cost no egress
+        # Its own pooled client: the json2video one carries the API key, which the CDN has no use for
+        spool = VideoSpool(
+            video_result['video_url'],
+            self.clients.http('video_spool'),
+            directory=self.settings.spool_dir,
+            timeout=self.settings.spool_download_timeout
+        )
+        self.spools[inputs['pending_title']['record_id']] = spool
+        return {'video_spool': spool}
 
+    async def _stage_drive_upload(self, inputs: dict) -> dict:
+        """Step 9: Upload to Google Drive"""
+        video_result = inputs['video_result']
+        if not video_result['success']:
+            return {'upload_result': None}
 
-                 # Upload to YouTube Shorts
-                        
- 
+        pending_title = inputs['pending_title']
+        try:
+            local_path = await inputs['video_spool'].path()
+        except Exception as e:
+            print(f"❌ Could not download the video: {e}")
+            return {'upload_result': {'success': False, 'error': str(e)}}
 
-        # Step 10: Update status
-        print("✅ Updating record status to 'Done'...")
-        await self.airtable_server.update_record_status(
+        print("☁️ Uploading video to Google Drive...")
+        upload_result = await upload_video_to_google_drive(
+            self.config,
+            video_result['video_url'],
+            video_result.get('project_name', f'Video_{pending_title["record_id"]}'),
             pending_title['record_id'],
-            "Processing"
+            local_path=local_path,
+            clients=self.clients
         )
-        
-        print("🎉 Complete workflow finished successfully!")
-        print("📊 Summary:")
-        print(f"   Original: {pending_title['title']}")
-        print(f"   Optimized: {optimized_title}")
-        print(f"   Products: {len(script_data.get('products', []))}")
-        
-    async def _save_countdown_to_airtable(self, record_id: str, script_data: dict):
-        """Save countdown script products to Airtable"""
+
+        if upload_result['success']:
+            print(f"✅ Video uploaded to Google Drive: {upload_result['drive_url']}")
+        return {'upload_result': upload_result}
+
+    async def _stage_wordpress(self, inputs: dict) -> dict:
+        """Create WordPress blog post"""
+        try:
+            if self.wordpress_mcp is None:
+                self.wordpress_mcp = WordPressMCP(self.config, session=self.clients.session('wordpress'))
+            wp_result = await self.wordpress_mcp.create_review_post(inputs['context'].fields)
+            if wp_result.get('success'):
+                print(f"✅ Blog post created: {wp_result.get('post_url')}")
+        except Exception as e:
+            print(f"❌ Blog post error: {e}")
+            wp_result = {'success': False, 'error': str(e)}
+        return {'wp_result': wp_result}
+
+    async def _stage_youtube(self, inputs: dict) -> dict:
+        """Upload to YouTube (if enabled)"""
+        context = inputs['context']
+        keywords = inputs['keywords']
+
+        youtube_enabled = self.config.get('youtube_enabled', False)
+        if not (youtube_enabled and inputs['video_spool']):
+            return {'youtube_result': None}
+
+        print("📹 Uploading to YouTube Shorts...")
+        youtube_result = None
+        try:
+            # Shared YouTube MCP, authenticated once per process
+            youtube = self.clients.youtube()
+
+            # Prepare YouTube title (optimized for Shorts)
+            youtube_prefix = self.config.get('youtube_title_prefix', '')
+            youtube_suffix = self.config.get('youtube_title_suffix', '')
+            video_title = context.get('VideoTitle') or context.get('Title', '')
+            youtube_title = f"{youtube_prefix}{video_title}{youtube_suffix}"[:100]  # YouTube limit
+
+            # Build YouTube description
+            youtube_description = f"{video_title}\n\n"
+
+            # Add timestamps (for 8-second test videos)
+            youtube_description += "⏱️ Timestamps:\n"
+            youtube_description += "0:00 Intro\n"
+            youtube_description += "0:02 Products\n"
+            youtube_description += "0:06 Outro\n\n"
+
+            # Add products with affiliate links
+            youtube_description += "🛒 Featured Products:\n\n"
+
+            for i in range(1, 6):
+                product_title = context.get(f'ProductNo{i}Title', '')
+                product_desc = context.get(f'ProductNo{i}Description', '')
+                affiliate_link = context.get(f'ProductNo{i}AffiliateLink', '')
+
+                if product_title:
+                    youtube_description += f"#{i} {product_title}\n"
+                    if product_desc:
+                        # Add first 100 chars of description
+                        youtube_description += f"{product_desc[:100]}...\n"
+                    if affiliate_link:
+                        youtube_description += f"→ {affiliate_link}\n"
+                    youtube_description += "\n"
+
+            # Add keywords as hashtags
+            if keywords:
+                youtube_description += "\n"
+                # Add up to 10 hashtags
+                for keyword in keywords[:10]:
+                    hashtag = keyword.replace(' ', '').replace('-', '')
+                    youtube_description += f"#{hashtag} "
+                youtube_description += "\n"
+
+            # Add shorts hashtag
+            shorts_tag = self.config.get('youtube_shorts_tag', '#shorts')
+            youtube_description += f"\n{shorts_tag}\n"
+
+            # Add disclaimer
+            youtube_description += "\n" + "="*50 + "\n"
+            youtube_description += "As an Amazon Associate I earn from qualifying purchases.\n"
+            youtube_description += "="*50
+
+            # Prepare tags
+            youtube_tags = self.config.get('youtube_tags', []).copy()
+            youtube_tags.append('shorts')  # Always add shorts tag
+
+            # Add keywords as tags
+            if keywords:
+                youtube_tags.extend([k.lower() for k in keywords[:10]])
+
+            # Remove duplicates and limit tags
+            youtube_tags = list(dict.fromkeys(youtube_tags))[:30]  # YouTube allows max 30 tags
+
+            # Upload video
+            youtube_result = await youtube.upload_video(
+                video_path=await inputs['video_spool'].path(),
+                title=youtube_title,
+                description=youtube_description[:5000],  # YouTube limit
+                tags=youtube_tags,
+                category_id=self.config.get('youtube_category', '22'),  # People & Blogs
+                privacy_status=self.config.get('youtube_privacy', 'private')
+            )
+
+            if youtube_result.get('success'):
+                print(f"✅ YouTube upload successful!")
+                print(f"   URL: {youtube_result['video_url']}")
+                print(f"   Title: {youtube_result['title']}")
+
+                # Update Airtable with YouTube info
+                youtube_updates = {
+                    'YouTubeURL': youtube_result['video_url']
+                }
+
+                context.update(youtube_updates)
+                print("✅ Queued YouTube URL for Airtable")
+
+            else:
+                print(f"⚠️ YouTube upload failed: {youtube_result.get('error')}")
+                # Don't fail the whole workflow
+
+        except Exception as e:
+            print(f"❌ YouTube error: {e}")
+            # Continue workflow even if YouTube fails
+            traceback.print_exc()
+            youtube_result = {'success': False, 'error': str(e)}
+        return {'youtube_result': youtube_result}
+
+    def _save_countdown_to_context(self, context: RecordContext, script_data: dict):
+        """Queue countdown script products for Airtable"""
         update_fields = {}
-        
+
         # Save each product - these fields definitely exist
         if 'products' in script_data:
             for i, product in enumerate(script_data['products']):
                 product_num = i + 1
                 update_fields[f'ProductNo{product_num}Title'] = product.get('title', '')
                 update_fields[f'ProductNo{product_num}Description'] = product.get('description', '')
-        
+
         if update_fields:
-            try:
-                await self.airtable_server.update_record(record_id, update_fields)
-                print(f"💾 Saved {len(update_fields)} fields to Airtable")
-            except Exception as e:
-                print(f"⚠️ Error saving to Airtable: {e}")
+            context.update(update_fields)
+            print(f"💾 Queued {len(update_fields)} fields for Airtable")
+
+
+def parse_args(argv=None):
+    """Parse command line options for the workflow runner"""
+    parser = argparse.ArgumentParser(description="Run the content generation workflow")
+    parser.add_argument('--batch', type=int, metavar='N', default=0,
+                        help='process up to N pending records in one event loop')
+    parser.add_argument('--concurrency', type=int, metavar='K', default=2,
+                        help='workers per pipeline phase in batch, resume and scheduled modes (default: 2)')
+    parser.add_argument('--record', metavar='RECORD_ID',
+                        help='run or resume one specific record, skipping checkpointed stages')
+    parser.add_argument('--from-stage', metavar='STAGE',
+                        choices=list(DEFAULT_STAGE_CONCURRENCY) + [name for name, _ in PIPELINE_PHASES],
+                        help='with --record, re-run this stage or phase (e.g. render) and everything after it')
+    parser.add_argument('--resume', action='store_true',
+                        help='resume every record whose last run did not finish')
+    parser.add_argument('--back-to-back', action='store_true',
+                        help='process every Pending record in turn, preparing the next one while the current one renders')
+    parser.add_argument('--startup-profile', action='store_true',
+                        help='report import time of the runner and of each lazily loaded stage module, then exit')
+    parser.add_argument('--scheduled', action='store_true',
+                        help='run as a daemon that keeps polling Airtable for Pending records')
+    parser.add_argument('--lease', action='store_true',
+                        help='claim records with Airtable leases so several workers can share the table')
+    parser.add_argument('--workers', type=int, metavar='N', default=1,
+                        help='with --scheduled, run N leased worker processes on this host')
+    parser.add_argument('--max-workers', type=int, metavar='M',
+                        help='with --scheduled, scale between --workers and M processes by Pending backlog')
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument('--record-cassette', metavar='DIR',
+                          help='save every provider call and response of this run to DIR')
+    cassette.add_argument('--replay-cassette', metavar='DIR',
+                          help='answer every provider call from a cassette recorded with --record-cassette')
+    parser.add_argument('--replay-speed', type=float, metavar='X', default=0.0,
+                        help='with --replay-cassette, wait recorded latency / X per call (1 = as recorded, '
+                             'default 0 = no waiting)')
+    parser.add_argument('--metrics-port', type=int, metavar='PORT',
+                        help='with --scheduled, serve Prometheus metrics on http://0.0.0.0:PORT/metrics '
+                             '(provider calls are read off trace spans; add --http-timing for per-phase timings)')
+    parser.add_argument('--http-timing', action='store_true',
+                        help='time DNS, connect, TLS, first byte and transfer of every provider call and '
+                             'print the totals per provider and endpoint at exit; with --metrics-port they '
+                             'are also served on /metrics')
+    parser.add_argument('--trace', metavar='DIR',
+                        help='write a span per record, stage and provider call to DIR as JSONL and Chrome trace events')
+    args = parser.parse_args(argv)
+    if args.batch < 0:
+        parser.error('--batch must not be negative')
+    if args.concurrency < 1:
+        parser.error('--concurrency must be at least 1')
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+    if args.max_workers is not None and args.max_workers < args.workers:
+        parser.error('--max-workers must not be below --workers')
+    if args.from_stage and not args.record:
+        parser.error('--from-stage needs --record')
+    if args.replay_speed < 0:
+        parser.error('--replay-speed must not be negative')
+    if args.replay_speed and not args.replay_cassette:
+        parser.error('--replay-speed needs --replay-cassette')
+    if args.metrics_port is not None and not args.scheduled:
+        parser.error('--metrics-port needs --scheduled')
+    if args.metrics_port is not None and (args.workers > 1 or args.max_workers):
+        parser.error('--metrics-port serves one daemon process; drop --workers / --max-workers')
+    if (args.record_cassette or args.replay_cassette) and (args.workers > 1 or args.max_workers):
+        parser.error('cassettes work in one process; drop --workers / --max-workers')
+    return args
+
+def build_scheduler(orchestrator: ContentPipelineOrchestrator, concurrency: int, lease: bool = False,
+                    slots=None) -> WorkflowScheduler:
+    """Scheduler for one orchestrator, optionally claiming records through Airtable leases"""
+    leases = None
+    if lease:
+        leases = LeaseManager(
+            orchestrator.airtable_server,
+            ttl=orchestrator.settings.lease_ttl
+        )
+        print(f"🔒 Claiming records with leases as {leases.worker_id}")
+
+    return WorkflowScheduler(
+        orchestrator,
+        concurrency=concurrency,
+        min_interval=orchestrator.settings.poll_min_seconds,
+        max_interval=orchestrator.settings.poll_max_seconds,
+        retry_delay=orchestrator.settings.retry_failed_after,
+        leases=leases,
+        slots=slots,
+        queue=orchestrator.pending
+    )
+
+async def apply_config(orchestrator: ContentPipelineOrchestrator, scheduler: WorkflowScheduler,
+                       config: dict, settings: Settings):
+    """Let the scheduler's in-flight records finish, then switch it and its orchestrator to `config`"""
+    async def apply():
+        await orchestrator.reconfigure(config, settings)
+        if orchestrator.pipeline:
+            scheduler.concurrency = orchestrator.pipeline.capacity
+        scheduler.min_interval = settings.poll_min_seconds
+        scheduler.max_interval = settings.poll_max_seconds
+        scheduler.retry_delay = settings.retry_failed_after
+        if scheduler.leases:
+            scheduler.leases.ttl = settings.lease_ttl
+    await scheduler.reconfigure(apply)
+
+def watch_config(on_reload) -> asyncio.Task:
+    """
+    Reload api_keys.json whenever it changes and hand the new config to `on_reload`.
+    An edit that does not validate is reported and the running config kept.
+    """
+    async def changed():
+        previous = load_config()
+        try:
+            config, settings = reload_settings()
+        except ConfigError as e:
+            print(f"⚠️ Config change ignored: {e}")
+            return
+        if config == previous:
+            return
+        print("🔄 Config changed, applying it once in-flight records finish")
+        await on_reload(config, settings)
+        print("✅ New config applied")
+
+    from services.config_watcher import ConfigWatcher
+    watcher = ConfigWatcher(config_path(), interval=get_settings().config_watch_interval)
+    return asyncio.create_task(watcher.watch(changed))
+
+async def run_scheduled(orchestrator: ContentPipelineOrchestrator, concurrency: int, lease: bool = False):
+    """Daemon mode: one warm orchestrator, polling until SIGTERM/SIGINT and following config edits"""
+    pipeline = await orchestrator.start_pipeline(concurrency)
+    scheduler = build_scheduler(orchestrator, pipeline.capacity, lease)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, scheduler.stop)
+    from services import metrics
+    metrics.watch_daemon(orchestrator.tenant, orchestrator, scheduler)
+    watcher = watch_config(lambda config, settings: apply_config(orchestrator, scheduler, config, settings))
+    try:
+        await scheduler.run()
+    finally:
+        watcher.cancel()
+        await orchestrator.stop_pipeline()
+
+async def run_tenants(tenants: list, concurrency: int, lease: bool = False):
+    """
+    Daemon mode for several channels in one process. Each tenant polls its own base, but
+    record slots and every stage limit (Anthropic, JSON2Video, ...) are shared across tenants
+    by weighted fair queueing, so a busy channel cannot starve a quiet one.
+    """
+    limits = stage_concurrency(get_settings())
+    records = FairShare(concurrency, 'records')
+    stage_shares = {name: FairShare(limit, name) for name, limit in limits.items()}
+
+    from services import metrics
+    orchestrators = []
+    schedulers = []
+    try:
+        for tenant in tenants:
+            orchestrator = ContentPipelineOrchestrator(
+                tenant.config,
+                tenant=tenant.name,
+                stage_limiters={name: share.tenant(tenant.name, tenant.weight) for name, share in stage_shares.items()}
+            )
+            orchestrators.append(orchestrator)
+            # Each tenant lines up twice the shared slots, so it still has a record waiting
+            # when a slot frees and its weight is not lost to its own polling delay
+            schedulers.append(build_scheduler(orchestrator, 2 * concurrency, lease,
+                                              slots=records.tenant(tenant.name, tenant.weight)))
+            metrics.watch_daemon(tenant.name, orchestrator, schedulers[-1])
+            print(f"📺 Tenant {tenant.name} (weight {tenant.weight:g}): base {tenant.config['airtable_base_id']}")
+
+        async def reload(config: dict, settings: Settings):
+            limits = stage_concurrency(settings)
+            for name, share in stage_shares.items():
+                share.resize(limits[name])
+            updated = {tenant.name: tenant for tenant in tenant_configs(config)}
+            if set(updated) != {tenant.name for tenant in tenants}:
+                print("⚠️ Adding or removing tenants only takes effect after a restart")
 
+            async def apply_tenant(name: str, orchestrator, scheduler):
+                tenant = updated.get(name)
+                if tenant is None:
+                    return
+                # Taking a slot handle again updates the tenant's weight in the shared queues
+                orchestrator.stage_limiters = {stage: share.tenant(name, tenant.weight)
+                                               for stage, share in stage_shares.items()}
+                scheduler.slots = records.tenant(name, tenant.weight)
+                await apply_config(orchestrator, scheduler, tenant.config, Settings.from_config(tenant.config))
+
+            await asyncio.gather(*(
+                apply_tenant(tenant.name, orchestrator, scheduler)
+                for tenant, orchestrator, scheduler in zip(tenants, orchestrators, schedulers)
+            ))
+
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, lambda: [scheduler.stop() for scheduler in schedulers])
+        watcher = watch_config(reload)
+        try:
+            await asyncio.gather(*(scheduler.run() for scheduler in schedulers))
+        finally:
+            watcher.cancel()
+    finally:
+        for name, stats in records.stats().items():
+            print(f"   {name}: {stats['served']} record runs")
+        for orchestrator in orchestrators:
+            await orchestrator.close()
+
+async def run_fleet(workers: int, concurrency: int, max_workers: int = None, trace: str = None):
+    """Supervise several leased daemon processes on this host, autoscaled up to max_workers"""
+    from services.worker_fleet import Autoscaler, WorkerFleet, worker_command
+    fleet = WorkerFleet(worker_command(os.path.abspath(__file__), concurrency, trace=trace), workers)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, fleet.stop)
+    if not max_workers or max_workers <= workers:
+        print(f"👷 Starting {workers} leased workers")
+        await fleet.run()
+        return
+
+    print(f"👷 Starting {workers} leased workers, scaling up to {max_workers} with the backlog")
+    settings = get_settings()
+    scaler = asyncio.create_task(autoscale(fleet, Autoscaler(
+        workers, max_workers, concurrency,
+        drain_seconds=settings.autoscale_drain_seconds,
+        scale_down_after=settings.autoscale_scale_down_after
+    )))
+    try:
+        await fleet.run()
+    finally:
+        scaler.cancel()
+        await asyncio.gather(scaler, return_exceptions=True)
+
+async def autoscale(fleet: 'WorkerFleet', autoscaler: 'Autoscaler'):
+    """Resize the fleet every autoscale interval from the Pending count and what the workers report"""
+    from services.fleet_signals import FleetSignals
+    from services.worker_fleet import ScalingInputs
+    settings = get_settings()
+    interval = settings.autoscale_interval
+    clients = ClientRegistry(load_config())
+    airtable = clients.airtable()
+    signals = FleetSignals(settings.fleet_db)
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            pending = len(await airtable.scan_pending_records(max_records=settings.pending_scan_limit))
+            # Record times are noisy, so look back further than one tick for them
+            inputs = ScalingInputs(
+                pending=pending,
+                record_seconds=signals.record_seconds(max(interval, 1800)),
+                stage_seconds=signals.stage_seconds(max(interval, 300)),
+                baseline_seconds=signals.stage_seconds(3600),
+                throttles=sum(signals.throttles(interval).values())
+            )
+            wanted = autoscaler.decide(fleet.running, inputs)
+            if wanted != fleet.running:
+                reason = f"{pending} pending"
+                if inputs.throttles:
+                    reason += f", {inputs.throttles} throttled calls"
+                slowed = autoscaler.slowed_stages(inputs)
+                if slowed:
+                    reason += f", slow {', '.join(slowed)}"
+                print(f"📈 Scaling workers {fleet.running} -> {wanted} ({reason})")
+                fleet.scale_to(wanted)
+    finally:
+        signals.close()
+        await clients.aclose()
+
+def open_cassette(args):
+    """Start recording or replaying provider calls if asked to; None otherwise"""
+    if not (args.record_cassette or args.replay_cassette):
+        return None
+    from services.cassette import Cassette
+    if args.record_cassette:
+        print(f"📼 Recording provider calls to {args.record_cassette}")
+        return Cassette(args.record_cassette, 'record').install()
+    print(f"📼 Replaying provider calls from {args.replay_cassette}")
+    return Cassette(args.replay_cassette, 'replay', speed=args.replay_speed).install()
 
 # Run the workflow
-async def main():
+async def main(argv=None):
+    args = parse_args(argv)
+    cassette = open_cassette(args)
+    # Installed after the cassette so replayed calls are traced too; a fleet supervisor makes no
+    # calls of its own, its workers trace into the same directory. Metrics read provider calls
+    # and running stages off the spans, so they need a tracer even when nothing is written
+    tracer = None
+    if (args.trace and not (args.scheduled and (args.workers > 1 or args.max_workers))) or args.metrics_port is not None:
+        tracer = tracing.Tracer(args.trace, load_config()).install()
+        tracing.install_tracer(tracer)
+    # Timing patches the socket, ssl and http.client layers, so it only runs when asked for
+    timings = None
+    if args.http_timing:
+        from services import http_timing
+        timings = http_timing.install()
+    server = None
+    if args.metrics_port is not None:
+        from services import metrics
+        tracer.listeners.append(metrics.observe_span)
+        server = await metrics.MetricsServer(metrics.REGISTRY, args.metrics_port).start()
+        print(f"📈 Metrics on http://0.0.0.0:{server.port}/metrics")
+    try:
+        await run(args)
+    finally:
+        if server:
+            await server.close()
+        if timings:
+            print("⏱️ HTTP timings per provider and endpoint (mean per call):")
+            for line in timings.report() or ['   no calls timed']:
+                print(line)
+            from services import http_timing
+            http_timing.uninstall()
+        if tracer:
+            tracing.install_tracer(None)
+            tracer.close()
+            if args.trace:
+                print(f"🧭 {tracer.spans} spans written to {args.trace}")
+        if cassette:
+            cassette.close()
+            print(f"📼 {cassette.calls} provider calls {'recorded' if cassette.mode == 'record' else 'replayed'}")
+
+async def run(args):
+    """Dispatch to the mode picked on the command line"""
+    if args.startup_profile:
+        # The YouTube uploader is loaded by the client registry rather than through lazy()
+        print_startup_profile('workflow_runner', LAZY_MODULES + ['mcp.youtube_mcp'],
+                              cwd=os.path.dirname(os.path.abspath(__file__)))
+        return
+    if args.scheduled and (args.workers > 1 or args.max_workers):
+        # The supervisor only spawns processes; each worker builds its own orchestrator
+        await run_fleet(args.workers, args.concurrency, args.max_workers, trace=args.trace)
+        return
+
+    tenants = tenant_configs(load_config())
+    if args.scheduled and tenants:
+        await run_tenants(tenants, args.concurrency, lease=args.lease)
+        return
+
     orchestrator = ContentPipelineOrchestrator()
-    await orchestrator.run_complete_workflow()
+    try:
+        if args.scheduled:
+            await run_scheduled(orchestrator, args.concurrency, lease=args.lease)
+        elif args.record:
+            await orchestrator.run_record(args.record, from_stage=args.from_stage)
+        elif args.resume:
+            await orchestrator.resume_unfinished(args.concurrency)
+        elif args.batch:
+            await orchestrator.run_batch(args.batch, args.concurrency)
+        elif args.back_to_back:
+            leases = None
+            if args.lease:
+                leases = LeaseManager(orchestrator.airtable_server, ttl=orchestrator.settings.lease_ttl)
+                print(f"🔒 Claiming records with leases as {leases.worker_id}")
+            await orchestrator.run_back_to_back(leases)
+        else:
+            await orchestrator.run_complete_workflow()
+    finally:
+        await orchestrator.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
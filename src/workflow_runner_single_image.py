@@ -8,14 +8,14 @@ from datetime import datetime
 sys.path.append('/app')
 
 from mcp_servers.airtable_server import AirtableMCPServer
+from services.settings import load_config
 from mcp_servers.content_generation_server import ContentGenerationMCPServer
 from mcp_servers.image_generation_server import ImageGenerationMCPServer
 
 class ContentPipelineOrchestrator:
     def __init__(self):
         # Load configuration
-        with open('/app/config/api_keys.json', 'r') as f:
-            self.config = json.load(f)
+        self.config = load_config()
         
         # Initialize MCP servers
         self.airtable_server = AirtableMCPServer(
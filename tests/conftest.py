@@ -0,0 +1,6 @@
+"""Unit tests import the services the way workflow_runner does, with src/ on the path"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
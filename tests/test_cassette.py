@@ -0,0 +1,89 @@
+import asyncio
+import http.server
+import json
+import threading
+
+import pytest
+
+httpx = pytest.importorskip('httpx')
+
+from services.cassette import INDEX_FILE, Cassette, CassetteMiss, redact_url
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    requests = 0
+
+    def do_POST(self):
+        Handler.requests += 1
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.dumps({'echo': self.rfile.read(length).decode(), 'call': Handler.requests}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.requests = 0
+    httpd = http.server.HTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_port}'
+    httpd.shutdown()
+
+
+def post_all(url, bodies):
+    async def run():
+        async with httpx.AsyncClient() as client:
+            return [(await client.post(url, content=body)).json() for body in bodies]
+    return asyncio.run(run())
+
+
+def test_recorded_calls_replay_without_the_network(server, tmp_path):
+    url = f'{server}/render?api_key=secret'
+    cassette = Cassette(str(tmp_path), 'record').install()
+    try:
+        recorded = post_all(url, ['a', 'b'])
+    finally:
+        cassette.close()
+    assert Handler.requests == 2
+    assert 'secret' not in (tmp_path / INDEX_FILE).read_text()
+
+    cassette = Cassette(str(tmp_path), 'replay').install()
+    try:
+        # Matched on the body first, then in recorded order
+        replayed = post_all(url, ['b', 'a'])
+        with pytest.raises(CassetteMiss):
+            post_all(url, ['a'])
+    finally:
+        cassette.close()
+    assert Handler.requests == 2
+    assert replayed == [recorded[1], recorded[0]]
+
+
+def test_calls_with_a_changed_body_fall_back_to_the_url(server, tmp_path):
+    cassette = Cassette(str(tmp_path), 'record').install()
+    try:
+        recorded = post_all(f'{server}/upload', ['boundary-1'])
+    finally:
+        cassette.close()
+
+    cassette = Cassette(str(tmp_path), 'replay').install()
+    try:
+        assert post_all(f'{server}/upload', ['boundary-2']) == recorded
+    finally:
+        cassette.close()
+
+
+def test_patches_are_undone_on_close(tmp_path):
+    send = httpx.AsyncHTTPTransport.handle_async_request
+    Cassette(str(tmp_path), 'record').install().close()
+    assert httpx.AsyncHTTPTransport.handle_async_request is send
+    with pytest.raises(FileNotFoundError):
+        Cassette(str(tmp_path / 'empty'), 'replay')
+    assert redact_url('https://x.test/a?token=t&q=1') == 'https://x.test/a?token=REDACTED&q=1'
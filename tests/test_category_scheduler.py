@@ -0,0 +1,34 @@
+from services.category_scheduler import CategoryScheduler
+
+
+def records(**counts):
+    return [{'id': f'{category}{i}', 'fields': {'Category': category}}
+            for category, count in counts.items() for i in range(count)]
+
+
+def test_same_category_records_come_in_batches():
+    scheduler = CategoryScheduler(batch_size=2, categories=['Beauty', 'Electronics'])
+    ordered = scheduler.order(records(Electronics=4, Beauty=4))
+    assert [r['fields']['Category'] for r in ordered] == \
+        ['Beauty', 'Beauty', 'Electronics', 'Electronics', 'Beauty', 'Beauty', 'Electronics', 'Electronics']
+
+
+def test_weights_and_backlog_set_the_share():
+    scheduler = CategoryScheduler({'Beauty': 3}, batch_size=1)
+    ordered = scheduler.order(records(Beauty=20, Toys=20), limit=20)
+    beauty = sum(r['fields']['Category'] == 'Beauty' for r in ordered)
+    # About 3:1, drifting towards Toys as Beauty's backlog shrinks faster
+    assert 13 <= beauty <= 15
+
+
+def test_zero_weight_only_runs_when_nothing_else_waits():
+    scheduler = CategoryScheduler({'Other': 0}, batch_size=1)
+    assert scheduler.pick({'Other': 5, 'Beauty': 1}) == 'Beauty'
+    scheduler.charge('Beauty')
+    assert scheduler.pick({'Other': 5}) == 'Other'
+    assert scheduler.pick({}) is None
+
+
+def test_records_without_category_fall_back():
+    assert CategoryScheduler.backlog([{'fields': {}}, {'fields': {'Category': 'Beauty'}}]) == \
+        {'Other': 1, 'Beauty': 1}
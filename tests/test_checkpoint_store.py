@@ -0,0 +1,40 @@
+import pytest
+
+from services.checkpoint_store import CheckpointStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CheckpointStore(str(tmp_path / 'checkpoints.db'))
+    yield store
+    store.close()
+
+
+def test_outputs_saved_for_other_inputs_count_as_missing(store):
+    store.save('rec1', 'script', {'script': {'intro': 'hi'}}, input_hash='h1')
+    assert store.load('rec1', 'script', 'h1') == {'script': {'intro': 'hi'}}
+    assert store.load('rec1', 'script', 'h2') is None
+    assert store.load('rec1', 'script') == {'script': {'intro': 'hi'}}
+    assert store.load('rec2', 'script', 'h1') is None
+
+
+def test_rows_saved_without_a_hash_are_trusted(store):
+    store.save('rec1', 'keywords', {'keywords': ['a']})
+    assert store.load('rec1', 'keywords', 'any') == {'keywords': ['a']}
+
+
+def test_finished_records_are_not_resumed(store):
+    store.save('rec1', 'keywords', {'keywords': []}, 'h')
+    store.save('rec2', 'keywords', {'keywords': []}, 'h')
+    store.mark_finished('rec1')
+    assert store.is_finished('rec1')
+    assert store.unfinished_records() == ['rec2']
+
+    # Saving a stage again reopens the record
+    store.save('rec1', 'video', {'video_result': {}}, 'h')
+    assert not store.is_finished('rec1')
+    assert store.completed_stages('rec1') == ['keywords', 'video']
+
+    store.clear('rec1')
+    assert store.completed_stages('rec1') == []
+    assert store.unfinished_records() == ['rec2']
@@ -0,0 +1,77 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from services import settings
+from services.config_watcher import ConfigWatcher
+from services.settings import ConfigError
+
+BASE = {
+    'anthropic_api_key': 'sk',
+    'airtable_api_key': 'pat',
+    'airtable_base_id': 'app1',
+    'airtable_table_name': 'Titles',
+}
+
+
+def write(path, config, stamp):
+    path.write_text(json.dumps(config))
+    # Explicit times, so two writes within the clock's resolution still count as a change
+    os.utime(path, ns=(stamp, stamp))
+
+
+@pytest.fixture
+def config_file(tmp_path, monkeypatch):
+    path = tmp_path / 'api_keys.json'
+    write(path, BASE, 1_000_000_000)
+    monkeypatch.setenv(settings.CONFIG_FILE_ENV, str(path))
+    monkeypatch.setattr(settings, '_config', None)
+    monkeypatch.setattr(settings, '_settings', None)
+    return path
+
+
+def test_each_change_is_reported_once(config_file):
+    watcher = ConfigWatcher(str(config_file))
+    assert not watcher.changed()
+    write(config_file, {**BASE, 'record_timeout_seconds': 60}, 2_000_000_000)
+    assert watcher.changed()
+    assert not watcher.changed()
+
+    # An editor that saves by renaming leaves the file missing for a moment
+    config_file.unlink()
+    assert not watcher.changed()
+
+
+def test_watch_calls_back_and_survives_a_failing_callback(config_file):
+    calls = []
+
+    async def on_change():
+        calls.append(len(calls))
+        if len(calls) == 1:
+            raise RuntimeError('apply failed')
+
+    async def run():
+        watcher = ConfigWatcher(str(config_file), interval=0.01)
+        task = asyncio.create_task(watcher.watch(on_change))
+        for stamp in (2_000_000_000, 3_000_000_000):
+            write(config_file, {**BASE, 'poll_min_seconds': stamp // 1_000_000_000}, stamp)
+            await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(run())
+    assert calls == [0, 1]
+
+
+def test_a_bad_edit_keeps_the_running_config(config_file):
+    settings.get_settings()
+    write(config_file, {**BASE, 'record_timeout_seconds': 60}, 2_000_000_000)
+    config, new = settings.reload_settings()
+    assert new.record_timeout == 60 and settings.load_config() is config
+
+    write(config_file, {**BASE, 'poll_min_seconds': -1}, 3_000_000_000)
+    with pytest.raises(ConfigError):
+        settings.reload_settings()
+    assert settings.get_settings() is new
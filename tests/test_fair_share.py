@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from services.fair_share import FairShare
+
+
+def test_slots_go_out_by_weight():
+    async def run():
+        share = FairShare(1)
+        busy = share.tenant('busy', weight=2)
+        quiet = share.tenant('quiet', weight=1)
+        order = []
+
+        async def work(slot, name):
+            async with slot:
+                order.append(name)
+                await asyncio.sleep(0)
+
+        # Hold the only slot until everyone is queued
+        await share.acquire('busy')
+        tasks = [asyncio.create_task(work(busy, 'busy')) for _ in range(6)]
+        tasks += [asyncio.create_task(work(quiet, 'quiet')) for _ in range(3)]
+        await asyncio.sleep(0)
+        share.release()
+        await asyncio.gather(*tasks)
+        return order, share.stats()
+
+    order, stats = asyncio.run(run())
+    assert order[:6].count('busy') == 4
+    assert order[:6].count('quiet') == 2
+    assert stats['quiet'] == {'weight': 1, 'served': 3, 'waiting': 0}
+
+
+def test_cancelled_waiter_does_not_leak_its_slot():
+    async def run():
+        share = FairShare(1)
+        await share.acquire('a')
+        waiter = asyncio.create_task(share.acquire('b'))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        share.release()
+        await asyncio.wait_for(share.acquire('c'), timeout=1)
+        return share.active
+
+    assert asyncio.run(run()) == 1
+
+
+def test_limits_and_weights_must_be_positive():
+    with pytest.raises(ValueError):
+        FairShare(0)
+    with pytest.raises(ValueError):
+        FairShare(1).tenant('a', weight=0)
@@ -0,0 +1,65 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from services.fleet_signals import FleetSignals, is_throttle
+
+
+@pytest.fixture
+def signals(tmp_path):
+    signals = FleetSignals(str(tmp_path / 'fleet.db'))
+    yield signals
+    signals.close()
+
+
+def test_runs_stages_and_throttles_are_read_back(signals):
+    async def run():
+        await signals.record_run({
+            'script': {'status': 'done', 'seconds': 4.0, 'error': None},
+            'video': {'status': 'failed', 'seconds': 1.0, 'error': 'HTTP 429 Too Many Requests'},
+            'youtube': {'status': 'skipped', 'seconds': 0.0, 'error': 'upstream'},
+        })
+        await signals.record_run({'script': {'status': 'done', 'seconds': 2.0, 'error': None}}, seconds=30)
+        await signals.record_throttle('anthropic')
+
+    asyncio.run(run())
+
+    assert signals.record_seconds(60) == 30
+    assert signals.stage_seconds(60) == {'script': 3.0}
+    assert signals.throttles(60) == {'video': 1, 'anthropic': 1}
+
+
+def test_every_worker_on_the_host_shares_the_file(signals):
+    other = FleetSignals(signals.db_path)
+    try:
+        asyncio.run(other.record_run({}, seconds=10))
+        assert signals.record_seconds(60) == 10
+    finally:
+        other.close()
+
+
+def test_throttle_errors_are_recognised():
+    assert is_throttle('rate limit exceeded')
+    assert is_throttle('Overloaded')
+    assert not is_throttle('HTTP 404')
+    assert not is_throttle(None)
+
+
+def test_a_locked_file_does_not_hold_up_the_loop(signals):
+    other = sqlite3.connect(signals.db_path)
+    other.execute("BEGIN IMMEDIATE")
+
+    async def run():
+        write = asyncio.create_task(signals.record_run({}, seconds=5))
+        ticks = 0
+        while not write.done() and ticks < 5:
+            await asyncio.sleep(0.01)
+            ticks += 1
+        other.commit()
+        await write
+        return ticks
+
+    assert asyncio.run(run()) == 5
+    assert signals.record_seconds(60) == 5
+    other.close()
@@ -0,0 +1,96 @@
+import asyncio
+import http.server
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from services import http_timing
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = b'x' * 100
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = http.server.HTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_port}'
+    httpd.shutdown()
+
+
+@pytest.fixture
+def timings():
+    yield http_timing.install()
+    http_timing.uninstall()
+
+
+def test_endpoint_folds_ids():
+    assert http_timing.endpoint_of('post', 'https://api.elevenlabs.io/v1/text-to-speech/21m00Tcm4TlvDq8ikWAM?x=1') == \
+        'POST /v1/text-to-speech/:id'
+    assert http_timing.endpoint_of('GET', 'https://api.json2video.com/v2/movies') == 'GET /v2/movies'
+
+
+def test_async_client_calls_are_timed(server, timings):
+    httpx = pytest.importorskip('httpx')
+
+    async def run():
+        async with httpx.AsyncClient(event_hooks=http_timing.httpx_event_hooks('local')) as client:
+            for _ in range(2):
+                response = await client.get(f'{server}/v1/files/abc12345xyz')
+                assert response.status_code == 200
+        # Once the call is done, later work in the task is not charged to it
+        return http_timing._current.get()
+
+    assert asyncio.run(run()) is None
+    stats = timings.summary()['local GET /v1/files/:id']
+    assert stats['calls'] == 2
+    assert stats['errors'] == 0
+    assert stats['bytes_in'] == 200
+    assert set(stats['mean_phases']) == set(http_timing.PHASES)
+    assert stats['mean_phases']['ttfb'] > 0
+
+
+def test_failed_async_call_is_counted(timings):
+    httpx = pytest.importorskip('httpx')
+
+    async def run():
+        async with httpx.AsyncClient(event_hooks=http_timing.httpx_event_hooks('local')) as client:
+            with pytest.raises(httpx.ConnectError):
+                # Nothing listens on port 1
+                await client.get('http://127.0.0.1:1/down')
+        return http_timing._current.get()
+
+    assert asyncio.run(run()) is None
+    assert timings.summary()['local GET /down']['errors'] == 1
+
+
+def test_hooks_do_nothing_while_timing_is_off(server):
+    httpx = pytest.importorskip('httpx')
+
+    async def run():
+        async with httpx.AsyncClient(event_hooks=http_timing.httpx_event_hooks('local')) as client:
+            return (await client.get(f'{server}/')).status_code
+
+    assert asyncio.run(run()) == 200
+    assert http_timing.get_timings() is None
+
+
+def test_importing_does_not_load_the_metrics_registry():
+    code = ('import sys; sys.path.insert(0, "src"); import services.http_timing; '
+            'assert "services.metrics" not in sys.modules')
+    subprocess.run([sys.executable, '-c', code], check=True, cwd=ROOT)
@@ -0,0 +1,100 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from services.lease_manager import LeaseManager
+
+
+class Airtable:
+    """One shared table; every write lands, so the last claim wins like in Airtable"""
+
+    def __init__(self, **records):
+        self.records = {record_id: {'id': record_id, 'fields': dict(fields)} for record_id, fields in records.items()}
+
+    async def get_record_by_id(self, record_id):
+        record = self.records.get(record_id)
+        return {'id': record_id, 'fields': dict(record['fields'])} if record else None
+
+    async def update_record(self, record_id, fields):
+        self.records[record_id]['fields'].update(fields)
+        return True
+
+    async def get_leased_records(self, limit=100):
+        return [r for r in self.records.values()
+                if r['fields'].get('Status') == 'Processing' and r['fields'].get('LeaseOwner')][:limit]
+
+
+def lease(airtable, worker_id, ttl=600.0):
+    return LeaseManager(airtable, worker_id=worker_id, ttl=ttl, verify_delay=0.001)
+
+
+def test_racing_workers_get_one_owner():
+    airtable = Airtable(rec1={'Status': 'Pending'})
+
+    async def run():
+        return await asyncio.gather(lease(airtable, 'w1').claim('rec1'), lease(airtable, 'w2').claim('rec1'))
+
+    assert sorted(asyncio.run(run())) == [False, True]
+    assert airtable.records['rec1']['fields']['Status'] == 'Processing'
+
+
+def test_failed_records_go_back_to_pending_with_a_cooldown():
+    airtable = Airtable(rec1={'Status': 'Pending'})
+    worker = lease(airtable, 'w1')
+    assert asyncio.run(worker.claim('rec1'))
+    asyncio.run(worker.release('rec1', False, cooldown=900))
+
+    fields = airtable.records['rec1']['fields']
+    assert fields['Status'] == 'Pending' and fields['LeaseOwner'] == ''
+    assert not worker.is_available(airtable.records['rec1'])
+    assert not asyncio.run(lease(airtable, 'w2').claim('rec1'))
+
+
+def test_expired_leases_can_be_taken_over():
+    expired = (datetime.now(timezone.utc) - timedelta(seconds=1)).isoformat()
+    airtable = Airtable(rec1={'Status': 'Processing', 'LeaseOwner': 'dead:1', 'LeaseExpiresAt': expired},
+                        rec2={'Status': 'Done'})
+    worker = lease(airtable, 'w1')
+    assert [r['id'] for r in asyncio.run(worker.expired_leases())] == ['rec1']
+    assert asyncio.run(worker.claim('rec1'))
+    assert not asyncio.run(worker.claim('rec2'))
+
+
+def test_lost_lease_cancels_the_run_and_is_not_released():
+    airtable = Airtable(rec1={'Status': 'Pending'})
+    worker = lease(airtable, 'w1', ttl=0.03)
+
+    async def run():
+        assert await worker.claim('rec1')
+        task = asyncio.create_task(asyncio.sleep(10))
+        holder = asyncio.create_task(worker.hold('rec1', task))
+        # Another worker takes the record over behind our back
+        await airtable.update_record('rec1', {'LeaseOwner': 'w2'})
+        await asyncio.gather(task, holder, return_exceptions=True)
+        return task.cancelled(), await worker.release('rec1', False)
+
+    assert asyncio.run(run()) == (True, False)
+    assert airtable.records['rec1']['fields']['LeaseOwner'] == 'w2'
+    assert airtable.records['rec1']['fields']['Status'] == 'Processing'
+
+
+def test_hold_keeps_renewing_through_a_failed_renewal():
+    airtable = Airtable(rec1={'Status': 'Pending'})
+    worker = lease(airtable, 'w1', ttl=0.03)
+    calls = []
+    get_record = airtable.get_record_by_id
+
+    async def flaky(record_id):
+        calls.append(record_id)
+        if len(calls) == 3:
+            raise ConnectionError('airtable down')
+        return await get_record(record_id)
+
+    async def run():
+        assert await worker.claim('rec1')
+        airtable.get_record_by_id = flaky
+        task = asyncio.create_task(asyncio.sleep(0.1))
+        await asyncio.gather(task, worker.hold('rec1', task))
+        return task.cancelled()
+
+    assert asyncio.run(run()) is False
+    assert len(calls) > 3
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+
+from services import metrics
+from services.metrics import MetricsRegistry, MetricsServer
+from services.tracing import Tracer
+
+
+def test_text_format():
+    registry = MetricsRegistry()
+    calls = registry.counter('calls_total', 'Calls made', ['provider'])
+    latency = registry.histogram('latency_seconds', 'Call latency', ['provider'], buckets=[0.5, 1])
+    queued = registry.gauge_function('queued', 'Records waiting')
+    calls.inc(provider='say "hi"')
+    calls.inc(2, provider='say "hi"')
+    latency.observe(0.25, provider='x')
+    latency.observe(0.75, provider='x')
+    queued.source(lambda: {(): 4})
+
+    assert registry.render() == '\n'.join([
+        '# HELP calls_total Calls made',
+        '# TYPE calls_total counter',
+        'calls_total{provider="say \\"hi\\""} 3',
+        '# HELP latency_seconds Call latency',
+        '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{provider="x",le="0.5"} 1',
+        'latency_seconds_bucket{provider="x",le="1"} 2',
+        'latency_seconds_bucket{provider="x",le="+Inf"} 2',
+        'latency_seconds_sum{provider="x"} 1',
+        'latency_seconds_count{provider="x"} 2',
+        '# HELP queued Records waiting',
+        '# TYPE queued gauge',
+        'queued 4',
+    ]) + '\n'
+
+
+def test_labels_and_names_are_checked():
+    registry = MetricsRegistry()
+    calls = registry.counter('calls_total', 'Calls made', ['provider'])
+    with pytest.raises(ValueError):
+        calls.inc(stage='video')
+    with pytest.raises(ValueError):
+        registry.gauge('calls_total', 'Again')
+
+
+def test_records_and_stages_are_counted_off_their_spans():
+    tracer = Tracer(None)
+    tracer.listeners.append(metrics.observe_span)
+    before = metrics.STAGE_RUNS._values.get(('metrics-test', 'video', 'restored'), 0)
+
+    with tracer.span('record', 'record', record_id='rec1', tenant='metrics-test') as record:
+        with tracer.span('script', 'stage', stage='script', tenant='metrics-test'):
+            assert metrics.STAGES_IN_FLIGHT._values[('script',)] >= 1
+        record.set(outcome='ok', stages={'script': 'done', 'video': 'restored'})
+
+    assert metrics.RECORDS._values[('metrics-test', 'ok')] >= 1
+    assert metrics.STAGE_RUNS._values[('metrics-test', 'video', 'restored')] == before + 1
+    assert metrics.STAGE_SECONDS._values[('metrics-test', 'script')][2] >= 1
+
+
+def test_server_answers_metrics_only():
+    async def run():
+        registry = MetricsRegistry()
+        registry.counter('up', 'Always one').inc()
+        server = await MetricsServer(registry, 0, host='127.0.0.1').start()
+        try:
+            answers = []
+            for path in ('/metrics', '/other'):
+                reader, writer = await asyncio.open_connection('127.0.0.1', server.port)
+                writer.write(f'GET {path} HTTP/1.1\r\nHost: x\r\n\r\n'.encode())
+                answers.append((await reader.read()).decode())
+                writer.close()
+            return answers
+        finally:
+            await server.close()
+
+    found, missing = asyncio.run(run())
+    assert found.startswith('HTTP/1.1 200 OK') and found.endswith('up 1\n')
+    assert missing.startswith('HTTP/1.1 404')
@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from services.category_scheduler import CategoryScheduler
+from services.pending_queue import PendingQueue, parse_rules
+
+
+class Airtable:
+    def __init__(self, records):
+        self.records = records
+
+    async def scan_pending_records(self, page_size=100, max_records=1000):
+        return list(self.records[:max_records])
+
+
+def record(record_id, created, **fields):
+    return {'id': record_id, 'createdTime': created, 'fields': fields}
+
+
+RULES = parse_rules([
+    {'field': 'Priority', 'order': 'desc', 'values': {'High': 2, 'Normal': 1}},
+    {'field': 'PublishBy'},
+    {'field': 'createdTime'},
+])
+
+
+def test_urgent_records_go_first():
+    queue = PendingQueue(Airtable([
+        record('old', '2026-01-01T00:00:00Z'),
+        record('due', '2026-03-01T00:00:00Z', Priority='Normal', PublishBy='2026-04-01'),
+        record('soon', '2026-03-02T00:00:00Z', Priority='Normal', PublishBy='2026-03-15'),
+        record('high', '2026-03-03T00:00:00Z', Priority='High'),
+    ]), RULES)
+    assert asyncio.run(queue.refresh()) == 4
+    assert [r['id'] for r in queue.take(10)] == ['high', 'soon', 'due', 'old']
+
+
+def test_skipped_records_are_dropped_and_the_rest_kept():
+    queue = PendingQueue(Airtable([record(f'rec{i}', f'2026-01-0{i}T00:00:00Z') for i in range(1, 5)]), RULES)
+    asyncio.run(queue.refresh())
+    assert [r['id'] for r in queue.take(2, skip={'rec1'})] == ['rec2', 'rec3']
+    assert len(queue) == 1
+    assert asyncio.run(queue.next(skip={'rec1', 'rec2'}))['id'] == 'rec3'
+
+
+def test_categories_order_records_within_a_tier():
+    queue = PendingQueue(Airtable([
+        record('e1', '', Category='Electronics'),
+        record('e2', '', Category='Electronics'),
+        record('b1', '', Category='Beauty'),
+    ]), categories=CategoryScheduler(batch_size=1, categories=['Beauty', 'Electronics']))
+    asyncio.run(queue.refresh())
+    assert [r['id'] for r in queue.take(3)] == ['b1', 'e1', 'e2']
+
+
+def test_bad_rules_are_rejected():
+    with pytest.raises(ValueError):
+        parse_rules([{'order': 'desc'}])
+    with pytest.raises(ValueError):
+        parse_rules([{'field': 'Priority', 'order': 'sideways'}])
+    with pytest.raises(ValueError):
+        parse_rules({'field': 'Priority'})
@@ -0,0 +1,100 @@
+import asyncio
+import sqlite3
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from services.quota_ledger import QuotaLedger, meter_anthropic
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / 'quota.db')
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_admit_reserves_until_released(db):
+    ledger = QuotaLedger(db, {'json2video': 2})
+    assert run(ledger.admit('rec1', {'video': {'json2video': 1}})) is None
+    assert run(ledger.admit('rec2', {'video': {'json2video': 1}})) is None
+    assert ledger.reserved('json2video') == 2
+    assert run(ledger.admit('rec3', {'video': {'json2video': 1}})) == \
+        'json2video quota: needs 1 renders, 0 left today'
+
+    # The stage ran and charged what it really used
+    run(ledger.release('rec1', 'video'))
+    run(ledger.charge('json2video', 1))
+    assert ledger.remaining('json2video') == 0
+    run(ledger.release('rec2'))
+    assert run(ledger.admit('rec3', {'video': {'json2video': 1}})) is None
+    ledger.close()
+
+
+def test_reservations_are_shared_by_every_ledger_on_the_file(db):
+    first = QuotaLedger(db, {'scrapingdog': 10})
+    second = QuotaLedger(db, {'scrapingdog': 10})
+    assert run(first.admit('rec1', {'affiliate': {'scrapingdog': 6}})) is None
+    assert second.remaining('scrapingdog') == 4
+    assert run(second.admit('rec2', {'affiliate': {'scrapingdog': 6}})) is not None
+
+    # A record is admitted once; admitting it again replaces its reservation
+    assert run(first.admit('rec1', {'affiliate': {'scrapingdog': 3}})) is None
+    assert second.reserved('scrapingdog') == 3
+
+
+def test_reservations_of_a_dead_worker_lapse(db):
+    crashed = QuotaLedger(db, {'json2video': 1}, reservation_ttl=-1)
+    assert run(crashed.admit('rec1', {'video': {'json2video': 1}})) is None
+    assert run(QuotaLedger(db, {'json2video': 1}).admit('rec2', {'video': {'json2video': 1}})) is None
+
+
+def test_a_refused_record_reserves_nothing(db):
+    ledger = QuotaLedger(db, {'json2video': 1, 'anthropic': 100})
+    assert run(ledger.admit('rec1', {'script': {'anthropic': 50}, 'video': {'json2video': 2}})) is not None
+    assert ledger.reserved('anthropic') == 0
+
+
+def test_unlimited_providers_are_counted_but_never_hold_back(db):
+    ledger = QuotaLedger(db)
+    run(ledger.charge('anthropic', 1500))
+    run(ledger.charge('anthropic', 500))
+    assert ledger.used('anthropic') == 2000
+    assert ledger.remaining('anthropic') is None
+    assert run(ledger.admit('rec1', {'script': {'anthropic': 10 ** 9}})) is None
+    assert ledger.summary() == {'anthropic': {'used': 2000, 'limit': None}}
+
+
+def test_waiting_for_another_workers_lock_leaves_the_loop_running(db):
+    ledger = QuotaLedger(db, {'json2video': 1})
+    other = sqlite3.connect(db)
+    other.execute("BEGIN IMMEDIATE")
+
+    async def main():
+        admit = asyncio.create_task(ledger.admit('rec1', {'video': {'json2video': 1}}))
+        started = time.monotonic()
+        await asyncio.sleep(0.05)
+        ticked = time.monotonic() - started
+        assert not admit.done()
+        # The other worker commits and the admit goes through
+        other.rollback()
+        return ticked, await admit
+
+    ticked, shortfall = run(main())
+    assert ticked < 1 and shortfall is None
+    other.close()
+    ledger.close()
+
+
+def test_meter_anthropic_charges_tokens(db):
+    ledger = QuotaLedger(db)
+
+    async def create(**kwargs):
+        return SimpleNamespace(usage=SimpleNamespace(input_tokens=120, output_tokens=30))
+
+    client = meter_anthropic(SimpleNamespace(messages=SimpleNamespace(create=create)), ledger)
+    run(client.messages.create(model='m', messages=[]))
+    assert ledger.used('anthropic') == 150
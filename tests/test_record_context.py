@@ -0,0 +1,54 @@
+import asyncio
+
+from services.record_context import RecordContext
+
+
+class Airtable:
+    def __init__(self, fields, ok=True):
+        self.fields = dict(fields)
+        self.ok = ok
+        self.updates = []
+
+    async def get_record_by_id(self, record_id):
+        return {'id': record_id, 'fields': dict(self.fields)}
+
+    async def update_record(self, record_id, fields):
+        self.updates.append(fields)
+        if self.ok:
+            self.fields.update(fields)
+        return self.ok
+
+
+def test_changed_fields_are_written_in_one_update():
+    airtable = Airtable({'Title': 'Mixers', 'Status': 'Pending'})
+    context = asyncio.run(RecordContext.load(airtable, 'rec1'))
+    context.update({'Status': 'Pending', 'VideoTitle': 'Best mixers'})
+    context.update({'TextControlStatus': 'Ready'})
+
+    assert context.get('VideoTitle') == 'Best mixers'
+    assert asyncio.run(context.flush(airtable))
+    assert airtable.updates == [{'VideoTitle': 'Best mixers', 'TextControlStatus': 'Ready'}]
+    # Nothing left to write
+    assert asyncio.run(context.flush(airtable))
+    assert len(airtable.updates) == 1
+
+
+def test_a_failed_flush_keeps_the_writes_for_the_next_one():
+    airtable = Airtable({}, ok=False)
+    context = RecordContext.from_record({'id': 'rec1', 'fields': {}})
+    context.update({'VideoTitle': 'old', 'Status': 'Processing'})
+    assert not asyncio.run(context.flush(airtable))
+
+    airtable.ok = True
+    context.update({'VideoTitle': 'new'})
+    assert asyncio.run(context.flush(airtable))
+    assert airtable.updates[-1] == {'VideoTitle': 'new', 'Status': 'Processing'}
+    assert context.pending == {}
+
+
+def test_products_skip_empty_slots():
+    context = RecordContext('rec1', {'ProductNo1Title': 'A', 'ProductNo3Title': 'C', 'ProductNo3Description': 'c'})
+    assert context.products() == [
+        {'number': 1, 'title': 'A', 'description': ''},
+        {'number': 3, 'title': 'C', 'description': 'c'},
+    ]
@@ -0,0 +1,136 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip('airtable')
+
+from services.scheduler import WorkflowScheduler
+
+
+class Checkpoints:
+    def unfinished_records(self):
+        return []
+
+
+class Orchestrator:
+    """Serves its records as Pending until one of them succeeds"""
+
+    def __init__(self, *record_ids, results=None):
+        self.records = [{'id': record_id, 'fields': {'Status': 'Pending'}} for record_id in record_ids]
+        self.results = results or {}
+        self.runs = []
+        self.checkpoints = Checkpoints()
+        self.airtable_server = self
+
+    async def get_pending_records(self, limit=100):
+        return self.records[:limit]
+
+    async def process_record(self, pending_title):
+        record_id = pending_title['record_id']
+        self.runs.append(record_id)
+        result = self.results.get(record_id, {'success': True})
+        if callable(result):
+            result = await result()
+        if result['success']:
+            self.records = [record for record in self.records if record['id'] != record_id]
+        return result
+
+
+def scheduler(orchestrator, **options):
+    return WorkflowScheduler(orchestrator, min_interval=0.01, max_interval=0.05, retry_delay=60, **options)
+
+
+def run_until(scheduler, done, settle=0.1):
+    """Run the daemon until `done()` holds, give it a few more polls, then stop it"""
+    async def run():
+        daemon = asyncio.create_task(scheduler.run())
+        waited = 0.0
+        while not done():
+            assert waited < 5, 'scheduler never got there'
+            await asyncio.sleep(0.01)
+            waited += 0.01
+        await asyncio.sleep(settle)
+        scheduler.stop()
+        await asyncio.wait_for(daemon, timeout=1)
+
+    asyncio.run(run())
+
+
+def test_pending_records_are_drained_and_failures_wait():
+    orchestrator = Orchestrator('rec1', 'rec2', 'rec3', results={'rec2': {'success': False}})
+    daemon = scheduler(orchestrator, concurrency=2)
+    run_until(daemon, lambda: daemon.processed + daemon.failed == 3)
+
+    assert sorted(orchestrator.runs) == ['rec1', 'rec2', 'rec3']
+    assert (daemon.processed, daemon.failed) == (2, 1)
+
+
+def test_idle_daemon_backs_off():
+    daemon = scheduler(Orchestrator())
+    run_until(daemon, lambda: True, settle=0.2)
+    assert daemon.interval == daemon.max_interval
+
+
+class Leases:
+    """Every claim succeeds; records which releases the scheduler asked for"""
+
+    def __init__(self, lose_after=None):
+        self.lose_after = lose_after
+        self.released = {}
+
+    def is_available(self, record):
+        return True
+
+    async def claim(self, record_id):
+        return True
+
+    async def expired_leases(self, limit=100):
+        return []
+
+    async def hold(self, record_id, task):
+        if self.lose_after is None:
+            await asyncio.Event().wait()
+        # The lease went to another worker, so the run is cancelled like LeaseManager.hold does
+        await asyncio.sleep(self.lose_after)
+        task.cancel()
+
+    async def release(self, record_id, success, cooldown=0.0):
+        self.released[record_id] = (success, cooldown)
+        return True
+
+
+def test_leases_are_released_with_the_outcome():
+    orchestrator = Orchestrator('rec1', 'rec2', results={'rec2': {'success': False}})
+    leases = Leases()
+    daemon = scheduler(orchestrator, concurrency=2, leases=leases)
+    run_until(daemon, lambda: len(leases.released) == 2)
+
+    assert leases.released == {'rec1': (True, 60), 'rec2': (False, 60)}
+
+
+def test_a_cancelled_record_is_released_without_a_cooldown():
+    async def forever():
+        await asyncio.Event().wait()
+
+    orchestrator = Orchestrator('rec1', results={'rec1': forever})
+    leases = Leases(lose_after=0.02)
+    daemon = scheduler(orchestrator, leases=leases)
+    run_until(daemon, lambda: leases.released)
+
+    # Back to Pending for any worker, but this one leaves it alone for a while
+    assert leases.released == {'rec1': (False, 0.0)}
+    assert orchestrator.runs == ['rec1']
+    assert (daemon.processed, daemon.failed) == (0, 0)
+
+
+def test_a_deferred_record_waits_for_its_quota_without_failing():
+    orchestrator = Orchestrator('rec1', results={
+        'rec1': {'success': False, 'deferred': True, 'retry_after': 120, 'error': 'json2video quota'}
+    })
+    leases = Leases()
+    daemon = scheduler(orchestrator, leases=leases)
+    run_until(daemon, lambda: leases.released)
+
+    assert leases.released == {'rec1': (False, 120)}
+    assert orchestrator.runs == ['rec1']
+    assert daemon.failed == 0
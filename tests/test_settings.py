@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+from services import settings
+from services.settings import ConfigError, Settings, read_config, require
+
+
+@pytest.fixture
+def config_file(tmp_path, monkeypatch):
+    path = tmp_path / 'api_keys.json'
+    path.write_text(json.dumps({
+        'anthropic_api_key': 'sk-file',
+        'airtable_api_key': 'pat',
+        'airtable_base_id': 'app1',
+        'airtable_table_name': 'Titles',
+        'stage_concurrency': {'video': 3},
+    }))
+    monkeypatch.setenv(settings.CONFIG_FILE_ENV, str(path))
+    monkeypatch.setenv(settings.OUTPUT_DIR_ENV, str(tmp_path / 'output'))
+    # Start and end every test without a cached config
+    monkeypatch.setattr(settings, '_config', None)
+    monkeypatch.setattr(settings, '_settings', None)
+    return path
+
+
+def test_environment_overrides_the_file(config_file):
+    config = read_config(environ={
+        'ANTHROPIC_API_KEY': 'sk-env',
+        'WORKFLOW_RECORD_TIMEOUT_SECONDS': '60',
+        'WORKFLOW_CATEGORIES': '["Beauty"]',
+    })
+    assert config['anthropic_api_key'] == 'sk-env'
+    assert config['record_timeout_seconds'] == 60
+    assert config['categories'] == ['Beauty']
+    # Credential files default to the config file's directory
+    assert config['youtube_token'] == str(config_file.parent / 'youtube_token.json')
+
+
+def test_config_is_read_once_per_process(config_file):
+    first = settings.load_config()
+    config_file.write_text(json.dumps({'anthropic_api_key': 'changed'}))
+    assert settings.load_config() is first
+    assert settings.get_settings() is settings.get_settings()
+    assert settings.get_settings().stage_concurrency == {'video': 3}
+    assert settings.get_settings().checkpoint_db.startswith(str(config_file.parent / 'output'))
+
+
+def test_bad_values_are_config_errors(config_file):
+    config = read_config(environ={})
+    with pytest.raises(ConfigError, match='stage_concurrency.video'):
+        Settings.from_config({**config, 'stage_concurrency': {'video': 0}})
+    with pytest.raises(ConfigError, match='record_timeout_seconds'):
+        Settings.from_config({**config, 'record_timeout_seconds': 'soon'})
+    with pytest.raises(ConfigError, match='poll_min_seconds'):
+        Settings.from_config({**config, 'poll_min_seconds': 700})
+    with pytest.raises(ConfigError, match='airtable_base_id'):
+        require({**config, 'airtable_base_id': ''})
+    assert Settings.from_config({**config, 'record_timeout_seconds': None}).record_timeout is None
+
+
+def test_missing_or_broken_files_are_config_errors(tmp_path):
+    with pytest.raises(ConfigError, match='not found'):
+        read_config(str(tmp_path / 'missing.json'), environ={})
+    broken = tmp_path / 'broken.json'
+    broken.write_text('{')
+    with pytest.raises(ConfigError, match='not valid JSON'):
+        read_config(str(broken), environ={})
+
+
+def test_tenants_override_the_shared_keys(config_file):
+    config = read_config(environ={})
+    config['tenants'] = [
+        {'name': 'tech', 'airtable_base_id': 'app2', 'youtube_token': 'tech_token.json', 'weight': 2},
+        {'name': 'home'},
+    ]
+    tech, home = settings.tenant_configs(config)
+    assert (tech.name, tech.weight, home.weight) == ('tech', 2, 1)
+    assert tech.config['airtable_base_id'] == 'app2' and home.config['airtable_base_id'] == 'app1'
+    assert tech.config['youtube_token'].endswith('tech_token.json')
+    assert tech.config['checkpoint_db'] != home.config['checkpoint_db']
+
+    with pytest.raises(ConfigError, match='Duplicate'):
+        settings.tenant_configs({**config, 'tenants': [{'name': 'a'}, {'name': 'a'}]})
+    with pytest.raises(ConfigError, match='weight'):
+        settings.tenant_configs({**config, 'tenants': [{'name': 'a', 'weight': 0}]})
@@ -0,0 +1,137 @@
+import asyncio
+
+import pytest
+
+from services.checkpoint_store import CheckpointStore
+from services.stage_graph import Stage, StageGraph
+
+
+def build(calls, fail=()):
+    """seed -> a -> b, and seed -> c on its own branch"""
+    def step(name, source, target):
+        async def run(inputs):
+            calls.append(name)
+            if name in fail:
+                raise RuntimeError(f'{name} broke')
+            return {target: inputs[source] + 1}
+        return run
+
+    return StageGraph([
+        Stage('a', step('a', 'seed', 'x'), ['seed'], ['x']),
+        Stage('b', step('b', 'x', 'y'), ['x'], ['y']),
+        Stage('c', step('c', 'seed', 'z'), ['seed'], ['z']),
+    ], initial_inputs=['seed'])
+
+
+@pytest.fixture
+def checkpoints(tmp_path):
+    store = CheckpointStore(str(tmp_path / 'checkpoints.db'))
+    yield store
+    store.close()
+
+
+def test_failure_skips_only_dependents():
+    calls = []
+    result = asyncio.run(build(calls, fail={'a'}).run({'seed': 1}))
+
+    assert not result['success']
+    assert result['stages']['a']['status'] == 'failed'
+    assert result['stages']['a']['error'] == 'a broke'
+    assert result['stages']['b']['status'] == 'skipped'
+    assert result['stages']['c']['status'] == 'done'
+    assert result['outputs']['z'] == 2
+    assert 'b' not in calls
+
+
+def test_checkpoints_restore_for_the_same_inputs_only(checkpoints):
+    calls = []
+    graph = build(calls)
+    asyncio.run(graph.run({'seed': 1}, checkpoint=checkpoints, run_id='rec1'))
+    assert sorted(calls) == ['a', 'b', 'c']
+
+    calls.clear()
+    result = asyncio.run(graph.run({'seed': 1}, checkpoint=checkpoints, run_id='rec1'))
+    assert calls == []
+    assert {entry['status'] for entry in result['stages'].values()} == {'restored'}
+    assert result['outputs']['y'] == 3
+
+    # New inputs change every hash downstream of them
+    result = asyncio.run(graph.run({'seed': 5}, checkpoint=checkpoints, run_id='rec1'))
+    assert sorted(calls) == ['a', 'b', 'c']
+    assert result['outputs']['y'] == 7
+
+
+def test_forced_stages_run_and_feed_their_dependents(checkpoints):
+    calls = []
+    graph = build(calls)
+    asyncio.run(graph.run({'seed': 1}, checkpoint=checkpoints, run_id='rec1'))
+
+    calls.clear()
+    rerun = graph.downstream(['a'])
+    assert rerun == ['a', 'b']
+    result = asyncio.run(graph.run({'seed': 1}, checkpoint=checkpoints, run_id='rec1', force=rerun))
+    assert sorted(calls) == ['a', 'b']
+    assert result['stages']['c']['status'] == 'restored'
+
+
+def test_pending_matches_what_a_run_would_execute(checkpoints):
+    calls = []
+    graph = build(calls)
+    assert graph.pending({'seed': 1}, checkpoints, 'rec1') == graph.order
+
+    asyncio.run(graph.run({'seed': 1}, checkpoint=checkpoints, run_id='rec1'))
+    assert graph.pending({'seed': 1}, checkpoints, 'rec1') == []
+    assert graph.pending({'seed': 1}, checkpoints, 'rec1', force=['b']) == ['b']
+    assert sorted(graph.pending({'seed': 2}, checkpoints, 'rec1')) == ['a', 'b', 'c']
+
+
+def test_timed_out_stage_fails():
+    async def slow(inputs):
+        await asyncio.sleep(1)
+        return {'x': 1}
+
+    graph = StageGraph([Stage('slow', slow, ['seed'], ['x'], timeout=0.01)], initial_inputs=['seed'])
+    result = asyncio.run(graph.run({'seed': 0}))
+    assert result['stages']['slow']['status'] == 'failed'
+    assert 'timed out' in result['stages']['slow']['error']
+
+
+def test_cycles_and_unknown_inputs_are_rejected():
+    async def noop(inputs):
+        return {}
+
+    with pytest.raises(ValueError, match='cycle'):
+        StageGraph([Stage('a', noop, ['y'], ['x']), Stage('b', noop, ['x'], ['y'])])
+    with pytest.raises(ValueError, match='nothing produces'):
+        StageGraph([Stage('a', noop, ['missing'], ['x'])])
+
+
+def test_pending_sees_past_stages_that_are_never_checkpointed(checkpoints):
+    """seed -> copy (never saved) -> publish, where publish's fingerprint leaves the copy out"""
+    calls = []
+
+    async def copy(inputs):
+        calls.append('copy')
+        return {'local': f"/tmp/{inputs['seed']}"}
+
+    async def publish(inputs):
+        calls.append('publish')
+        return {'published': inputs['seed']}
+
+    graph = StageGraph([
+        Stage('copy', copy, ['seed'], ['local'], checkpoint_if=lambda outputs: False),
+        Stage('publish', publish, ['seed', 'local'], ['published'],
+              fingerprint=lambda inputs: {'seed': inputs['seed']}),
+    ], initial_inputs=['seed'])
+
+    asyncio.run(graph.run({'seed': 1}, checkpoint=checkpoints, run_id='rec1'))
+    calls.clear()
+    result = asyncio.run(graph.run({'seed': 1}, checkpoint=checkpoints, run_id='rec1'))
+    assert calls == ['copy']
+    assert result['stages']['publish']['status'] == 'restored'
+    assert graph.pending({'seed': 1}, checkpoints, 'rec1') == ['copy']
+    assert graph.pending({'seed': 2}, checkpoints, 'rec1') == ['copy', 'publish']
+
+    # Without a fingerprint the unknown copy is part of the hash, so publish stays pending
+    graph.stages['publish'].fingerprint = None
+    assert graph.pending({'seed': 1}, checkpoints, 'rec1') == ['copy', 'publish']
@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from services.stage_graph import Stage, StageGraph
+from services.staged_pipeline import Phase, StagedPipeline
+
+
+def build(events, fail=(), delay=0.0):
+    """seed -> a -> b, with 'a' and 'b' in phases of their own"""
+    def step(name, source, target):
+        async def run(inputs):
+            events.append(('start', name, inputs[source]))
+            await asyncio.sleep(delay)
+            if inputs[source] in fail:
+                raise RuntimeError(f'{name} broke')
+            events.append(('end', name, inputs[source]))
+            return {target: inputs[source] * 10}
+        return run
+
+    graph = StageGraph([
+        Stage('a', step('a', 'seed', 'x'), ['seed'], ['x'], concurrency=4),
+        Stage('b', step('b', 'x', 'y'), ['x'], ['y'], concurrency=4),
+    ], initial_inputs=['seed'])
+    return StagedPipeline(graph, [Phase('first', ['a']), Phase('second', ['b'])])
+
+
+def test_records_flow_through_every_phase():
+    async def run():
+        pipeline = build([], fail={2})
+        await pipeline.start()
+        try:
+            return await asyncio.gather(*(pipeline.submit(f'rec{seed}', {'seed': seed}) for seed in (1, 2, 3)))
+        finally:
+            await pipeline.close()
+
+    first, broken, third = asyncio.run(run())
+    assert first['success'] and first['outputs']['y'] == 100
+    assert third['outputs']['y'] == 300
+    assert not broken['success']
+    assert broken['stages']['a']['status'] == 'failed'
+    assert broken['stages']['b']['status'] == 'skipped'
+
+
+def test_phases_overlap_across_records():
+    events = []
+
+    async def run():
+        pipeline = build(events, delay=0.02)
+        await pipeline.start()
+        try:
+            await asyncio.gather(pipeline.submit('rec1', {'seed': 1}), pipeline.submit('rec2', {'seed': 2}))
+        finally:
+            await pipeline.close()
+
+    asyncio.run(run())
+    # The second record's first phase runs while the first record is in the second phase
+    assert events.index(('start', 'a', 2)) < events.index(('end', 'b', 10))
+
+
+def test_a_full_queue_holds_the_submitter_back():
+    events = []
+
+    async def run():
+        pipeline = build(events, delay=0.05)
+        await pipeline.start()
+        try:
+            submits = [asyncio.create_task(pipeline.submit(f'rec{i}', {'seed': i})) for i in range(10)]
+            await asyncio.sleep(0.01)
+            # One record in the first phase's worker, two queued behind it, the rest blocked in submit()
+            depths = pipeline.queue_depths()
+            started = len(events)
+            await asyncio.gather(*submits)
+            return depths, started
+        finally:
+            await pipeline.close()
+
+    assert asyncio.run(run()) == ({'first': 2, 'second': 0}, 1)
+
+
+def test_giving_up_on_a_record_cancels_its_phase_work():
+    events = []
+
+    async def run():
+        pipeline = build(events, delay=1)
+        await pipeline.start()
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(pipeline.submit('rec1', {'seed': 1}), timeout=0.05)
+        finally:
+            await asyncio.wait_for(pipeline.close(), timeout=1)
+
+    asyncio.run(run())
+    assert events == [('start', 'a', 1)]
+
+
+def test_phases_must_cover_the_graph():
+    pipeline = build([])
+    with pytest.raises(ValueError):
+        StagedPipeline(pipeline.graph, [Phase('first', ['a'])])
+    with pytest.raises(ValueError):
+        StagedPipeline(pipeline.graph, [Phase('first', ['a', 'b'], workers=0)])
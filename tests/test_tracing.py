@@ -0,0 +1,83 @@
+import asyncio
+import json
+
+import pytest
+
+from services import tracing
+from services.tracing import Tracer
+
+
+def read(tmp_path, tracer):
+    spans = [json.loads(line) for line in (tmp_path / f'spans-{tracer.pid}.jsonl').read_text().splitlines()]
+    events = json.loads((tmp_path / f'trace-{tracer.pid}.json').read_text())
+    return spans, events
+
+
+def test_spans_nest_and_land_in_both_files(tmp_path):
+    tracer = Tracer(str(tmp_path), {'provider_urls': {'anthropic': 'http://127.0.0.1:9001'}})
+    with tracer.span('record', 'record', record_id='rec1') as record:
+        with tracer.span('script', 'stage', stage='script'):
+            with tracer.call('post', 'http://127.0.0.1:9001/v1/messages?key=secret', bytes_out=10) as call:
+                call.set(status=200, bytes_in=30)
+        record.set(outcome='ok')
+    tracer.close()
+
+    spans, events = read(tmp_path, tracer)
+    call, stage, record = spans
+    assert (call['name'], call['provider'], call['record_id'], call['stage']) == \
+        ('POST anthropic', 'anthropic', 'rec1', 'script')
+    assert 'secret' not in call['url']
+    assert call['parent'] == stage['id'] and stage['parent'] == record['id']
+    # A stage sums up the calls made inside it
+    assert (stage['calls'], stage['bytes_out'], stage['bytes_in']) == (1, 10, 30)
+
+    durations = [event for event in events if event['ph'] == 'X']
+    assert [event['name'] for event in durations] == ['POST anthropic', 'script', 'record']
+    lanes = {event['args']['name'] for event in events if event['name'] == 'thread_name'}
+    assert lanes == {'rec1', 'rec1 · script'}
+
+
+def test_a_crash_leaves_a_readable_trace(tmp_path):
+    tracer = Tracer(str(tmp_path))
+    with tracer.span('record', 'record', record_id='rec1'):
+        pass
+    # Not closed: the viewers accept the array without its closing bracket, json needs it
+    text = (tmp_path / f'trace-{tracer.pid}.json').read_text()
+    assert json.loads(text + '\n]')[-1]['name'] == 'record'
+    tracer.close()
+
+
+def test_failures_cancellations_and_retries_are_marked():
+    ended = []
+    tracer = Tracer(None)
+    tracer.listeners.append(lambda event, span: ended.append(span) if event == 'end' else None)
+
+    async def slow():
+        with tracer.span('slow', 'stage'):
+            await asyncio.sleep(1)
+
+    async def run():
+        with tracer.span('stage', 'stage', stage='video'):
+            for status in (500, 200):
+                with tracer.call('GET', 'https://api.json2video.com/v2/movies') as call:
+                    call.set(status=status, outcome='ok' if status < 400 else 'error')
+        # A stage past its deadline is cancelled from outside
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(slow(), timeout=0.01)
+        with pytest.raises(RuntimeError):
+            with tracer.span('broken', 'stage'):
+                raise RuntimeError('boom')
+
+    asyncio.run(run())
+    first, retry, stage, slow, broken = ended
+    assert (first.attrs['retries'], retry.attrs['retries'], stage.attrs['retries']) == (0, 1, 1)
+    assert retry.attrs['provider'] == 'json2video'
+    assert slow.attrs['outcome'] == 'cancelled'
+    assert (broken.attrs['outcome'], broken.attrs['error']) == ('failed', 'boom')
+
+
+def test_module_span_is_a_no_op_without_a_tracer():
+    tracing.install_tracer(None)
+    with tracing.span('record', 'record') as span:
+        span.set(outcome='ok')
+    assert tracing.get_tracer() is None
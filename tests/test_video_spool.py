@@ -0,0 +1,64 @@
+import asyncio
+import http.server
+import os
+import threading
+
+import pytest
+
+httpx = pytest.importorskip('httpx')
+
+from services.video_spool import VideoSpool
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    requests = 0
+
+    def do_GET(self):
+        Handler.requests += 1
+        if self.path != '/video.mp4':
+            self.send_error(404)
+            return
+        body = b'\x00' * 4096
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.requests = 0
+    httpd = http.server.HTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_port}'
+    httpd.shutdown()
+
+
+def test_targets_share_one_download(server, tmp_path):
+    async def run():
+        async with httpx.AsyncClient() as client:
+            spool = VideoSpool(f'{server}/video.mp4', client, directory=str(tmp_path))
+            paths = await asyncio.gather(spool.path(), spool.path(), spool.path())
+            # The client belongs to the registry and stays open for the next record
+            assert not client.is_closed
+            return spool, paths
+
+    spool, paths = asyncio.run(run())
+    assert len(set(paths)) == 1 and os.path.getsize(paths[0]) == 4096
+    assert Handler.requests == 1
+    spool.close()
+    assert not os.path.exists(paths[0])
+
+
+def test_failed_download_leaves_no_file(server, tmp_path):
+    async def run():
+        async with httpx.AsyncClient() as client:
+            await VideoSpool(f'{server}/missing.mp4', client, directory=str(tmp_path)).path()
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(run())
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,70 @@
+import asyncio
+import sys
+
+import pytest
+
+from services.worker_fleet import Autoscaler, ScalingInputs, WorkerFleet
+
+
+def inputs(pending, record_seconds=600, throttles=0, stage_seconds=None, baseline_seconds=None):
+    return ScalingInputs(pending=pending, record_seconds=record_seconds, stage_seconds=stage_seconds or {},
+                         baseline_seconds=baseline_seconds or {}, throttles=throttles)
+
+
+def autoscaler():
+    # Each worker drains 2 * 1800 / 600 = 6 records within the drain window
+    return Autoscaler(min_workers=1, max_workers=5, concurrency=2, drain_seconds=1800, scale_down_after=300)
+
+
+def test_backlog_sets_the_target_within_bounds():
+    scaler = autoscaler()
+    assert scaler.target(inputs(0)) == 1
+    assert scaler.target(inputs(13)) == 3
+    assert scaler.target(inputs(13, record_seconds=300)) == 2
+    assert scaler.target(inputs(1000)) == 5
+
+
+def test_growth_is_immediate_and_shrinking_waits():
+    scaler = autoscaler()
+    assert scaler.decide(1, inputs(30), now=0) == 5
+    assert scaler.decide(5, inputs(0), now=10) == 5
+    assert scaler.decide(5, inputs(0), now=200) == 5
+    # One worker per tick once the lower target has held long enough
+    assert scaler.decide(5, inputs(0), now=310) == 4
+    assert scaler.decide(4, inputs(0), now=320) == 4
+
+
+def test_provider_pushback_stops_growth():
+    scaler = autoscaler()
+    assert scaler.decide(2, inputs(30, throttles=3), now=0) == 1
+    slow = inputs(30, stage_seconds={'video': 900}, baseline_seconds={'video': 300})
+    assert scaler.slowed_stages(slow) == ['video']
+    assert scaler.decide(2, slow, now=0) == 2
+
+
+def test_bounds_are_checked():
+    with pytest.raises(ValueError):
+        Autoscaler(min_workers=3, max_workers=2, concurrency=1)
+
+
+def test_fleet_scales_and_drains_its_processes():
+    async def run():
+        fleet = WorkerFleet([sys.executable, '-c', 'import time; time.sleep(30)'], count=2, restart_delay=0.1)
+        supervisor = asyncio.create_task(fleet.run())
+        await asyncio.sleep(0.1)
+        counts = [fleet.running]
+        fleet.scale_to(3)
+        counts.append(fleet.running)
+        fleet.scale_to(1)
+        counts.append(fleet.running)
+        # Retired workers get SIGTERM and their slots go once the process is gone
+        for _ in range(100):
+            if len(fleet._procs) == 1:
+                break
+            await asyncio.sleep(0.05)
+        counts.append(len(fleet._procs))
+        fleet.stop()
+        await asyncio.wait_for(supervisor, timeout=5)
+        return counts, fleet.running
+
+    assert asyncio.run(run()) == ([2, 3, 1, 1], 0)
@@ -0,0 +1,14 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('airtable')
+
+import workflow_runner
+
+
+def test_unknown_stage_limits_are_dropped_with_a_warning(capsys):
+    limits = workflow_runner.stage_concurrency(SimpleNamespace(stage_concurrency={'video': 3, 'vidoe': 2}))
+    assert limits['video'] == 3
+    assert set(limits) == set(workflow_runner.DEFAULT_STAGE_CONCURRENCY)
+    assert "unknown stage 'vidoe'" in capsys.readouterr().out